@@ -0,0 +1,19 @@
+"""This module defines the configuration for the analytics app."""
+from django.apps import AppConfig
+
+
+class AnalyticsConfig(AppConfig):
+    """
+    This class defines the configuration for the analytics app.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'analytics'
+
+    def ready(self):
+        """Drop the triggers maintaining the rollups during the migrations, and install them after."""
+        from api.db import connect_installs  # pylint: disable=import-outside-toplevel
+        from analytics.rollups import install, uninstall  # pylint: disable=import-outside-toplevel
+        connect_installs(self, install, uninstall)
@@ -0,0 +1,26 @@
+"""This module defines the command rebuilding the analytics rollups."""
+from django.core.management.base import BaseCommand
+from api.sharding import shards
+from analytics.rollups import rebuild
+
+
+class Command(BaseCommand):
+    """This class defines the command rebuilding the analytics rollups from the batches."""
+
+    help = 'Rebuild the spend and waste rollups from the batches.'
+
+    def add_arguments(self, parser):
+        """Add the database and the queue options."""
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A shard to rebuild, repeated for several ones, every shard by default.')
+        parser.add_argument('--enqueue', action='store_true', help='Queue the rebuild for the workers.')
+
+    def handle(self, *args, **options):
+        """Rebuild the rollups of each shard, or queue their rebuilds."""
+        for database in options['databases'] or shards():
+            if options['enqueue']:
+                job = rebuild.enqueue(using=database)
+                self.stdout.write(self.style.SUCCESS(f'{database}: rollups rebuild queued as job {job.pk}.'))
+            else:
+                rebuild(database)
+                self.stdout.write(self.style.SUCCESS(f'{database}: rollups rebuilt.'))
@@ -0,0 +1,80 @@
+# Generated by Django 3.1 on 2026-10-19 10:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def fill_rollups(apps, schema_editor):
+    """Aggregate the existing batches into the rollups."""
+    Batch = apps.get_model('products', 'Batch')
+    ProviderSpend = apps.get_model('analytics', 'ProviderSpend')
+    CategoryWaste = apps.get_model('analytics', 'CategoryWaste')
+    batches = Batch.objects.using(schema_editor.connection.alias).order_by()
+    ProviderSpend.objects.using(schema_editor.connection.alias).bulk_create(
+        ProviderSpend(owner_id=row['owner'], provider_id=row['provider'], month=row['month'],
+                      amount=row['amount'], batches=row['count'])
+        for row in batches.annotate(month=TruncMonth('purchase')).values('owner', 'provider', 'month')
+        .annotate(amount=Sum(F('initial') * F('price')), count=Count('id')))
+    CategoryWaste.objects.using(schema_editor.connection.alias).bulk_create(
+        CategoryWaste(owner_id=row['owner'], category_id=row['product__category'], day=row['limit'],
+                      quantity=row['quantity'], amount=row['amount'], batches=row['count'])
+        for row in batches.filter(current__gt=0).values('owner', 'product__category', 'limit')
+        .annotate(quantity=Sum('current'), amount=Sum(F('current') * F('price')), count=Count('id')))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('providers', '0001_initial'),
+        ('products', '0003_batch_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderSpend',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('amount', models.FloatField(default=0.0)),
+                ('batches', models.IntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='providers.provider')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryWaste',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.FloatField(default=0.0)),
+                ('amount', models.FloatField(default=0.0)),
+                ('batches', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='categories.category')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='providerspend',
+            index=models.Index(fields=['owner', 'month'], name='provider_spend_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='providerspend',
+            constraint=models.UniqueConstraint(fields=('owner', 'provider', 'month'), name='provider_spend_bucket'),
+        ),
+        migrations.AddIndex(
+            model_name='categorywaste',
+            index=models.Index(fields=['owner', 'day'], name='category_waste_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='categorywaste',
+            constraint=models.UniqueConstraint(fields=('owner', 'category', 'day'), name='category_waste_bucket'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
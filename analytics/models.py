@@ -0,0 +1,82 @@
+"""This module defines the models of the analytics app.
+
+The rollups are maintained by triggers on the batches, see `analytics.rollups`.
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from categories.models import Category
+from providers.models import Provider
+
+
+class ProviderSpend(models.Model):
+    """
+    This class defines the monthly spend at a provider.
+
+    Attributes:
+        owner (User): The batches owner.
+        provider (Provider): The provider of the batches.
+        month (Date): The first day of the purchase month.
+        amount (float): The sum of the initial quantity by the unit price of the batches.
+        batches (int): The number of batches.
+    """
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    provider = models.ForeignKey(Provider, on_delete=models.CASCADE)
+    month = models.DateField()
+    amount = models.FloatField(default=0.0)
+    batches = models.IntegerField(default=0)
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            constraints (list(Constraint)): The bucket key, target of the trigger upserts.
+            indexes (list(Index)): The index of the date range queries.
+        """
+
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'provider', 'month'], name='provider_spend_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'month'], name='provider_spend_month_idx'),
+        ]
+
+
+class CategoryWaste(models.Model):
+    """
+    This class defines the stock of a category reaching its DLUO on a day.
+
+    The buckets before today are the waste: batches past their DLUO with a current quantity.
+
+    Attributes:
+        owner (User): The batches owner.
+        category (Category): The category of the batch products.
+        day (Date): The DLUO of the batches.
+        quantity (float): The sum of the current quantity of the batches.
+        amount (float): The sum of the current quantity by the unit price of the batches.
+        batches (int): The number of batches in stock.
+    """
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    day = models.DateField()
+    quantity = models.FloatField(default=0.0)
+    amount = models.FloatField(default=0.0)
+    batches = models.IntegerField(default=0)
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            constraints (list(Constraint)): The bucket key, target of the trigger upserts.
+            indexes (list(Index)): The index of the date range queries.
+        """
+
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'category', 'day'], name='category_waste_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'day'], name='category_waste_day_idx'),
+        ]
@@ -0,0 +1,152 @@
+"""This module maintains the analytics rollups of the batches.
+
+Every insert, update and delete of a batch applies its delta to the buckets with an
+upsert, in the same transaction, so the analytics never read the batches themselves.
+A delta is removed by upserting its opposite, and a bucket left without batches is
+deleted. Triggers cover every write path, including the set-based deletes.
+
+The archived batches are consumed, out of the waste, and still spent: the triggers of
+the archive apply them to the spend buckets, so archiving a batch leaves its bucket as
+it was, see `products.archive`.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from api.db import Trigger, install_triggers, plpgsql_trigger, uninstall_triggers
+from analytics.models import ProviderSpend, CategoryWaste
+from jobs.queue import job
+from products.models import ArchivedBatch, Batch
+
+
+_MONTH = {'sqlite': "date({}, 'start of month')", 'postgresql': "date_trunc('month', {})::date"}
+
+
+def _spend(row: str, sign: str, vendor: str = 'sqlite') -> str:
+    """Return the statement applying a batch to its spend bucket."""
+    return (f"INSERT INTO analytics_providerspend(owner_id, provider_id, month, amount, batches) "
+            f"VALUES ({row}.owner_id, {row}.provider_id, {_MONTH[vendor].format(f'{row}.purchase')}, "
+            f"{sign}{row}.initial * {row}.price, {sign}1) "
+            f"ON CONFLICT(owner_id, provider_id, month) DO UPDATE SET "
+            f"amount = analytics_providerspend.amount + excluded.amount, "
+            f"batches = analytics_providerspend.batches + excluded.batches;")
+
+
+_ADD_WASTE = ('ON CONFLICT(owner_id, category_id, day) DO UPDATE SET '
+              'quantity = analytics_categorywaste.quantity + excluded.quantity, '
+              'amount = analytics_categorywaste.amount + excluded.amount, '
+              'batches = analytics_categorywaste.batches + excluded.batches;')
+
+
+def _waste(row: str, sign: str) -> str:
+    """Return the statement applying a batch in stock to its waste bucket."""
+    return (f'INSERT INTO analytics_categorywaste(owner_id, category_id, day, quantity, amount, batches) '
+            f'SELECT {row}.owner_id, category_id, {row}."limit", {sign}{row}.current, '
+            f'{sign}{row}.current * {row}.price, {sign}1 '
+            f'FROM products_product WHERE id = {row}.product_id AND {row}.current > 0 ' + _ADD_WASTE)
+
+
+def _move_waste(category: str, sign: str) -> str:
+    """Return the statement applying the batches in stock of a product to the waste buckets of a category."""
+    return (f'INSERT INTO analytics_categorywaste(owner_id, category_id, day, quantity, amount, batches) '
+            f'SELECT owner_id, {category}, "limit", {sign}SUM(current), {sign}SUM(current * price), {sign}COUNT(*) '
+            f'FROM products_batch WHERE product_id = NEW.id AND current > 0 GROUP BY owner_id, "limit" ' + _ADD_WASTE)
+
+
+def _clean_spend(vendor: str = 'sqlite') -> str:
+    """Return the statement deleting the spend bucket of a deleted batch when left without batches."""
+    return ('DELETE FROM analytics_providerspend WHERE owner_id = OLD.owner_id AND provider_id = OLD.provider_id '
+            f"AND month = {_MONTH[vendor].format('OLD.purchase')} AND batches <= 0;")
+
+
+_CLEAN_WASTE = 'DELETE FROM analytics_categorywaste WHERE owner_id = OLD.owner_id AND day = OLD."limit" AND batches <= 0;'
+
+_CLEAN_CATEGORY = ('DELETE FROM analytics_categorywaste WHERE owner_id = OLD.owner_id '
+                   'AND category_id = OLD.category_id AND batches <= 0;')
+
+TRIGGERS = {
+    'sqlite': [
+        Trigger('analytics_batch_insert', 'products_batch',
+                'CREATE TRIGGER analytics_batch_insert AFTER INSERT ON products_batch BEGIN '
+                + _spend('NEW', '') + _waste('NEW', '') + ' END'),
+        Trigger('analytics_batch_update', 'products_batch',
+                'CREATE TRIGGER analytics_batch_update '
+                'AFTER UPDATE OF owner_id, product_id, provider_id, initial, current, price, purchase, "limit" '
+                'ON products_batch BEGIN '
+                + _spend('OLD', '-') + _waste('OLD', '-') + _clean_spend() + _CLEAN_WASTE
+                + _spend('NEW', '') + _waste('NEW', '') + ' END'),
+        Trigger('analytics_batch_delete', 'products_batch',
+                'CREATE TRIGGER analytics_batch_delete AFTER DELETE ON products_batch BEGIN '
+                + _spend('OLD', '-') + _waste('OLD', '-') + _clean_spend() + _CLEAN_WASTE + ' END'),
+        Trigger('analytics_product_update', 'products_product',
+                'CREATE TRIGGER analytics_product_update AFTER UPDATE OF category_id ON products_product '
+                'WHEN OLD.category_id != NEW.category_id BEGIN '
+                + _move_waste('OLD.category_id', '-') + _move_waste('NEW.category_id', '') + _CLEAN_CATEGORY
+                + ' END'),
+        Trigger('analytics_archive_insert', 'products_archivedbatch',
+                'CREATE TRIGGER analytics_archive_insert AFTER INSERT ON products_archivedbatch BEGIN '
+                + _spend('NEW', '') + ' END'),
+        Trigger('analytics_archive_delete', 'products_archivedbatch',
+                'CREATE TRIGGER analytics_archive_delete AFTER DELETE ON products_archivedbatch BEGIN '
+                + _spend('OLD', '-') + _clean_spend() + ' END'),
+    ],
+    'postgresql': [
+        plpgsql_trigger('analytics_batch_write', 'products_batch',
+                        'INSERT OR DELETE OR UPDATE OF owner_id, product_id, provider_id, initial, current, price, '
+                        'purchase, "limit"',
+                        "IF TG_OP != 'INSERT' THEN "
+                        + _spend('OLD', '-', 'postgresql') + _waste('OLD', '-')
+                        + _clean_spend('postgresql') + _CLEAN_WASTE
+                        + " END IF; IF TG_OP != 'DELETE' THEN "
+                        + _spend('NEW', '', 'postgresql') + _waste('NEW', '') + ' END IF;'),
+        plpgsql_trigger('analytics_product_update', 'products_product', 'UPDATE OF category_id',
+                        _move_waste('OLD.category_id', '-') + _move_waste('NEW.category_id', '') + _CLEAN_CATEGORY,
+                        'OLD.category_id != NEW.category_id'),
+        plpgsql_trigger('analytics_archive_write', 'products_archivedbatch', 'INSERT OR DELETE',
+                        f"IF TG_OP = 'INSERT' THEN {_spend('NEW', '', 'postgresql')} "
+                        f"ELSE {_spend('OLD', '-', 'postgresql')} {_clean_spend('postgresql')} END IF;"),
+    ],
+}
+
+
+def install(sender, using: str = 'default', **kwargs: dict):
+    """Install the triggers of the rollups on a database, after a migration."""
+    install_triggers(TRIGGERS, using, requires=[ProviderSpend._meta.db_table, CategoryWaste._meta.db_table])  # pylint: disable=protected-access
+
+
+def uninstall(sender, using: str = 'default', **kwargs: dict):
+    """Drop the triggers of the rollups from a database, before a migration."""
+    uninstall_triggers(TRIGGERS, using)
+
+
+@job
+def rebuild(using: str = 'default'):
+    """
+    Rebuild the rollups of a database from the batches.
+
+    Args:
+        using (str): The database alias.
+    """
+    batches = Batch.objects.using(using).order_by()  # pylint: disable=no-member
+    spends = {}
+    for model in (Batch, ArchivedBatch):
+        for row in (model.objects.using(using).order_by().annotate(month=TruncMonth('purchase'))  # pylint: disable=no-member
+                    .values('owner', 'provider', 'month')
+                    .annotate(amount=Sum(F('initial') * F('price')), count=Count('id')).iterator()):
+            key = (row['owner'], row['provider'], row['month'])
+            amount, count = spends.get(key, (0.0, 0))
+            spends[key] = (amount + row['amount'], count + row['count'])
+    wastes = (batches.filter(current__gt=0)
+              .values('owner', 'product__category', 'limit')
+              .annotate(quantity=Sum('current'), amount=Sum(F('current') * F('price')), count=Count('id')))
+    with transaction.atomic(using=using):
+        ProviderSpend.objects.using(using).all().delete()
+        CategoryWaste.objects.using(using).all().delete()
+        ProviderSpend.objects.using(using).bulk_create(
+            (ProviderSpend(owner_id=owner, provider_id=provider, month=month, amount=amount, batches=count)
+             for (owner, provider, month), (amount, count) in spends.items()),
+            batch_size=1000)
+        CategoryWaste.objects.using(using).bulk_create(
+            (CategoryWaste(owner_id=row['owner'], category_id=row['product__category'], day=row['limit'],
+                           quantity=row['quantity'], amount=row['amount'], batches=row['count'])
+             for row in wastes.iterator()),
+            batch_size=1000)
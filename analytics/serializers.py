@@ -0,0 +1,21 @@
+"""This module defines the serializers for the analytics app."""
+from rest_framework import serializers
+
+
+class PeriodSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer validating the period of an analytics view.
+
+    Attributes:
+        start (Date): The first day of the period, included.
+        end (Date): The last day of the period, included.
+    """
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        """Check the period is not reversed."""
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('The start of the period must precede its end.')
+        return attrs
@@ -0,0 +1,95 @@
+"""This module manages the tests for the analytics app."""
+import datetime
+from django.contrib.auth.models import User
+from django.test import TestCase
+from api.testing import connect
+from analytics import rollups
+from analytics.models import CategoryWaste, ProviderSpend
+from categories.models import Category
+from products.models import Batch, Product
+from products.purge import purge_providers
+from providers.models import Provider
+
+
+class RollupTriggersTests(TestCase):
+    """This class tests the rollups maintained by the triggers on the batches and products."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create an owner with two categories, a provider and a product."""
+        self.owner = User.objects.create(username='analyst')
+        self.categories = [Category.objects.create(owner=self.owner, label=label)  # pylint: disable=no-member
+                           for label in ('Dairy', 'Fresh')]
+        self.provider = Provider.objects.create(owner=self.owner, label='Shop', address='1 rue', city='Lyon',  # pylint: disable=no-member
+                                                zipcode='69000', phone='0400000000')
+        self.product = Product.objects.create(owner=self.owner, label='Milk', unit='L',  # pylint: disable=no-member
+                                              category=self.categories[0])
+
+    def batch(self, **fields: dict) -> Batch:
+        """Create a batch of the product, past its DLUO by default."""
+        values = {'initial': 4, 'current': 2, 'price': 1.5, 'purchase': datetime.date(2026, 1, 10),
+                  'limit': datetime.date(2026, 1, 20)}
+        values.update(fields)
+        return Batch.objects.create(owner=self.owner, product=self.product, provider=self.provider, **values)  # pylint: disable=no-member
+
+    @staticmethod
+    def spends() -> list:
+        """Return the spend buckets."""
+        return list(ProviderSpend.objects.values_list('month', 'amount', 'batches').order_by('month'))  # pylint: disable=no-member
+
+    @staticmethod
+    def wastes() -> list:
+        """Return the waste buckets."""
+        return list(CategoryWaste.objects.values_list('category__label', 'day', 'quantity', 'amount', 'batches')  # pylint: disable=no-member
+                    .order_by('category__label', 'day'))
+
+    def test_inserts_and_updates_move_the_buckets(self):
+        """Each batch write applies its delta to its spend and waste buckets."""
+        batch = self.batch()
+        self.batch(purchase=datetime.date(2026, 1, 25))
+        self.assertEqual(self.spends(), [(datetime.date(2026, 1, 1), 12.0, 2)])
+        self.assertEqual(self.wastes(), [('Dairy', datetime.date(2026, 1, 20), 4.0, 6.0, 2)])
+        batch.purchase, batch.price = datetime.date(2026, 2, 3), 2.0
+        batch.save()
+        self.assertEqual(self.spends(), [(datetime.date(2026, 1, 1), 6.0, 1), (datetime.date(2026, 2, 1), 8.0, 1)])
+        self.assertEqual(self.wastes(), [('Dairy', datetime.date(2026, 1, 20), 4.0, 7.0, 2)])
+
+    def test_consumed_and_deleted_batches_leave_the_buckets(self):
+        """A consumed batch leaves its waste bucket, a deleted one its spend bucket, and empty buckets go."""
+        batch = self.batch()
+        batch.current = 0
+        batch.save()
+        self.assertEqual(self.wastes(), [])
+        self.assertEqual(len(self.spends()), 1)
+        batch.delete()
+        self.assertEqual(self.spends(), [])
+
+    def test_product_category_change_moves_the_waste(self):
+        """Moving a product to another category moves the waste of its batches."""
+        self.batch()
+        self.product.category = self.categories[1]
+        self.product.save()
+        self.assertEqual(self.wastes(), [('Fresh', datetime.date(2026, 1, 20), 2.0, 3.0, 1)])
+
+    def test_set_based_deletes_are_rolled_up(self):
+        """The batches removed by a purge leave the rollups."""
+        self.batch()
+        purge_providers(self.owner, [self.provider.pk])
+        self.assertEqual((self.spends(), self.wastes()), ([], []))
+
+    def test_rebuild_matches_the_triggers(self):
+        """Rebuilding the rollups from the batches gives the buckets maintained by the triggers."""
+        self.batch()
+        self.batch(current=1, price=3.0, purchase=datetime.date(2026, 3, 1))
+        spends, wastes = self.spends(), self.wastes()
+        rollups.rebuild()
+        self.assertEqual((self.spends(), self.wastes()), (spends, wastes))
+
+    def test_views_are_scoped_to_the_owner(self):
+        """The analytics views answer the buckets of the connected user only."""
+        self.batch()
+        client = connect('viewer')
+        self.assertEqual(client.get('/analytics/spend/').json(), [])
+        self.assertEqual(client.get('/analytics/waste/').json(), [])
+        self.assertEqual(client.get('/analytics/spend/', {'start': '2026-02-01', 'end': '2026-01-01'}).status_code, 400)
@@ -0,0 +1,8 @@
+"""This module defines the routes for the analytics resources."""
+from django.urls import path
+from analytics.views import SpendView, WasteView
+
+urlpatterns = [
+    path('spend/', SpendView.as_view()),
+    path('waste/', WasteView.as_view())
+]
@@ -0,0 +1,98 @@
+"""This module manages the views of the analytics app."""
+import datetime
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from analytics.models import ProviderSpend, CategoryWaste
+from analytics.serializers import PeriodSerializer
+
+
+class SpendView(APIView):
+    """
+    This class manages the view of the monthly spend per provider.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request: Request, format=None) -> Response:
+        """
+        Retrieve the spend per provider for each month of the period.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The spend buckets, by month.
+            400: An error is detected on the request parameters.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+        """
+        serializer = PeriodSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        period = serializer.validated_data
+        buckets = ProviderSpend.objects.filter(owner=request.user)  # pylint: disable=no-member
+        if 'start' in period:
+            buckets = buckets.filter(month__gte=period['start'].replace(day=1))
+        if 'end' in period:
+            buckets = buckets.filter(month__lte=period['end'])
+        buckets = buckets.select_related('provider').order_by('month', 'provider__label')
+        return Response([{
+            'month': bucket.month,
+            'provider': {'id': bucket.provider_id, 'label': bucket.provider.label},
+            'amount': bucket.amount,
+            'batches': bucket.batches,
+        } for bucket in buckets])
+
+
+class WasteView(APIView):
+    """
+    This class manages the view of the waste per category.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request: Request, format=None) -> Response:
+        """
+        Retrieve the stock past its DLUO per category, for the DLUO of the period.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The waste of each category, most expensive first.
+            400: An error is detected on the request parameters.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+        """
+        serializer = PeriodSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        period = serializer.validated_data
+        yesterday = timezone.localdate() - datetime.timedelta(days=1)
+        buckets = CategoryWaste.objects.filter(owner=request.user,  # pylint: disable=no-member
+                                               day__lte=min(period.get('end', yesterday), yesterday))
+        if 'start' in period:
+            buckets = buckets.filter(day__gte=period['start'])
+        wastes = (buckets.values('category', 'category__label')
+                  .annotate(quantity=Sum('quantity'), amount=Sum('amount'), count=Sum('batches'))
+                  .order_by('-amount'))
+        return Response([{
+            'category': {'id': waste['category'], 'label': waste['category__label']},
+            'quantity': waste['quantity'],
+            'amount': waste['amount'],
+            'batches': waste['count'],
+        } for waste in wastes])
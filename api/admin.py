@@ -0,0 +1,150 @@
+"""This module defines the admin helpers shared by the api resources.
+
+The admin pages of the resources stay usable with millions of rows: they never count
+a whole table, never sort it out of its primary key, never load every related object
+in a widget and only search through indexes.
+
+The owned resources of the default shard are administered on the admin site, and the
+ones of each other shard on its own site, at `/admin/<shard>/`, see `api.admin_urls`.
+"""
+from functools import update_wrapper
+from typing import Callable, Optional, Tuple
+from django import forms
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from api.db import estimate_count
+from api.sharding import current_shard, routed, shard_of
+from search.index import matching_ids
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    This class defines a paginator estimating the size of the large lists.
+
+    An unfiltered list takes the estimated size of its table when it is large. A
+    filtered one is counted up to a limit, beyond which its last pages are not reached.
+
+    Attributes:
+        exact_limit (int): The size up to which a list is counted exactly.
+    """
+
+    exact_limit = 10000
+
+    @cached_property
+    def count(self) -> int:
+        """Return the estimated or exact size of the list."""
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_limit:
+                return estimate
+        return queryset.order_by()[:self.exact_limit + 1].count()
+
+
+class InStockFilter(admin.SimpleListFilter):
+    """This class defines the filter of the batches with a current quantity, served by a partial index."""
+
+    title = 'stock'
+    parameter_name = 'in_stock'
+
+    def lookups(self, request, model_admin):
+        """Return the choices of the filter."""
+        return [('1', 'In stock'), ('0', 'Consumed')]
+
+    def queryset(self, request, queryset: QuerySet) -> QuerySet:
+        """Filter the batches on their current quantity."""
+        if self.value() == '1':
+            return queryset.filter(current__gt=0)
+        if self.value() == '0':
+            return queryset.filter(current__lte=0)
+        return queryset
+
+
+class OwnedForm(forms.ModelForm):
+    """This class defines the form of an owned resource, whose owner must have its data on the shard of the site."""
+
+    def clean_owner(self) -> User:
+        """Refuse an owner whose data is on another shard than the one administered."""
+        owner = self.cleaned_data['owner']
+        database = shard_of(owner)
+        if database != (current_shard() or DEFAULT_DB_ALIAS):
+            raise forms.ValidationError(f'The data of this owner is on {database}, administered at /admin/{database}/.'
+                                        if database != DEFAULT_DB_ALIAS else
+                                        'The data of this owner is on the default shard, administered at /admin/.')
+        return owner
+
+
+class OwnedModelAdmin(admin.ModelAdmin):
+    """
+    This class defines the admin of the resources of an owner.
+
+    The search matches the identifier, the username of the owner, and the words of the
+    label through the search index. Each match is a subquery on an index of the table,
+    so their union stays indexed, unlike the `LIKE` filters of the default search.
+    The pages read and write the shard of their admin site, which only takes the owners
+    whose data is on it.
+
+    Attributes:
+        search_fields (tuple(str)): The fields searched, required by the autocomplete widgets.
+        indexed_search (tuple(str, int)): The lookup filtered by the search index and
+            the kind of the indexed objects, or None.
+    """
+
+    form = OwnedForm
+    raw_id_fields = ('owner',)
+    list_select_related = ('owner',)
+    search_fields = ('owner__username',)
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    indexed_search: Optional[Tuple[str, int]] = None
+
+    def get_search_results(self, request, queryset: QuerySet, search_term: str):
+        """Return the objects matching the search by identifier, owner or indexed label."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        matches = Q(owner__in=User.objects.filter(username=search_term).values('pk'))
+        if search_term.isdigit():
+            matches |= Q(pk=int(search_term))
+        if self.indexed_search is not None:
+            lookup, kind = self.indexed_search
+            ids = matching_ids(kind, search_term, queryset.db)
+            if ids is not None:
+                matches |= Q(**{f'{lookup}__in': ids})
+        return queryset.filter(matches), False
+
+
+class ShardAdminSite(admin.AdminSite):
+    """
+    This class defines the admin site of the owned resources of a shard other than the default one.
+
+    Every view of the site routes the queries on the owned models to its shard, as the
+    authentication of the api does for a request: its lists, forms, autocompletes and
+    deletes read and write the shard.
+
+    Attributes:
+        database (str): The alias of the shard.
+    """
+
+    def __init__(self, database: str):
+        """Create the site of a shard, registering the admin of the owned resources of the admin site."""
+        super().__init__(name=f'admin_{database}')
+        self.database = database
+        self.site_header = f'{admin.site.site_header}: {database}'
+        for model, model_admin in admin.site._registry.items():  # pylint: disable=protected-access
+            if isinstance(model_admin, OwnedModelAdmin):
+                self.register(model, type(model_admin))
+
+    def admin_view(self, view: Callable, cacheable: bool = False) -> Callable:
+        """Return an admin view of the site, routed to its shard."""
+        protected = super().admin_view(view, cacheable)
+
+        def inner(request, *args: tuple, **kwargs: dict):
+            with routed(self.database):
+                return protected(request, *args, **kwargs)
+        return update_wrapper(inner, protected)
@@ -0,0 +1,20 @@
+"""This module routes the admin sites, imported on the first admin request.
+
+The `admin` modules of the apps register their models on import, so they are
+discovered here rather than when the apps are ready, see `api.apps.AdminConfig`.
+The owned resources of each shard other than the default one have their own site,
+routed under the name of the shard, see `api.admin.ShardAdminSite`.
+"""
+from django.contrib import admin
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import path
+from api.admin import ShardAdminSite
+from api.sharding import shards
+
+admin.autodiscover()
+
+urlpatterns = [
+    path(f'{database}/', ShardAdminSite(database).urls) for database in shards() if database != DEFAULT_DB_ALIAS
+] + [
+    path('', admin.site.urls),
+]
@@ -0,0 +1,38 @@
+"""This module defines the configuration for the api app and for the admin site."""
+from django.apps import AppConfig
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.contrib.admin.checks import check_admin_app, check_dependencies
+from django.core import checks
+
+
+class ApiConfig(AppConfig):
+    """
+    This class defines the configuration for the api app, which holds the shared code and commands.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'api'
+
+
+def check_discovered_admin(app_configs: list, **kwargs: dict) -> list:
+    """Check the admin classes of the apps, discovering them first."""
+    from django.contrib.admin import autodiscover  # pylint: disable=import-outside-toplevel
+    autodiscover()
+    return check_admin_app(app_configs, **kwargs)
+
+
+class AdminConfig(SimpleAdminConfig):
+    """
+    This class defines the configuration for the admin site, loaded on its first request.
+
+    The `admin` modules of the apps are not imported at start-up but by `api.admin_urls`,
+    the URL configuration of the admin site, which is only imported once an admin page is
+    requested or the URLs are checked.
+    """
+
+    def ready(self):
+        """Register the checks of the admin site, the admin classes being discovered by them."""
+        checks.register(check_dependencies, checks.Tags.admin)
+        checks.register(check_discovered_admin, checks.Tags.admin)
@@ -2,6 +2,9 @@
 ASGI config for api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The stream of the changes is served by the ASGI application itself, so its idle
+connections never hold a Django worker; every other path goes to Django, through
+the lean middleware chain of the api outside of the admin, see `api.handlers`.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -9,8 +12,20 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
-application = get_asgi_application()
+from api.handlers import get_asgi_application  # noqa: E402 pylint: disable=wrong-import-position
+
+django_application = get_asgi_application()
+
+from changes.stream import stream  # noqa: E402 pylint: disable=wrong-import-position
+
+STREAM_PATH = '/changes/'
+
+
+async def application(scope, receive, send):
+    """Route the stream of the changes to its application and the other requests to Django."""
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
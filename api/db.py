@@ -0,0 +1,326 @@
+"""This module defines the database helpers shared by the api apps.
+
+Some derived data (search index, rollups, ...) is maintained by triggers, so that
+every write path, including set-based statements, keeps it up to date. The SQLite
+schema editor rebuilds a table to alter it, which drops its triggers or fails on the
+ones referencing it, so triggers are not created by migrations: they are dropped
+before each `migrate` and installed again after it. The triggers are written for each
+database vendor, SQLite and PostgreSQL, whose triggers run a PL/pgSQL function.
+
+The handlers installing them are connected with `connect_installs`, which records them
+so that `install_all` runs them again on a database already migrated, at each start.
+"""
+import pkgutil
+from importlib import import_module
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+from django.apps import AppConfig, apps
+from django.db import connections, migrations, transaction
+from django.db.models import Prefetch, QuerySet, prefetch_related_objects
+from django.db.models.signals import post_migrate, pre_migrate
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+
+class Trigger(NamedTuple):
+    """
+    This class defines a trigger maintaining derived data.
+
+    Attributes:
+        name (str): The trigger name.
+        table (str): The table the trigger is attached to.
+        sql (str): The statement creating the trigger.
+    """
+
+    name: str
+    table: str
+    sql: str
+
+
+class RunVendorSQL(migrations.RunSQL):
+    """
+    This class defines a migration operation running raw SQL on the databases of one vendor.
+
+    Attributes:
+        vendor (str): The database vendor, as given by `connection.vendor`.
+    """
+
+    def __init__(self, vendor: str, *args: tuple, **kwargs: dict):
+        """Initialize the operation for the vendor."""
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        """Return the arguments to serialize the operation."""
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        """Run the SQL if the database belongs to the vendor."""
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        """Run the reverse SQL if the database belongs to the vendor."""
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def plpgsql_trigger(name: str, table: str, events: str, body: str, when: str = '') -> Trigger:
+    """
+    Return a PostgreSQL trigger running statements after the writes to each row of a table.
+
+    Args:
+        name (str): The name of the trigger and of its function.
+        table (str): The table the trigger is attached to.
+        events (str): The writes firing the trigger, as `INSERT OR UPDATE OF column`.
+        body (str): The PL/pgSQL statements, reading the `NEW` and `OLD` rows.
+        when (str): The condition on the rows firing the trigger, if any.
+
+    Returns:
+        Trigger: The trigger, created with its function.
+    """
+    return Trigger(name, table,
+                   f'CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$ '
+                   f'BEGIN {body} RETURN NULL; END $$; '
+                   f'CREATE TRIGGER {name} AFTER {events} ON {table} FOR EACH ROW '
+                   f'{f"WHEN ({when}) " if when else ""}EXECUTE FUNCTION {name}()')
+
+
+def _drop(connection, trigger: Trigger) -> str:
+    """Return the statement dropping a trigger."""
+    if connection.vendor == 'sqlite':
+        return f'DROP TRIGGER IF EXISTS {trigger.name}'
+    return f'DROP TRIGGER IF EXISTS {trigger.name} ON {trigger.table}'
+
+
+INSTALLS: List[Tuple[Callable, AppConfig]] = []
+
+
+def connect_installs(sender: AppConfig, install: Callable, uninstall: Optional[Callable] = None):
+    """
+    Run the handlers of an app maintaining the database objects its migrations do not create.
+
+    Args:
+        sender (AppConfig): The app.
+        install (Callable): The `post_migrate` handler, also run by `install_all`.
+        uninstall (Callable): The `pre_migrate` handler, if any.
+    """
+    if uninstall is not None:
+        pre_migrate.connect(uninstall, sender=sender)
+    post_migrate.connect(install, sender=sender)
+    INSTALLS.append((install, sender))
+
+
+def install_all(using: str):
+    """
+    Run the `post_migrate` handlers of `connect_installs` on a database already migrated.
+
+    Args:
+        using (str): The database alias.
+    """
+    for install, sender in INSTALLS:
+        install(sender=sender, using=using, app_config=sender)
+
+
+def install_triggers(triggers: Dict[str, List[Trigger]], using: str, requires: Iterable[str] = ()):
+    """
+    Create again triggers on a database.
+
+    Nothing is installed while a table they read or write is not migrated yet. The
+    triggers are replaced in a transaction, so that no write misses them meanwhile.
+
+    Args:
+        triggers (dict(str, list(Trigger))): The triggers by database vendor.
+        using (str): The database alias.
+        requires (Iterable(str)): The tables the triggers write to.
+    """
+    connection = connections[using]
+    vendor_triggers = triggers.get(connection.vendor, [])
+    tables = set(connection.introspection.table_names())
+    if not tables.issuperset([trigger.table for trigger in vendor_triggers] + list(requires)):
+        return
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for trigger in vendor_triggers:
+            cursor.execute(_drop(connection, trigger))
+            cursor.execute(trigger.sql)
+
+
+def uninstall_triggers(triggers: Dict[str, List[Trigger]], using: str):
+    """
+    Drop triggers from a database.
+
+    Args:
+        triggers (dict(str, list(Trigger))): The triggers by database vendor.
+        using (str): The database alias.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for trigger in triggers.get(connection.vendor, []):
+            cursor.execute(_drop(connection, trigger))
+
+
+def estimate_count(model, using: str) -> Optional[int]:
+    """
+    Estimate the number of rows of the table of a model, without counting them.
+
+    Both databases give the row count of the statistics of their last `ANALYZE`, from
+    `pg_class` on PostgreSQL and `sqlite_stat1` on SQLite, and no estimate without them.
+
+    Args:
+        model (Model): The model of the table.
+        using (str): The database alias.
+
+    Returns:
+        int: The estimated count, or None when the database cannot estimate it.
+    """
+    connection = connections[using]
+    table = model._meta.db_table  # pylint: disable=protected-access
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [connection.ops.quote_name(table)])
+        elif connection.vendor == 'sqlite' and 'sqlite_stat1' in connection.introspection.table_names(cursor):
+            cursor.execute("SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s ORDER BY idx IS NULL LIMIT 1",
+                           [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def reserve_ids(model, using: str, start: int):
+    """
+    Make the auto-incremented keys of the table of a model start above a value.
+
+    The keys already allocated above the value are kept, so it can be called after
+    every migration.
+
+    Args:
+        model (Model): The model of the table.
+        using (str): The database alias.
+        start (int): The last key that must not be allocated.
+    """
+    connection = connections[using]
+    table = model._meta.db_table  # pylint: disable=protected-access
+    if not start or table not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, model._meta.pk.column])  # pylint: disable=protected-access
+            sequence = cursor.fetchone()[0]
+            cursor.execute('SELECT setval(%s, %s) WHERE COALESCE(pg_sequence_last_value(%s::regclass), 0) < %s',
+                           [sequence, start, sequence, start])
+        elif connection.vendor == 'sqlite':
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [start, table, start])
+            cursor.execute('INSERT INTO sqlite_sequence(name, seq) SELECT %s, %s '
+                           'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)', [table, start, table])
+
+
+def allocated_id(model, using: str) -> int:
+    """
+    Return the auto-incremented key the table of a model allocates the next one after.
+
+    PostgreSQL allocates after the last value of the sequence, whatever the keys inserted
+    explicitly; SQLite after the largest key of the table when it is above its sequence.
+
+    Args:
+        model (Model): The model of the table.
+        using (str): The database alias.
+
+    Returns:
+        int: The last key allocated, 0 if none.
+    """
+    connection = connections[using]
+    table = model._meta.db_table  # pylint: disable=protected-access
+    column = model._meta.pk.column  # pylint: disable=protected-access
+    if table not in connection.introspection.table_names():
+        return 0
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT COALESCE(pg_sequence_last_value(pg_get_serial_sequence(%s, %s)::regclass), 0)',
+                           [table, column])
+        else:
+            cursor.execute(f'SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = %s), 0), '
+                           f'COALESCE((SELECT MAX({column}) FROM {table}), 0))', [table])
+        return cursor.fetchone()[0]
+
+
+def create_database(using: str) -> bool:
+    """
+    Create the PostgreSQL database of an alias when it does not exist, as the one of a new shard.
+
+    The SQLite databases are created by their first connection.
+
+    Args:
+        using (str): The database alias.
+
+    Returns:
+        bool: Whether the database was created.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    name = connection.settings_dict['NAME']
+    with connection._nodb_cursor() as cursor:  # pylint: disable=protected-access
+        cursor.execute('SELECT 1 FROM pg_database WHERE datname = %s', [name])
+        if cursor.fetchone():
+            return False
+        cursor.execute(f'CREATE DATABASE {connection.ops.quote_name(name)}')
+    return True
+
+
+def chunks(queryset: QuerySet, size: int = 2000, *lookups: Union[str, Prefetch]) -> Iterator[list]:
+    """
+    Read the objects of a large queryset by chunks, without loading them all.
+
+    The rows are read with `iterator`, from a server-side cursor on PostgreSQL, and the
+    related objects are prefetched for each chunk, as `iterator` does not prefetch them.
+
+    Args:
+        queryset (QuerySet): The objects to read.
+        size (int): The number of objects of a chunk.
+        lookups (str or Prefetch): The related objects prefetched.
+
+    Returns:
+        Iterator(list): The chunks of objects.
+    """
+    rows = queryset.iterator(chunk_size=size)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        prefetch_related_objects(chunk, *lookups)
+        yield chunk
+
+
+def pending_migrations(using: str) -> Set[Tuple[str, str]]:
+    """
+    Return the migrations of the apps not recorded as applied to a database.
+
+    The migrations are listed from the files of the migration packages, without being
+    imported nor ordered in a graph, so that checking an up to date database is fast.
+    A squashed migration is pending until `migrate` records it, which is a safe default.
+
+    Args:
+        using (str): The database alias.
+
+    Returns:
+        set(tuple(str, str)): The app label and name of each pending migration.
+    """
+    found = set()
+    for config in apps.get_app_configs():
+        name, _ = MigrationLoader.migrations_module(config.label)
+        try:
+            package = import_module(name) if name else None
+        except ImportError:
+            continue
+        if package is not None and hasattr(package, '__path__'):
+            found.update((config.label, module.name) for module in pkgutil.iter_modules(package.__path__)
+                         if not module.ispkg and module.name[0] not in '_~')
+    recorder = MigrationRecorder(connections[using])
+    if not recorder.has_table():
+        return found
+    return found - set(recorder.applied_migrations())
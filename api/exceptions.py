@@ -0,0 +1,20 @@
+"""This module defines the exceptions shared by the api resources."""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    """This class defines the error of a conditional write on a resource modified since it was read."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource was modified since the version given by If-Match.'
+    default_code = 'precondition_failed'
+
+
+class Moving(APIException):
+    """This class defines the error of a request on data being moved to another shard."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The data of the user is being moved, retry later.'
+    default_code = 'moving'
+    wait = 1
@@ -0,0 +1,90 @@
+"""This module serves the api requests through a lean middleware chain.
+
+The token authenticated clients use neither the sessions, the CSRF protection, the
+messages nor the frame options, so the api paths are handled by a second Django
+handler loaded with `API_MIDDLEWARE`, and only the paths of `FULL_MIDDLEWARE_PATHS`,
+the admin site, go through the full `MIDDLEWARE` chain.
+"""
+from typing import Callable
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+
+class LeanMiddlewareMixin:
+    """
+    This class loads the middleware chain of the api in a Django handler.
+
+    The chain is built as `BaseHandler.load_middleware` builds the one of `MIDDLEWARE`,
+    each middleware adapted to the sync or async mode of the handler it wraps.
+    """
+
+    def load_middleware(self, is_async: bool = False):
+        """Load the `API_MIDDLEWARE` chain, at the start of the process."""
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+        handler = convert_exception_to_response(self._get_response_async if is_async else self._get_response)
+        handler_is_async = is_async
+        for path in reversed(settings.API_MIDDLEWARE):
+            middleware = import_string(path)
+            can_sync, can_async = getattr(middleware, 'sync_capable', True), getattr(middleware, 'async_capable', False)
+            if not can_sync and not can_async:
+                raise RuntimeError(f'Middleware {path} must have at least one of sync_capable/async_capable set to True.')
+            middleware_is_async = can_async if handler_is_async or not can_sync else False
+            try:
+                handler = self.adapt_method_mode(middleware_is_async, handler, handler_is_async,
+                                                 debug=settings.DEBUG, name=f'middleware {path}')
+                instance = middleware(handler)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured(f'Middleware factory {path} returned None.')
+            if hasattr(instance, 'process_view'):
+                self._view_middleware.insert(0, self.adapt_method_mode(is_async, instance.process_view))
+            if hasattr(instance, 'process_template_response'):
+                self._template_response_middleware.append(self.adapt_method_mode(is_async, instance.process_template_response))
+            if hasattr(instance, 'process_exception'):
+                self._exception_middleware.append(self.adapt_method_mode(False, instance.process_exception))
+            handler = convert_exception_to_response(instance)
+            handler_is_async = middleware_is_async
+        self._middleware_chain = self.adapt_method_mode(is_async, handler, handler_is_async)
+
+
+class LeanWSGIHandler(LeanMiddlewareMixin, WSGIHandler):
+    """This class defines the WSGI handler of the api requests."""
+
+
+class LeanASGIHandler(LeanMiddlewareMixin, ASGIHandler):
+    """This class defines the ASGI handler of the api requests."""
+
+
+def is_full(path: str) -> bool:
+    """Return whether a path goes through the full middleware chain."""
+    return path.startswith(tuple(settings.FULL_MIDDLEWARE_PATHS))
+
+
+def get_wsgi_application() -> Callable:
+    """Return the WSGI application sending each request to the chain of its path."""
+    django.setup(set_prefix=False)
+    full, lean = WSGIHandler(), LeanWSGIHandler()
+
+    def application(environ: dict, start_response: Callable):
+        """Handle a request with the handler of its path."""
+        return (full if is_full(environ.get('PATH_INFO', '')) else lean)(environ, start_response)
+    return application
+
+
+def get_asgi_application() -> Callable:
+    """Return the ASGI application sending each request to the chain of its path."""
+    django.setup(set_prefix=False)
+    full, lean = ASGIHandler(), LeanASGIHandler()
+
+    async def application(scope: dict, receive: Callable, send: Callable):
+        """Handle a request with the handler of its path."""
+        await (full if is_full(scope.get('path', '')) else lean)(scope, receive, send)
+    return application
@@ -0,0 +1,55 @@
+"""This module caches the labels of the categories and providers of each owner.
+
+The categories and providers of an owner are a few rows, read by every product and
+batch to validate their references and to render their labels. Each process keeps the
+maps of their identifiers to their labels for the owners lately seen, and checks them
+against the catalog version of the owner, incremented by triggers on every write to
+them, see `authentication.versions`. A request costs a lookup of the version instead
+of a query per object, and a map is read again after a write only.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple, Type
+from django.db import models, router
+from authentication.models import OwnerVersion
+from categories.models import Category
+from providers.models import Provider
+
+MAX_OWNERS = 1000
+
+Labels = Dict[Type[models.Model], Dict[int, str]]
+
+_maps: 'OrderedDict[Tuple[str, int], Tuple[int, Labels]]' = OrderedDict()
+
+_lock = threading.Lock()
+
+
+def labels_of(owner_id: int, using: str = None) -> Labels:
+    """
+    Return the labels of the categories and providers of an owner, by model and identifier.
+
+    The version is read before the labels, so a map is never older than its version.
+
+    Args:
+        owner_id (int): The owner of the categories and providers.
+        using (str): The database alias, the shard of the current request by default.
+
+    Returns:
+        dict(Model, dict(int, str)): The labels of the categories and of the providers.
+    """
+    using = using or router.db_for_read(Category)
+    key = (using, owner_id)
+    version = OwnerVersion.catalog_of(owner_id, using)
+    with _lock:
+        cached = _maps.get(key)
+        if cached is not None and cached[0] == version:
+            _maps.move_to_end(key)
+            return cached[1]
+    labels = {model: dict(model.objects.using(using).filter(owner=owner_id).values_list('pk', 'label'))  # pylint: disable=no-member
+              for model in (Category, Provider)}
+    with _lock:
+        _maps[key] = (version, labels)
+        _maps.move_to_end(key)
+        while len(_maps) > MAX_OWNERS:
+            _maps.popitem(last=False)
+    return labels
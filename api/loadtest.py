@@ -0,0 +1,336 @@
+"""This module replays the requests of the Insomnia collection as a load test.
+
+The collection, `tools/insomnia.json`, holds a request per route and method, grouped by
+resource. Its requests are chained into weighted scenarios, and each virtual user, a
+thread with its own keep-alive connection, registers, logs in and seeds its own data
+through the api, then runs scenarios drawn by weight until the end of the test.
+
+The identifiers of the collection are replaced by the ones of the user data: a numeric
+path segment takes an identifier of the resource named before it, and the `category`
+and `provider` fields of the bodies an identifier of the user categories and providers.
+A scenario keeps working on the resources it used or created first, and deletes the
+ones it created, so the seeded data keeps its size.
+"""
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+PASSWORD = 'load-test-password'
+
+SEED_CATEGORIES = 3
+
+SEED_PROVIDERS = 3
+
+TIMEOUT = 30.0
+
+REFERENCES = {'category': 'categories', 'provider': 'providers'}
+
+
+class Request(NamedTuple):
+    """
+    This class defines a request of the collection.
+
+    Attributes:
+        method (str): The HTTP method.
+        path (str): The path, with the identifiers of the collection.
+        headers (dict(str, str)): The headers, the authorization excepted.
+        body (dict): The JSON body, None without body.
+        authorization (str): The prefix of the token authorization, None without authorization.
+    """
+
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: Optional[dict]
+    authorization: Optional[str]
+
+
+class Scenario(NamedTuple):
+    """
+    This class defines a scenario, a sequence of requests of the collection run by a user.
+
+    Attributes:
+        name (str): The scenario name.
+        weight (int): The relative frequency of the scenario.
+        steps (list(str)): The requests, named `group/name` after the collection.
+    """
+
+    name: str
+    weight: int
+    steps: List[str]
+
+
+SCENARIOS = [
+    Scenario('login', 1, ['authentication/login', 'products/list']),
+    Scenario('browse', 6, ['products/list', 'products/get', 'batches/list', 'batches/get']),
+    Scenario('stock', 3, ['batches/create', 'batches/update', 'batches/get', 'batches/delete']),
+    Scenario('catalog', 1, ['products/create', 'products/update', 'products/get', 'products/delete']),
+]
+
+
+def load_collection(path: str) -> Dict[str, Request]:
+    """
+    Read the requests of an Insomnia collection.
+
+    Args:
+        path (str): The path of the exported collection.
+
+    Returns:
+        dict(str, Request): The requests by `group/name`.
+    """
+    with open(path, encoding='utf-8') as collection:
+        resources = json.load(collection)['resources']
+    groups = {resource['_id']: resource['name'] for resource in resources if resource['_type'] == 'request_group'}
+    requests = {}
+    for resource in resources:
+        if resource['_type'] != 'request' or resource.get('parentId') not in groups:
+            continue
+        text = (resource.get('body') or {}).get('text')
+        authentication = resource.get('authentication') or {}
+        requests[f'{groups[resource["parentId"]]}/{resource["name"]}'] = Request(
+            resource['method'], urlsplit(resource['url'].replace('{{ api_uri }}', '')).path,
+            {header['name']: header['value'] for header in resource.get('headers', [])},
+            json.loads(text) if text else None,
+            authentication.get('prefix', 'Token') if authentication.get('type') == 'bearer' else None)
+    return requests
+
+
+def percentile(durations: List[float], rank: float) -> float:
+    """Return a percentile of sorted durations, by the nearest rank."""
+    return durations[max(math.ceil(rank * len(durations)) - 1, 0)]
+
+
+class VirtualUser(threading.Thread):
+    """
+    This class defines a virtual user, replaying the scenarios on its own connection.
+
+    Attributes:
+        test (LoadTest): The load test of the user.
+        username (str): The name the user registers with.
+        token (str): The token of the user, once logged in.
+        ids (dict(str, list(int))): The identifiers of the seeded data by resource, the
+            batches by product under `batches/<product>`.
+        samples (list(tuple(str, float, int))): The measured requests: their name,
+            duration and status, 0 when the connection failed.
+        connection (HTTPConnection): The keep-alive connection, None until opened.
+        random (Random): The draws of the user, seeded by its name.
+    """
+
+    def __init__(self, test: 'LoadTest', username: str):
+        """Create a user without data."""
+        super().__init__(daemon=True)
+        self.test = test
+        self.username = username
+        self.token: Optional[str] = None
+        self.ids: Dict[str, List[int]] = defaultdict(list)
+        self.samples: List[Tuple[str, float, int]] = []
+        self.connection: Optional[http.client.HTTPConnection] = None
+        self.random = random.Random(username)
+
+    def send(self, name: str, chosen: Dict[str, int], fields: dict = None) -> Tuple[int, Optional[dict]]:
+        """
+        Send a request of the collection, with the identifiers of the user data.
+
+        Args:
+            name (str): The request, as `group/name`.
+            chosen (dict(str, int)): The identifiers used by the scenario, by collection.
+            fields (dict): The fields replacing the ones of the body.
+
+        Returns:
+            tuple(int, dict): The status, 0 when the connection failed, and the JSON response.
+        """
+        request = self.test.requests[name]
+        segments = request.path.split('/')
+        for index, segment in enumerate(segments):
+            if segment.isdigit():
+                segments[index] = str(self.pick(segments[index - 1], chosen))
+        headers = dict(request.headers)
+        if request.authorization and self.token:
+            headers['Authorization'] = f'{request.authorization} {self.token}'
+        body = None
+        if request.body is not None:
+            values = dict(request.body)
+            for field, collection in REFERENCES.items():
+                if field in values:
+                    values[field] = self.pick(collection, chosen)
+            body = json.dumps(dict(values, **(fields or {}))).encode()
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.test.connect()
+            self.connection.request(request.method, '/'.join(segments), body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            content, status = b'', 0
+        if self.test.measuring:
+            self.samples.append((name, time.perf_counter() - start, status))
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    def pick(self, collection: str, chosen: Dict[str, int]) -> int:
+        """Return the identifier of a resource used by the scenario, choosing a seeded one the first time."""
+        if collection not in chosen:
+            seeded = self.ids.get(f'batches/{chosen.get("products")}' if collection == 'batches' else collection)
+            chosen[collection] = self.random.choice(seeded or [0])
+        return chosen[collection]
+
+    def create(self, name: str, chosen: Dict[str, int], fields: dict = None) -> Optional[int]:
+        """Create a resource with a request of the collection, and return its identifier."""
+        status, content = self.send(name, chosen, fields)
+        return content['id'] if status == 201 and content else None
+
+    def seed(self) -> bool:
+        """Register, log in and create the data of the user, and return whether it succeeded."""
+        status, _ = self.send('authentication/register', {}, {'username': self.username, 'password': PASSWORD})
+        if status != 201 or not self.login():
+            return False
+        for collection, count in (('categories', SEED_CATEGORIES), ('providers', SEED_PROVIDERS),
+                                  ('products', self.test.products)):
+            for _ in range(count):
+                self.ids[collection].append(self.create(f'{collection}/create', {}))
+        for product in list(self.ids['products']):
+            for _ in range(self.test.batches):
+                self.ids[f'batches/{product}'].append(self.create('batches/create', {'products': product}))
+        return all(ids and None not in ids for ids in self.ids.values())
+
+    def login(self) -> bool:
+        """Log in and keep the token, and return whether it succeeded."""
+        status, content = self.send('authentication/login', {}, {'username': self.username, 'password': PASSWORD})
+        if status == 200 and content:
+            self.token = content['token']
+        return status == 200
+
+    def play(self, scenario: Scenario):
+        """Run a scenario, stopped by its first failed request, and delete the resources it created."""
+        chosen: Dict[str, int] = {}
+        created: List[str] = []
+        for step in scenario.steps:
+            collection, _, action = step.partition('/')
+            if step == 'authentication/login':
+                succeeded = self.login()
+            elif action == 'create':
+                chosen[collection] = self.create(step, chosen)
+                succeeded = chosen[collection] is not None
+                if succeeded:
+                    created.append(collection)
+            else:
+                status, _ = self.send(step, chosen)
+                succeeded = 200 <= status < 300
+                if action == 'delete' and succeeded and collection in created:
+                    created.remove(collection)
+            if not succeeded or time.monotonic() >= self.test.deadline:
+                break
+        for collection in reversed(created):
+            self.send(f'{collection}/delete', chosen)
+
+    def run(self):
+        """Seed the data, wait for the other users, then run scenarios until the end of the test."""
+        seeded = self.seed()
+        self.test.barrier.wait()
+        if not seeded:
+            self.test.failed.append(self.username)
+            return
+        scenarios = self.test.scenarios
+        weights = [scenario.weight for scenario in scenarios]
+        while time.monotonic() < self.test.deadline:
+            self.play(self.random.choices(scenarios, weights)[0])
+            if self.test.think:
+                time.sleep(self.random.uniform(0, 2 * self.test.think))
+
+
+class LoadTest:
+    """
+    This class defines a load test of a running server.
+
+    Attributes:
+        url (str): The URL of the server.
+        requests (dict(str, Request)): The requests of the collection.
+        scenarios (list(Scenario)): The scenarios drawn by the users.
+        users (int): The number of concurrent virtual users.
+        products (int): The number of products seeded by each user.
+        batches (int): The number of batches seeded by product.
+        think (float): The mean pause of a user between two scenarios, in seconds.
+        prefix (str): The prefix of the usernames.
+        measuring (bool): Whether the requests are measured.
+        deadline (float): The monotonic time the scenarios end at.
+        barrier (Barrier): The start of the measures, once every user is seeded.
+        failed (list(str)): The users whose seeding failed.
+    """
+
+    def __init__(self, url: str, requests: Dict[str, Request], scenarios: List[Scenario], users: int,
+                 products: int, batches: int, think: float, prefix: str):
+        """Create a load test."""
+        self.url = urlsplit(url)
+        self.requests = requests
+        self.scenarios = scenarios
+        self.users = users
+        self.products = products
+        self.batches = batches
+        self.think = think
+        self.prefix = prefix
+        self.measuring = False
+        self.deadline = math.inf
+        self.barrier = threading.Barrier(users + 1)
+        self.failed: List[str] = []
+
+    def connect(self) -> http.client.HTTPConnection:
+        """Open a connection to the server."""
+        connection = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        return connection(self.url.hostname, self.url.port, timeout=TIMEOUT)
+
+    def run(self, duration: float) -> dict:
+        """
+        Seed the users, run their scenarios for a duration and report the measures.
+
+        Args:
+            duration (float): The seconds the scenarios are run for.
+
+        Returns:
+            dict: The `duration` of the measures, the users whose seeding `failed`, and the
+                measures of all the requests, under `total`, and of each one, under `requests`:
+                their `count`, `throughput`, `errors` and `throttled` rates, and `p50`, `p90`,
+                `p99` and `max` durations.
+        """
+        users = [VirtualUser(self, f'{self.prefix}{index}') for index in range(self.users)]
+        for user in users:
+            user.start()
+        self.barrier.wait()
+        self.measuring = True
+        start = time.monotonic()
+        self.deadline = start + duration
+        for user in users:
+            user.join()
+        elapsed = time.monotonic() - start
+        samples = defaultdict(list)
+        for user in users:
+            for name, seconds, status in user.samples:
+                samples[name].append((seconds, status))
+        every = [sample for measures in samples.values() for sample in measures]
+        return {'duration': elapsed, 'failed': self.failed, 'total': self.summarize(every, elapsed),
+                'requests': {name: self.summarize(measures, elapsed) for name, measures in sorted(samples.items())}}
+
+    @staticmethod
+    def summarize(samples: List[Tuple[float, int]], elapsed: float) -> dict:
+        """Return the throughput, the error and throttle rates and the latency percentiles of samples."""
+        durations = sorted(seconds for seconds, _ in samples)
+        statuses = [status for _, status in samples]
+        throttled = statuses.count(429)
+        errors = sum(1 for status in statuses if not 200 <= status < 400) - throttled
+        return {'count': len(samples), 'throughput': len(samples) / elapsed if elapsed else 0.0,
+                'errors': errors / len(samples) if samples else 0.0,
+                'throttled': throttled / len(samples) if samples else 0.0,
+                **{f'p{rank}': percentile(durations, rank / 100) if durations else 0.0 for rank in (50, 90, 99)},
+                'max': durations[-1] if durations else 0.0}
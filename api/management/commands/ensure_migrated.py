@@ -0,0 +1,38 @@
+"""This module defines the command migrating the databases only when they are behind."""
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from api.db import create_database, install_all, pending_migrations
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command migrating the databases only when they are behind.
+
+    A database whose migrations are all recorded is not migrated, without the cost of a
+    full `migrate`: the system checks, the migration graph and the post-migrate handlers.
+    Its triggers and identifier blocks are installed again though, see `api.db.install_all`,
+    so that a trigger changed without a migration is deployed at the next start. The others
+    are migrated. The PostgreSQL databases missing, the ones of new shards, are created first.
+    """
+
+    help = 'Migrate the databases with pending migrations, and only them.'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        """Add the database option."""
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A database to check, repeated for several ones, every database by default.')
+
+    def handle(self, *args, **options):
+        """Check each database and migrate the ones behind."""
+        for database in options['databases'] or list(settings.DATABASES):
+            if create_database(database):
+                self.stdout.write(f'{database}: database created.')
+            pending = pending_migrations(database)
+            if pending:
+                self.stdout.write(f'{database}: {len(pending)} pending migrations.')
+                call_command('migrate', database=database, interactive=False, verbosity=options['verbosity'])
+            else:
+                install_all(database)
+                self.stdout.write(f'{database}: no pending migrations.')
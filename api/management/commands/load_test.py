@@ -0,0 +1,72 @@
+"""This module defines the command load testing a running server with the Insomnia collection."""
+import os
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.loadtest import SCENARIOS, LoadTest, Scenario, load_collection
+
+PREFIX = 'load-test-'
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command load testing a running server with the Insomnia collection.
+
+    Virtual users replay weighted scenarios of the collection requests, see `api.loadtest`,
+    against a server started apart, for instance with `serve`. The users and their data are
+    created through the api and deleted at the end from the database of the settings, which
+    must be the one of the server. The server throttles each user on each route, so a high
+    request rate needs more users or a higher `DEFAULT_THROTTLE_RATES` on the server.
+    """
+
+    help = 'Replay the Insomnia collection against a running server and report throughput, latency and errors.'
+
+    def add_arguments(self, parser):
+        """Add the server, the users, the data and the scenarios options."""
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='The URL of the server.')
+        parser.add_argument('--users', type=int, default=10, help='The number of concurrent virtual users.')
+        parser.add_argument('--duration', type=float, default=30.0, help='The seconds the scenarios are run for.')
+        parser.add_argument('--think', type=float, default=0.0,
+                            help='The mean seconds a user pauses between two scenarios.')
+        parser.add_argument('--products', type=int, default=20, help='The number of products seeded by user.')
+        parser.add_argument('--batches', type=int, default=3, help='The number of batches seeded by product.')
+        parser.add_argument('--scenarios', default=','.join(f'{scenario.name}={scenario.weight}' for scenario in SCENARIOS),
+                            help='The weight of each scenario, as name=weight separated by commas, '
+                                 f'among {", ".join(scenario.name for scenario in SCENARIOS)}.')
+        parser.add_argument('--collection', default=os.path.join(settings.BASE_DIR, 'tools', 'insomnia.json'),
+                            help='The Insomnia collection.')
+        parser.add_argument('--max-error-rate', type=float, default=None,
+                            help='The rate of errors over which the command fails, as 0.01, for the integration runs.')
+
+    def handle(self, *args, **options):
+        """Run the load test, delete its users and write the report."""
+        scenarios = {scenario.name: scenario for scenario in SCENARIOS}
+        weighted = []
+        for item in options['scenarios'].split(','):
+            name, _, weight = item.partition('=')
+            if name not in scenarios or not weight.isdigit():
+                raise CommandError(f'{item} is not a scenario with a weight.')
+            weighted.append(Scenario(name, int(weight), scenarios[name].steps))
+        test = LoadTest(options['url'], load_collection(options['collection']), weighted, options['users'],
+                        options['products'], options['batches'], options['think'], PREFIX)
+        User.objects.filter(username__startswith=PREFIX).delete()
+        try:
+            report = test.run(options['duration'])
+        finally:
+            User.objects.filter(username__startswith=PREFIX).delete()
+        if report['failed']:
+            self.stderr.write(f'{len(report["failed"])} users failed to seed their data and did not run.')
+        self.stdout.write(f'{options["users"]} users for {report["duration"]:.1f} s')
+        self.stdout.write(f'{"request":<24} {"count":>7} {"req/s":>8} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} '
+                          f'{"max ms":>8} {"errors":>7} {"429":>7}')
+        for name, measures in [*report['requests'].items(), ('total', report['total'])]:
+            self.stdout.write(
+                f'{name:<24} {measures["count"]:>7} {measures["throughput"]:>8.1f} {measures["p50"] * 1e3:>8.1f} '
+                f'{measures["p90"] * 1e3:>8.1f} {measures["p99"] * 1e3:>8.1f} {measures["max"] * 1e3:>8.1f} '
+                f'{measures["errors"]:>7.1%} {measures["throttled"]:>7.1%}')
+        if options['max_error_rate'] is not None:
+            if report['failed']:
+                raise CommandError(f'{len(report["failed"])} users were not seeded.')
+            if report['total']['errors'] > options['max_error_rate']:
+                raise CommandError(f'{report["total"]["errors"]:.1%} of the requests failed, '
+                                   f'over the {options["max_error_rate"]:.1%} allowed.')
@@ -0,0 +1,44 @@
+"""This module defines the command serving the api with pre-forked workers."""
+import os
+from django.core.management.base import BaseCommand
+from api.serving import Master, listen, load, warm_up
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command serving the api in production.
+
+    The application is loaded and warmed up once, then shared copy-on-write by the
+    forked workers, see `api.serving`. Send SIGHUP to reload the code, SIGTERM to stop.
+    The system checks are not run, they would load the cold paths of the application.
+    """
+
+    help = 'Serve the api with pre-forked and pre-warmed workers.'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        """Add the address, the workers and the recycling options."""
+        parser.add_argument('--host', default='127.0.0.1', help='The address to bind.')
+        parser.add_argument('--port', type=int, default=8000, help='The port to bind.')
+        parser.add_argument('--backlog', type=int, default=2048, help='The pending connections of the socket.')
+        parser.add_argument('--interface', choices=['asgi', 'wsgi'], default='asgi',
+                            help='The application served: asgi for the change streams, or wsgi.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='The number of worker processes.')
+        parser.add_argument('--max-requests', type=int, default=0,
+                            help='The requests served by a worker before it is replaced, 0 for no limit.')
+        parser.add_argument('--max-requests-jitter', type=int, default=0,
+                            help='The random requests added to the limit of each worker, not to replace them together.')
+        parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                            help='The seconds given to a stopped worker to end its requests.')
+
+    def handle(self, *args, **options):
+        """Bind the socket, warm up the application and run the workers."""
+        sock = listen(options['host'], options['port'], options['backlog'])
+        serve = load(options['interface'])
+        warm_up()
+        Master(sock, serve, options, self.log).run()
+
+    def log(self, message: str):
+        """Write a message of the master right away."""
+        self.stdout.write(message)
+        self.stdout.flush()
@@ -0,0 +1,34 @@
+"""This module defines the command reporting the start-up time and memory of the api."""
+from django.core.management.base import BaseCommand
+from api.startup import profile
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command reporting the start-up time and memory of the api.
+
+    The api is started in fresh interpreters, see `api.startup`, and the time and memory
+    are broken down by imported package and by `AppConfig.ready`.
+    """
+
+    help = 'Report the start-up time and memory of the api, by import and by app.'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        """Add the size option of the report."""
+        parser.add_argument('--top', type=int, default=20, help='The number of packages reported, the slowest first.')
+
+    def handle(self, *args, **options):
+        """Start the api and write the report."""
+        report = profile()
+        steps = report['steps']
+        self.stdout.write(f'Start: {sum(steps.values()) * 1e3:.1f} ms, peak resident memory {report["peak"] / 1024:.1f} MiB')
+        for step, duration in steps.items():
+            self.stdout.write(f'  {step:<24} {duration * 1e3:8.1f} ms')
+        imports, memory = report['imports'], report['memory']
+        self.stdout.write('Imports by package, their own imports excepted:')
+        for package in sorted(imports, key=imports.get, reverse=True)[:options['top']]:
+            self.stdout.write(f'  {package:<24} {imports[package] * 1e3:8.1f} ms {memory.get(package, 0) / 1024:9.1f} KiB')
+        self.stdout.write('AppConfig.ready by app:')
+        for label, measure in sorted(report['ready'].items(), key=lambda item: item[1]['time'], reverse=True):
+            self.stdout.write(f'  {label:<24} {measure["time"] * 1e3:8.1f} ms {measure["memory"] / 1024:9.1f} KiB')
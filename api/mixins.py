@@ -0,0 +1,115 @@
+"""This module defines the view mixins shared by the api resources."""
+from typing import Optional
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import router, transaction
+from django.db.models import F, QuerySet
+from django.http import Http404
+from rest_framework.response import Response
+from rest_framework.serializers import Serializer
+from api.exceptions import PreconditionFailed
+
+
+class OwnerScopedMixin:
+    """
+    This class resolves the objects owned by the user of the request.
+
+    Every lookup is restricted to the connected user, so an object of another owner
+    and a missing object are both answered with a 404.
+    """
+
+    def get_owned_object(self, queryset: QuerySet, **lookups: dict):
+        """
+        Retrieve an object of the request owner.
+
+        Args:
+            queryset (QuerySet): The queryset to search in, with its joins already selected.
+            lookups (dict): The filters identifying the object.
+
+        Raises:
+            Http404: The object does not exist or belongs to another owner.
+
+        Returns:
+            Model: The object found.
+        """
+        try:
+            return queryset.get(owner=self.request.user, **lookups)
+        except (ObjectDoesNotExist, ValueError):
+            raise Http404 from None
+
+
+class VersionedMixin:
+    """
+    This class manages the optimistic concurrency of the versioned resources.
+
+    The version of a resource is its ETag. A write sent with `If-Match` is a single
+    `UPDATE ... WHERE version = ?` that increments the version, so it needs no prior
+    read nor lock, and a concurrent write is detected by the number of updated rows.
+    """
+
+    def get_expected_version(self) -> Optional[int]:
+        """
+        Return the version given by the If-Match header of the request.
+
+        Raises:
+            PreconditionFailed: The header is not the ETag of a version, so it matches none.
+
+        Returns:
+            int: The expected version, 0 for any version, or None without header.
+        """
+        header = self.request.META.get('HTTP_IF_MATCH')
+        if header is None:
+            return None
+        header = header.strip()
+        if header == '*':
+            return 0
+        if header.startswith('W/'):
+            header = header[2:]
+        try:
+            version = int(header.strip('"'))
+        except ValueError:
+            version = 0
+        if version < 1:
+            raise PreconditionFailed
+        return version
+
+    def update_version(self, queryset: QuerySet, pk: int, version: Optional[int], serializer: Serializer):
+        """
+        Update a resource of the request owner if it still has the expected version.
+
+        Only the given fields are written, the ones omitted by the client keep their value.
+        When the expected version is known and every field is given, the updated resource
+        is built from them and the next version without being read back. Otherwise its
+        new version or its omitted fields are read in the transaction of the update.
+
+        Args:
+            queryset (QuerySet): The resources of the owner the resource belongs to.
+            pk (int): The resource identifier.
+            version (int): The expected version, 0 or None for any version.
+            serializer (Serializer): The serializer holding the validated fields, by their source.
+
+        Raises:
+            Http404: The resource does not exist.
+            PreconditionFailed: The resource has another version.
+
+        Returns:
+            Model: The resource updated, with its new version.
+        """
+        values = serializer.validated_data
+        resource = queryset.filter(pk=pk)
+        matched = resource.filter(version=version) if version else resource
+        with transaction.atomic(using=router.db_for_write(queryset.model)):
+            if not matched.update(version=F('version') + 1, **values):
+                if resource.exists():
+                    raise PreconditionFailed
+                raise Http404
+            complete = all(field.source in values for field in serializer.fields.values() if not field.read_only)
+            if not version or not complete:
+                return resource.get()
+        fields = {queryset.model._meta.get_field(name).attname: value for name, value in values.items()}  # pylint: disable=protected-access
+        return queryset.model(pk=pk, owner_id=self.request.user.pk, version=version + 1, **fields)
+
+    @staticmethod
+    def tag(response: Response, version: int) -> Response:
+        """Return a response with the ETag of a version."""
+        response['ETag'] = f'"{version}"'
+        return response
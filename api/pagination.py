@@ -0,0 +1,29 @@
+"""This module defines the pagination classes shared by the api resources."""
+from rest_framework.pagination import CursorPagination
+
+
+class OrderedCursorPagination(CursorPagination):
+    """
+    This class paginates a list with opaque cursors on the ordering chosen by the view.
+
+    Cursors keep pages stable while rows are inserted, and each page is a range scan
+    from the last position on the index of the ordering, whatever the page depth. The
+    identifier follows the ordering in its direction, so the rows sharing a value keep
+    one order from page to page.
+
+    Attributes:
+        page_size (int): The default number of results per page.
+        page_size_query_param (str): The parameter to choose the number of results per page.
+        max_page_size (int): The maximum number of results per page.
+    """
+
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering given by the `get_ordering` method of the view, then the identifier."""
+        ordering = view.get_ordering()
+        if ordering.lstrip('-') == 'id':
+            return (ordering,)
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
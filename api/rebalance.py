@@ -0,0 +1,123 @@
+"""This module moves the data of a user from its shard to another one.
+
+The requests of the user are refused while its data is moved: the assignment is
+flagged, the requests in flight are given a grace delay to end, then the data is copied
+in one transaction of the target shard, the assignment is switched, and the data is
+deleted from the source shard.
+
+The copied rows keep their identifiers, which are unique across the shards, see
+`api.sharding.reserve_blocks`, so the clients of the user keep their data. The rows
+numbered on a shard before it was given its blocks may collide with rows of the target:
+the copy then fails and the user stays on its shard. The derived data (search index,
+rollups, owner version, changes) is recorded again by the triggers of the target shard,
+the owner versions of the source being added to the ones of the copy, so a version
+never goes back to a value a cache of the old data was keyed with;
+the stock movements are copied over the ones recorded by the copy, and are folded into
+snapshots again by the next compaction. The archived batches are copied as batches,
+then archived again on the target shard, so their spend is recorded by the same
+triggers. The SQLite snapshots of the user are deleted, to be built again from the
+target shard.
+"""
+import time
+from typing import Dict
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from api.sharding import mirror, reserve_blocks, shard_of, shards
+from authentication.models import OwnerVersion, ShardAssignment
+from categories.models import Category
+from changes.models import Change
+from digests.models import Digest
+from ledger.models import StockMovement, StockSnapshot
+from products import archive
+from products.models import ArchivedBatch, Batch, Product, ProductForecast
+from providers.models import Provider
+from snapshots.snapshot import discard
+
+GRACE = 5.0
+
+COPIED = [Category, Provider, Product, Batch, Digest]
+
+DERIVED = [StockMovement, StockSnapshot, ProductForecast, Change, OwnerVersion]
+
+
+def _purge(owner_id: int, using: str):
+    """Delete the data of an owner from a shard, its copy of the user excepted."""
+    with transaction.atomic(using=using):
+        for model in reversed(COPIED):
+            model.objects.using(using).filter(owner=owner_id).delete()  # pylint: disable=no-member
+        for model in DERIVED:
+            model.objects.using(using).filter(owner=owner_id)._raw_delete(using)  # pylint: disable=no-member,protected-access
+
+
+def _copy(owner_id: int, source: str, target: str) -> Dict[str, int]:
+    """Copy the data of an owner between two shards with its identifiers, and return the number of rows copied by model."""
+    copied = {}
+    for model in COPIED:
+        rows = model.objects.using(source).filter(owner=owner_id).order_by('pk')  # pylint: disable=no-member
+        copied[model._meta.model_name] = len(model.objects.using(target).bulk_create(rows, batch_size=1000))  # pylint: disable=no-member,protected-access
+    archived = [Batch(**row) for row in (ArchivedBatch.objects.using(source).filter(owner=owner_id)  # pylint: disable=no-member
+                                         .order_by('pk').values(*archive.FIELDS).iterator())]
+    Batch.objects.using(target).bulk_create(archived, batch_size=1000)  # pylint: disable=no-member
+    for start in range(0, len(archived), archive.CHUNK):
+        archive.move(Batch.objects.using(target).filter(  # pylint: disable=no-member
+            pk__in=[batch.pk for batch in archived[start:start + archive.CHUNK]]))
+    copied[ArchivedBatch._meta.model_name] = len(archived)  # pylint: disable=protected-access
+    StockMovement.objects.using(target).filter(owner=owner_id)._raw_delete(target)  # pylint: disable=no-member,protected-access
+    movements = [
+        StockMovement(owner_id=owner_id, product_id=movement.product_id, batch_id=movement.batch_id,
+                      reason=movement.reason, delta=movement.delta, level=movement.level, created=movement.created)
+        for movement in StockMovement.objects.using(source).filter(owner=owner_id).order_by('id').iterator()]  # pylint: disable=no-member
+    StockMovement.objects.using(target).bulk_create(movements, batch_size=1000)  # pylint: disable=no-member
+    copied[StockMovement._meta.model_name] = len(movements)  # pylint: disable=protected-access
+    reserve_blocks(using=target)
+    return copied
+
+
+def _carry_versions(owner_id: int, source: str, target: str):
+    """Add the owner versions of the source shard to the ones recorded on the target shard by the copy."""
+    version, catalog = OwnerVersion.objects.using(source).filter(owner=owner_id).values_list(  # pylint: disable=no-member
+        'version', 'catalog').first() or (0, 0)
+    versions = OwnerVersion.objects.using(target).filter(owner=owner_id)  # pylint: disable=no-member
+    if not versions.update(version=F('version') + version, catalog=F('catalog') + catalog) and version:
+        versions.create(owner_id=owner_id, version=version, catalog=catalog)
+
+
+def move(user: User, database: str, grace: float = GRACE) -> Dict[str, int]:
+    """
+    Move the data of a user to another shard.
+
+    Args:
+        user (User): The owner of the data, with its shard assignment.
+        database (str): The alias of the target shard.
+        grace (float): The seconds given to the requests in flight before the copy.
+
+    Raises:
+        ValueError: The target is not a shard.
+
+    Returns:
+        dict(str, int): The number of rows copied by model, empty if the user is already on the shard.
+    """
+    if database not in shards():
+        raise ValueError(f'{database} is not a shard.')
+    source = shard_of(user)
+    if source == database:
+        return {}
+    assignment, _ = ShardAssignment.objects.update_or_create(  # pylint: disable=no-member
+        user=user, defaults={'database': source, 'moving': True})
+    try:
+        time.sleep(grace)
+        _purge(user.pk, database)
+        with transaction.atomic(using=database):
+            mirror(user, database)
+            copied = _copy(user.pk, source, database)
+            _carry_versions(user.pk, source, database)
+        assignment.database = database
+    finally:
+        assignment.moving = False
+        assignment.save()
+    _purge(user.pk, source)
+    discard(user.pk)
+    if source != DEFAULT_DB_ALIAS:
+        User.objects.using(source).filter(pk=user.pk).delete()
+    return copied
@@ -0,0 +1,104 @@
+"""This module defines the serializers shared by the api resources."""
+from typing import Tuple
+from django.db import models
+from rest_framework import serializers
+from api.labels import labels_of
+
+
+class LabelField(serializers.Field):
+    """
+    This class defines the reference to a category or a provider of the owner, rendered as its label.
+
+    The identifier is validated and the label rendered from the cached labels of the
+    owner, see `api.labels`, read once by serialization for each owner. The owner of
+    the validated data is the user of the request given in the context.
+
+    Attributes:
+        default_error_messages (dict(str, str)): The messages of the validation errors.
+    """
+
+    default_error_messages = {
+        'required': 'This field is required.',
+        'does_not_exist': 'Invalid pk "{pk_value}" - object does not exist.',
+        'incorrect_type': 'Incorrect type. Expected pk value, received {data_type}.',
+    }
+
+    def __init__(self, model, **kwargs: dict):
+        """Bind the field to the model referenced, the attribute being the identifier of the reference."""
+        self.model = model
+        super().__init__(**kwargs)
+
+    def bind(self, field_name: str, parent):
+        """Read and write the identifier of the reference, as `<field>_id`."""
+        if self.source is None:
+            self.source = f'{field_name}_id'
+        super().bind(field_name, parent)
+
+    def labels(self, owner_id: int) -> dict:
+        """Return the labels of the referenced model of an owner, shared by the fields of the serialization."""
+        owners = vars(self.root).setdefault('_labels', {})
+        if owner_id not in owners:
+            owners[owner_id] = labels_of(owner_id)
+        return owners[owner_id][self.model]
+
+    def to_internal_value(self, data) -> int:
+        """Return the identifier of a reference of the owner of the request."""
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except ValueError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self.labels(self.context['request'].user.pk):
+            self.fail('does_not_exist', pk_value=data)
+        return pk
+
+    def get_attribute(self, instance: models.Model) -> Tuple[int, int]:
+        """Return the owner and the identifier of the reference of an object."""
+        return instance.owner_id, super().get_attribute(instance)
+
+    def to_representation(self, value: Tuple[int, int]) -> str:
+        """Return the label of the reference."""
+        owner_id, pk = value
+        return self.labels(owner_id).get(pk)
+
+
+class BulkDeleteSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer for the bulk delete views.
+
+    Attributes:
+        ids (list(int)): The identifiers of the resources to delete.
+    """
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+
+
+class SubRequestSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer for a request of the batch view.
+
+    Attributes:
+        method (str): The HTTP method.
+        path (str): The path of the resource, with its query string.
+        headers (dict(str, str)): The additional headers, like If-Match.
+        body (object): The JSON body.
+    """
+
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'DELETE'])
+    path = serializers.RegexField(r'^/', max_length=2000)
+    headers = serializers.DictField(child=serializers.CharField(), required=False, default=dict)
+    body = serializers.JSONField(required=False)
+
+
+class MultiplexRequestSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer for the multiplex view.
+
+    Attributes:
+        requests (list(dict)): The requests to run, in order.
+        parallel (bool): Run the consecutive GET requests in parallel threads.
+    """
+
+    requests = serializers.ListField(child=SubRequestSerializer(), allow_empty=False, max_length=20)
+    parallel = serializers.BooleanField(default=False)
@@ -0,0 +1,305 @@
+"""This module serves the api with pre-forked worker processes.
+
+The master process binds the socket, loads the application and warms it up: the URL
+patterns are compiled, the serializers are built once, which fills the metadata caches
+of the models they read, and each database is opened and checked. The warm objects are
+frozen out of the garbage collector and the workers are forked, so they share them
+copy-on-write and answer their first request as fast as the next ones. The cold paths,
+the admin site or the forecasts, are left to their first use.
+
+The workers accept on the socket of the master and each one exits after its maximum
+number of requests, to be replaced. A SIGHUP reloads the code without dropping a
+connection: the master runs again on the same socket, starts new workers, and stops the
+old ones once the new ones accept. A SIGTERM or SIGINT stops the workers gracefully.
+"""
+import gc
+import importlib
+import inspect
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Callable, List, Optional, Set
+from django.apps import apps
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from rest_framework.serializers import BaseSerializer
+from api.throttling import buckets
+
+FD_VARIABLE = 'FOODSTOCK_SERVE_FD'
+
+OLD_WORKERS_VARIABLE = 'FOODSTOCK_SERVE_OLD_WORKERS'
+
+TICK = 0.2
+
+draining = False
+
+
+def _compile(patterns: list):
+    """Compile the regular expressions of URL patterns and of their includes, the ones not imported yet excepted."""
+    for pattern in patterns:
+        pattern.pattern.regex  # pylint: disable=pointless-statement
+        if isinstance(pattern, URLResolver) and not isinstance(pattern.urlconf_name, str):
+            _compile(pattern.url_patterns)
+
+
+def warm_up():
+    """Load and warm up the application, then close the database connections not to share them."""
+    _compile(get_resolver().url_patterns)
+    for config in apps.get_app_configs():
+        try:
+            module = importlib.import_module(f'{config.name}.serializers')
+        except ModuleNotFoundError:
+            continue
+        for serializer in vars(module).values():
+            if inspect.isclass(serializer) and issubclass(serializer, BaseSerializer) \
+                    and serializer.__module__ == module.__name__:
+                try:
+                    serializer().fields  # pylint: disable=expression-not-assigned
+                except Exception:  # pylint: disable=broad-except
+                    pass
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    buckets()
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+
+def load(interface: str) -> Callable:
+    """Import the application of an interface, `wsgi` or `asgi`, and return the loop of its workers."""
+    if interface == 'wsgi':
+        importlib.import_module('api.wsgi')
+        return serve_wsgi
+    importlib.import_module('uvicorn')
+    importlib.import_module('api.asgi')
+    return serve_asgi
+
+
+def listen(host: str, port: int, backlog: int) -> socket.socket:
+    """Return the listening socket, inherited from the previous master after a reload."""
+    if FD_VARIABLE in os.environ:
+        sock = socket.socket(fileno=int(os.environ.pop(FD_VARIABLE)))
+    else:
+        sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_wsgi(sock: socket.socket, max_requests: Optional[int], ready: Callable):
+    """
+    Serve the WSGI application on a socket, one request at a time, until stopped or recycled.
+
+    The file responses, as the snapshots, are sent by the kernel from their file to the
+    socket.
+    """
+    from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer  # pylint: disable=import-outside-toplevel
+    from api.wsgi import application  # pylint: disable=import-outside-toplevel
+    served = 0
+
+    class FileHandler(ServerHandler):
+        """This class defines the handler of a request, sending the file responses with `sendfile`."""
+
+        def sendfile(self) -> bool:
+            """Send the file of the response from the kernel, without copying it through the worker."""
+            if not hasattr(self.result.filelike, 'fileno'):
+                return False
+            if not self.headers_sent:
+                self.send_headers()
+            self._flush()
+            self.bytes_sent += self.request_handler.connection.sendfile(self.result.filelike)
+            return True
+
+    class RequestHandler(WSGIRequestHandler):
+        """This class defines the handler of a connection, reading its request as `WSGIRequestHandler` does."""
+
+        def handle(self):
+            """Read the request and handle it with a `FileHandler`."""
+            self.raw_requestline = self.rfile.readline(65537)
+            if len(self.raw_requestline) > 65536:
+                self.requestline = self.request_version = self.command = ''
+                self.send_error(414)
+            elif self.parse_request():
+                handler = FileHandler(self.rfile, self.wfile, self.get_stderr(), self.get_environ(), multithread=False)
+                handler.request_handler = self
+                handler.run(self.server.get_app())
+
+    def counted(environ: dict, start_response: Callable):
+        nonlocal served
+        served += 1
+        return application(environ, start_response)
+
+    server = WSGIServer(sock.getsockname()[:2], RequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.server_name, server.server_port = sock.getsockname()[:2]
+    server.setup_environ()
+    server.set_app(counted)
+    server.timeout = TICK
+    sock.setblocking(False)
+    ready()
+    while not draining and (max_requests is None or served < max_requests):
+        server.handle_request()
+
+
+def serve_asgi(sock: socket.socket, max_requests: Optional[int], ready: Callable):
+    """Serve the ASGI application on a socket, until stopped or recycled, then end the change streams."""
+    import uvicorn  # pylint: disable=import-outside-toplevel
+    from api.asgi import application  # pylint: disable=import-outside-toplevel
+    from changes.hub import hub  # pylint: disable=import-outside-toplevel
+
+    class Server(uvicorn.Server):
+        """This class defines the server of a worker, ready once accepting and draining when stopped."""
+
+        async def startup(self, sockets: list = None):
+            await super().startup(sockets=sockets)
+            ready()
+
+        def handle_exit(self, sig: int, frame):
+            global draining  # pylint: disable=global-statement
+            draining = True
+            super().handle_exit(sig, frame)
+
+        async def shutdown(self, sockets: list = None):
+            hub.close()
+            await super().shutdown(sockets=sockets)
+
+    Server(uvicorn.Config(application, lifespan='off', limit_max_requests=max_requests)).run(sockets=[sock])
+
+
+class Master:
+    """
+    This class defines the master process, which forks and supervises the workers.
+
+    Attributes:
+        sock (socket): The listening socket, shared by the workers.
+        serve (Callable): The loop of a worker.
+        options (dict): The options of the serve command.
+        log (Callable): The output of the messages.
+        workers (set(int)): The process ids of the running workers.
+        signal (int): The last signal received, None once handled.
+    """
+
+    def __init__(self, sock: socket.socket, serve: Callable, options: dict, log: Callable):
+        """Create a master without workers."""
+        self.sock = sock
+        self.serve = serve
+        self.options = options
+        self.log = log
+        self.workers: Set[int] = set()
+        self.signal: Optional[int] = None
+
+    def spawn(self) -> int:
+        """Fork a worker and return its process id once it accepts requests."""
+        readable, writable = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(readable)
+            self.work(writable)
+        os.close(writable)
+        if not os.read(readable, 1):
+            self.log(f'Worker {pid} failed to start.')
+            time.sleep(1.0)
+        os.close(readable)
+        self.workers.add(pid)
+        return pid
+
+    def work(self, ready: int):
+        """Run the loop of a worker in a forked process, and exit with it."""
+        def drain(signum: int, frame):
+            global draining  # pylint: disable=global-statement
+            draining = True
+
+        status = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, drain)
+            random.seed()
+            max_requests = self.options['max_requests'] + random.randint(0, self.options['max_requests_jitter']) \
+                if self.options['max_requests'] else None
+
+            def notify():
+                os.write(ready, b'1')
+                os.close(ready)
+            self.serve(self.sock, max_requests, notify)
+        except BaseException:  # pylint: disable=broad-except
+            status = 1
+            import traceback  # pylint: disable=import-outside-toplevel
+            traceback.print_exc()
+        finally:
+            os._exit(status)  # pylint: disable=protected-access
+
+    def exited(self, pid: int) -> bool:
+        """Return whether a worker exited, collecting it."""
+        try:
+            done = os.waitpid(pid, os.WNOHANG)[0] != 0
+        except ChildProcessError:
+            done = True
+        if done:
+            self.workers.discard(pid)
+        return done
+
+    def reap(self) -> List[int]:
+        """Collect the exited workers and return their process ids."""
+        return [pid for pid in list(self.workers) if self.exited(pid)]
+
+    def stop(self, pids: List[int]):
+        """Stop workers gracefully, and kill the ones still running after the timeout."""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.options['graceful_timeout']
+        running = list(pids)
+        while running and time.monotonic() < deadline:
+            time.sleep(TICK)
+            running = [pid for pid in running if not self.exited(pid)]
+        for pid in running:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.workers.discard(pid)
+
+    def adopt(self):
+        """Take over the workers of the master before a reload, stopped once the new ones accept."""
+        old = [int(pid) for pid in os.environ.pop(OLD_WORKERS_VARIABLE, '').split(',') if pid]
+        for _ in range(self.options['workers']):
+            self.spawn()
+        if old:
+            self.workers.update(old)
+            self.stop(old)
+            self.log(f'{len(old)} previous workers stopped.')
+
+    def reload(self):
+        """Run the master again on the same socket, with the current code and settings."""
+        self.log('Reloading.')
+        os.environ[FD_VARIABLE] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_VARIABLE] = ','.join(map(str, self.workers))
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def run(self):
+        """Start the workers and supervise them until a stop signal."""
+        def notify(signum: int, frame):
+            self.signal = signum
+
+        for signum in (signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, notify)
+        self.adopt()
+        self.log(f'Serving on {self.sock.getsockname()[:2]} with {len(self.workers)} workers (pid {os.getpid()}).')
+        while True:
+            time.sleep(TICK)
+            if self.signal == signal.SIGHUP:
+                self.reload()
+            if self.signal is not None:
+                self.log('Stopping.')
+                self.stop(list(self.workers))
+                return
+            for _ in self.reap():
+                self.spawn()
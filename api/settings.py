@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,20 +26,29 @@ SECRET_KEY = 'w5jd#h$zkj21l0#jerb)#n_k08q$=e4v!ne5%2egs6!t8!pl&*'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
-ALLOWED_HOSTS = ['foodstock-api.pytech.local', 'foodstock-api.pytech.fr']
+ALLOWED_HOSTS = ['foodstock-api.pytech.local', 'foodstock-api.pytech.fr'] + [
+    host for host in os.environ.get('FOODSTOCK_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
 
 INSTALLED_APPS = [
+    'api.apps.ApiConfig',
     'authentication.apps.AuthenticationConfig',
     'categories.apps.CategoriesConfig',
     'providers.apps.ProvidersConfig',
     'products.apps.ProductsConfig',
+    'search.apps.SearchConfig',
+    'analytics.apps.AnalyticsConfig',
+    'ledger.apps.LedgerConfig',
+    'changes.apps.ChangesConfig',
+    'jobs.apps.JobsConfig',
+    'digests.apps.DigestsConfig',
+    'snapshots.apps.SnapshotsConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
-    'django.contrib.admin',
+    'api.apps.AdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -54,9 +64,21 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'api.sharding.ShardMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The chain of the token authenticated api, see `api.handlers`: the paths of
+# FULL_MIDDLEWARE_PATHS only go through the full MIDDLEWARE chain.
+API_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'api.sharding.ShardMiddleware',
+]
+
+FULL_MIDDLEWARE_PATHS = ['/admin/']
+
 ROOT_URLCONF = 'api.urls'
 
 TEMPLATES = [
@@ -81,12 +103,31 @@ WSGI_APPLICATION = 'api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# The shards of the owners data: the default database, then FOODSTOCK_SHARDS - 1 others.
+SHARDS = ['default'] + [f'shard_{index}' for index in range(1, int(os.environ.get('FOODSTOCK_SHARDS', '1')))]
+
+# The databases are SQLite files, or PostgreSQL ones when FOODSTOCK_DB_ENGINE is
+# postgresql: the shard databases are named after the default one, and created by
+# `ensure_migrated`. Django has no connection pool, the connections of each worker
+# thread are kept open for FOODSTOCK_DB_CONN_MAX_AGE seconds and reused by its requests.
+if os.environ.get('FOODSTOCK_DB_ENGINE') == 'postgresql':
+    DATABASES = {alias: {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('FOODSTOCK_DB_NAME', 'foodstock') + ('' if alias == 'default' else f'_{alias}'),
+        'USER': os.environ.get('FOODSTOCK_DB_USER', 'foodstock'),
+        'PASSWORD': os.environ.get('FOODSTOCK_DB_PASSWORD', ''),
+        'HOST': os.environ.get('FOODSTOCK_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('FOODSTOCK_DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('FOODSTOCK_DB_CONN_MAX_AGE', '600')),
+        'OPTIONS': {'connect_timeout': 5},
+    } for alias in SHARDS}
+else:
+    DATABASES = {alias: {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'data/db.sqlite3',
-    }
-}
+        'NAME': BASE_DIR / ('data/db.sqlite3' if alias == 'default' else f'data/{alias}.sqlite3'),
+    } for alias in SHARDS}
+
+DATABASE_ROUTERS = ['api.sharding.ShardRouter']
 
 
 # Password validation
@@ -130,10 +171,32 @@ STATIC_URL = '/static/'
 # Rest framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
-    ]
+        'api.sharding.ShardTokenAuthentication'
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle'
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '300/min'
+    }
 }
 
+# The token buckets of the throttle, mapped in memory by every worker.
+THROTTLE_FILE = BASE_DIR / 'data/throttle.bin'
+
+# The delivery of the expiry digests, see `digests.backends`.
+DIGEST_BACKEND = 'digests.backends.FileBackend'
+DIGEST_FILE = BASE_DIR / 'data/digests.jsonl'
+
+# The age of the purchase after which a consumed batch is archived, see `products.archive`.
+BATCH_ARCHIVE_DAYS = 365
+
+# The SQLite snapshots of the owner data, see `snapshots.snapshot`.
+SNAPSHOT_DIR = BASE_DIR / 'data/snapshots'
+
+# The tests keep the data files in a temporary directory.
+TEST_RUNNER = 'api.testing.TestRunner'
+
 CORS_ORIGIN_WHITELIST = [
     "http://foodstock.pytech.local",
     "https://foodstock.pytech.fr"
@@ -152,5 +215,6 @@ CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
-    'content-type'
+    'content-type',
+    'prefer'
 ]
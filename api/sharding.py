@@ -0,0 +1,234 @@
+"""This module spreads the data of the owners across several databases, the shards.
+
+The users, their tokens, the assignments of the users to the shards and the queued jobs
+stay in the default database, which is also the first shard. All the data of an owner lives in its
+shard: the authentication of a request selects the shard of its user, and the router
+sends there every query of the request on the owned models. A shard holds a copy of
+the row of each of its users, the target of the foreign keys of their data.
+
+The changes of a shard are numbered in its own range, so the `Last-Event-ID` of a user
+moved to another shard is never replayed from the wrong one. The categories, providers,
+products, batches and digests are numbered in blocks dealt to the shards in turn, so
+their identifiers are unique across the shards and kept when their owner is moved.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import pre_delete
+from django.http import HttpRequest, HttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from api.exceptions import Moving
+
+CENTRAL_APPS = {'admin', 'auth', 'authtoken', 'contenttypes', 'jobs', 'sessions'}
+
+CENTRAL_MODELS = {'authentication.shardassignment', 'authentication.permissionsgeneration'}
+
+ID_RANGE = 1 << 40
+
+ID_BLOCK = 1 << 27
+
+MAX_SHARDS = 16
+
+NUMBERED_MODELS = ['categories.category', 'providers.provider', 'products.product', 'products.batch', 'digests.digest']
+
+_current: ContextVar[Optional[str]] = ContextVar('shard', default=None)
+
+
+def shards() -> List[str]:
+    """Return the aliases of the shards, the default database first."""
+    return getattr(settings, 'SHARDS', [DEFAULT_DB_ALIAS])
+
+
+def id_base(using: str) -> int:
+    """Return the last identifier before the range of the changes of a shard."""
+    return shards().index(using) * ID_RANGE if using in shards() else 0
+
+
+def reserve_blocks(sender=None, using: str = DEFAULT_DB_ALIAS, **kwargs: dict):
+    """
+    Make a shard number its owned rows in its own blocks, after a migration or a move.
+
+    The blocks of `ID_BLOCK` identifiers are dealt to `MAX_SHARDS` shards in turn, so the
+    32-bit keys of PostgreSQL hold one block by shard. A shard numbers in its block, or
+    in its next one when the rows it holds were numbered above: SQLite numbers after the
+    largest key of a table, PostgreSQL sequences ignore the keys inserted.
+
+    Args:
+        sender (AppConfig): The app migrated, if any.
+        using (str): The database alias.
+
+    Raises:
+        ImproperlyConfigured: There are more shards than blocks by turn.
+    """
+    from api.db import allocated_id, reserve_ids  # pylint: disable=import-outside-toplevel
+    if using not in shards():
+        return
+    index = shards().index(using)
+    if index >= MAX_SHARDS:
+        raise ImproperlyConfigured(f'FOODSTOCK_SHARDS must not exceed {MAX_SHARDS}.')
+    for label in NUMBERED_MODELS:
+        model = apps.get_model(label)
+        block = allocated_id(model, using) // ID_BLOCK
+        ahead = (index - block) % MAX_SHARDS
+        if ahead:
+            reserve_ids(model, using, (block + ahead) * ID_BLOCK)
+
+
+def is_central(model) -> bool:
+    """Return whether a model is stored in the default database only."""
+    return model._meta.app_label in CENTRAL_APPS or model._meta.label_lower in CENTRAL_MODELS  # pylint: disable=protected-access
+
+
+def shard_of(user: User) -> str:
+    """Return the shard of a user, whose assignment is selected with it."""
+    assignment = getattr(user, 'shard', None)
+    return assignment.database if assignment is not None else DEFAULT_DB_ALIAS
+
+
+def current_shard() -> Optional[str]:
+    """Return the shard of the user of the current request, None outside a request."""
+    return _current.get()
+
+
+def enter(user: User) -> str:
+    """
+    Route the queries of the current request to the shard of a user.
+
+    Args:
+        user (User): The user of the request, with its shard assignment.
+
+    Raises:
+        Moving: The data of the user is being moved to another shard.
+
+    Returns:
+        str: The alias of the shard.
+    """
+    assignment = getattr(user, 'shard', None)
+    if assignment is not None and assignment.moving:
+        raise Moving
+    database = assignment.database if assignment is not None else DEFAULT_DB_ALIAS
+    _current.set(database)
+    return database
+
+
+@contextmanager
+def routed(database: str) -> Iterator[str]:
+    """Route the queries on the owned models to a shard within the block, as the admin site of a shard does."""
+    token = _current.set(database)
+    try:
+        yield database
+    finally:
+        _current.reset(token)
+
+
+def mirror(user: User, database: str):
+    """Copy the row of a user to a shard, as the target of the foreign keys of its data."""
+    if database != DEFAULT_DB_ALIAS:
+        User.objects.using(database).get_or_create(pk=user.pk, defaults={'username': str(user.pk), 'password': '!'})
+
+
+def assign(user: User) -> str:
+    """
+    Assign a new user to a shard, chosen by its identifier.
+
+    Args:
+        user (User): The new user.
+
+    Returns:
+        str: The alias of the shard.
+    """
+    aliases = shards()
+    if len(aliases) == 1:
+        return DEFAULT_DB_ALIAS
+    from authentication.models import ShardAssignment  # pylint: disable=import-outside-toplevel
+    database = aliases[user.pk % len(aliases)]
+    mirror(user, database)
+    ShardAssignment.objects.create(user=user, database=database)  # pylint: disable=no-member
+    return database
+
+
+def forget(sender, instance: User, using: str, **kwargs: dict):
+    """Delete the data of a central user being deleted from its shard."""
+    database = shard_of(instance)
+    if using == DEFAULT_DB_ALIAS and database != DEFAULT_DB_ALIAS:
+        User.objects.using(database).filter(pk=instance.pk).delete()
+
+
+def connect():
+    """Delete the data of the users from their shard with the users."""
+    pre_delete.connect(forget, sender=User, dispatch_uid='api.sharding.forget')
+
+
+class ShardRouter:
+    """
+    This class routes the queries on the owned models to the shard of the current request.
+
+    Outside a request, as in the management commands, the database is chosen by the
+    caller with `using`, or is the default one. Every database has the whole schema.
+    """
+
+    def route(self, model, hints: dict) -> Optional[str]:
+        """Return the database of a model, following the instance it is related to."""
+        if is_central(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and not is_central(type(instance)) and instance._state.db:  # pylint: disable=protected-access
+            return instance._state.db  # pylint: disable=protected-access
+        return _current.get()
+
+    def db_for_read(self, model, **hints: dict) -> Optional[str]:
+        """Return the database to read a model from."""
+        return self.route(model, hints)
+
+    def db_for_write(self, model, **hints: dict) -> Optional[str]:
+        """Return the database to write a model to."""
+        return self.route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints: dict) -> Optional[bool]:
+        """Allow the relations to the users, which are copied to the shards."""
+        if is_central(type(obj1)) or is_central(type(obj2)):
+            return True
+        return None
+
+
+class ShardTokenAuthentication(TokenAuthentication):
+    """
+    This class authenticates the requests by token and routes them to the shard of their user.
+
+    The assignment of the user is selected with its token, in the same query.
+    """
+
+    def authenticate_credentials(self, key: str):
+        """Return the active user of a token and its token, after entering its shard."""
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user__shard').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        enter(token.user)
+        return token.user, token
+
+
+class ShardMiddleware:
+    """This class ends the routing of a request to a shard with the request."""
+
+    def __init__(self, get_response: Callable):
+        """Wrap the next handler."""
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        """Handle a request, then forget its shard."""
+        token = _current.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
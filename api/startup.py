@@ -0,0 +1,168 @@
+"""This module measures the start of the api in a fresh interpreter.
+
+The api is started the way a worker starts before its first request: Django is set
+up, which imports the apps and their models and runs their `AppConfig.ready`, then the
+root URL configuration is imported with the views. The start runs twice in a child
+interpreter: once with `-X importtime` for the time of each import, once with
+`tracemalloc` for the memory allocated by each package, as tracing slows the imports.
+"""
+import importlib.abc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+MEMORY_FLAG = '--memory'
+
+
+def _timed(config, ready: Dict[str, dict], memory: bool):
+    """Wrap the `ready` method of an app configuration to record its time and memory."""
+    method = config.ready
+
+    def timed_ready():
+        allocated = tracemalloc.get_traced_memory()[0] if memory else 0
+        started = time.perf_counter()
+        method()
+        ready[config.label] = {'time': time.perf_counter() - started,
+                               'memory': tracemalloc.get_traced_memory()[0] - allocated if memory else 0}
+    config.ready = timed_ready
+    return config
+
+
+class _MeasuredLoader:
+    """This class wraps the loader of a module to measure the memory of its import."""
+
+    def __init__(self, loader, name: str, imports: '_ImportMemory'):
+        """Wrap a loader."""
+        self.loader = loader
+        self.name = name
+        self.imports = imports
+
+    def __getattr__(self, name: str):
+        """Return the other attributes of the wrapped loader."""
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        """Create the module, which loads the extension modules."""
+        return self.imports.measure(self.name, lambda: self.loader.create_module(spec))
+
+    def exec_module(self, module):
+        """Execute the module."""
+        return self.imports.measure(self.name, lambda: self.loader.exec_module(module))
+
+
+class _ImportMemory(importlib.abc.MetaPathFinder):
+    """
+    This class measures the memory allocated by the imports, first in the path of the finders.
+
+    Attributes:
+        allocated (dict(str, int)): The memory allocated by the modules of each top-level
+            package, the imports they run excepted.
+        nested (list(int)): The memory allocated by the imports run by each running import.
+    """
+
+    def __init__(self):
+        """Create the finder without measures."""
+        self.allocated: Dict[str, int] = defaultdict(int)
+        self.nested: List[int] = []
+
+    def find_spec(self, fullname: str, path, target=None):
+        """Find a module with the next finders and wrap its loader."""
+        for finder in sys.meta_path[sys.meta_path.index(self) + 1:]:
+            spec = finder.find_spec(fullname, path, target) if hasattr(finder, 'find_spec') else None
+            if spec is not None:
+                if hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _MeasuredLoader(spec.loader, fullname, self)
+                return spec
+        return None
+
+    def measure(self, name: str, load: Callable):
+        """Run a step of an import and add the memory it allocated to the package of the module."""
+        self.nested.append(0)
+        allocated = tracemalloc.get_traced_memory()[0]
+        try:
+            return load()
+        finally:
+            total = tracemalloc.get_traced_memory()[0] - allocated
+            self.allocated[name.partition('.')[0]] += total - self.nested.pop()
+            if self.nested:
+                self.nested[-1] += total
+
+
+def start(memory: bool = False) -> dict:
+    """
+    Start the api in the current interpreter and measure each step.
+
+    Args:
+        memory (bool): Whether to trace the allocations.
+
+    Returns:
+        dict: The time of the steps, the time and memory of the `ready` methods by app, the
+            memory allocated by package when traced, and the peak resident memory in KiB.
+    """
+    imports = _ImportMemory()
+    if memory:
+        tracemalloc.start()
+        sys.meta_path.insert(0, imports)
+    started = time.perf_counter()
+    import django  # pylint: disable=import-outside-toplevel
+    from django.apps.config import AppConfig  # pylint: disable=import-outside-toplevel
+    from django.urls import get_resolver  # pylint: disable=import-outside-toplevel
+    ready: Dict[str, dict] = {}
+    create = AppConfig.create
+    AppConfig.create = lambda entry: _timed(create(entry), ready, memory)
+    imported = time.perf_counter()
+    django.setup()
+    set_up = time.perf_counter()
+    get_resolver().url_patterns  # pylint: disable=expression-not-assigned
+    routed = time.perf_counter()
+    return {'steps': {'import django': imported - started, 'setup': set_up - imported, 'urls': routed - set_up},
+            'ready': ready, 'memory': dict(imports.allocated),
+            'peak': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def _run(options: List[str], arguments: List[str]) -> subprocess.CompletedProcess:
+    """Run the start in a child interpreter with the environment and the path of this one."""
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    completed = subprocess.run([sys.executable, *options, '-m', __name__, *arguments], env=environment,
+                               capture_output=True, text=True)
+    if completed.returncode:
+        raise RuntimeError(completed.stderr)
+    return completed
+
+
+def _import_times(output: str) -> Dict[str, float]:
+    """Return the import time of each top-level package, in seconds, from the `-X importtime` output."""
+    times = defaultdict(float)
+    for line in output.splitlines():
+        fields = line.partition('import time:')[2].split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            times[fields[2].strip().partition('.')[0]] += int(fields[0]) / 1e6
+    return dict(times)
+
+
+def profile() -> dict:
+    """
+    Measure the start of the api in fresh interpreters.
+
+    Returns:
+        dict: The measures of `start`, the time of the traced start excepted, with the import
+            time by top-level package, and the memories measured by the traced start.
+    """
+    timed = _run(['-X', 'importtime'], [])
+    report = json.loads(timed.stdout)
+    traced = json.loads(_run([], [MEMORY_FLAG]).stdout)
+    for label, measure in report['ready'].items():
+        measure['memory'] = traced['ready'].get(label, {}).get('memory', 0)
+    report['imports'] = _import_times(timed.stderr)
+    report['memory'] = traced['memory']
+    return report
+
+
+if __name__ == '__main__':
+    print(json.dumps(start(MEMORY_FLAG in sys.argv)))
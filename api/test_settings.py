@@ -0,0 +1,10 @@
+"""This module defines the settings of the tests.
+
+The tests run on two shards, so the routing of the owners data between them is
+covered: `python manage.py test --settings=api.test_settings`.
+"""
+import os
+
+os.environ.setdefault('FOODSTOCK_SHARDS', '2')
+
+from api.settings import *  # noqa: E402,F401,F403 pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-position
@@ -0,0 +1,61 @@
+"""This module defines the helpers shared by the tests of the apps."""
+import tempfile
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from api.sharding import assign, shard_of
+
+PASSWORD = 'Very-long-pw1'
+
+
+def connect(username: str) -> APIClient:
+    """
+    Create a user on its shard and return a client authenticated by its token.
+
+    The user is created on the connection of the test rather than through the async
+    registration view, whose thread would write outside the transaction of the test.
+
+    Args:
+        username (str): The name of the new user.
+
+    Returns:
+        APIClient: The client sending the token of the user.
+    """
+    user = User.objects.create_user(username, f'{username}@foodstock.fr', PASSWORD)
+    assign(user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')  # pylint: disable=no-member
+    return client
+
+
+def database_of(username: str) -> str:
+    """Return the shard of the data of a user, to query it outside a request."""
+    return shard_of(User.objects.select_related('shard').get(username=username))
+
+
+class TestRunner(DiscoverRunner):
+    """
+    This class runs the tests with the data files of the api in a temporary directory.
+
+    Attributes:
+        data (TemporaryDirectory): The directory of the data files, removed after the run.
+        data_settings (override_settings): The settings pointing the data files to the directory.
+    """
+
+    def setup_test_environment(self, **kwargs: dict):
+        """Point the data files to a new temporary directory."""
+        super().setup_test_environment(**kwargs)
+        self.data = tempfile.TemporaryDirectory()
+        data = Path(self.data.name)
+        self.data_settings = override_settings(THROTTLE_FILE=data / 'throttle.bin', DIGEST_FILE=data / 'digests.jsonl',
+                                               SNAPSHOT_DIR=data / 'snapshots')
+        self.data_settings.enable()
+
+    def teardown_test_environment(self, **kwargs: dict):
+        """Restore the data files settings and remove the directory."""
+        self.data_settings.disable()
+        self.data.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,591 @@
+"""This module manages the tests for the api app."""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import (LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from rest_framework.authtoken.models import Token
+from api import serving
+from api.admin import EstimatedCountPaginator
+from api.db import chunks, pending_migrations, uninstall_triggers
+from api.handlers import LeanWSGIHandler, get_wsgi_application, is_full
+from api.loadtest import SCENARIOS, LoadTest, load_collection, percentile
+from api.sharding import shard_of, shards
+from api.startup import _import_times
+from api.testing import connect, database_of
+from api.throttling import TokenBuckets
+from authentication import versions
+from authentication.models import OwnerVersion, ShardAssignment
+from categories.models import Category
+from products.models import Batch, Product
+from providers.models import Provider
+
+
+class MultiplexTests(TestCase):
+    """This class tests the requests run together by the multiplex endpoint."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Register a user."""
+        self.client = connect('batcher')
+
+    def run_batch(self, *requests: dict, parallel: bool = False) -> list:
+        """Post requests to the multiplex endpoint and return their responses."""
+        response = self.client.post('/batch', {'requests': list(requests), 'parallel': parallel}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_requests_run_in_order(self):
+        """The requests run in order, each seeing the writes of the previous ones."""
+        created, listed = self.run_batch({'method': 'POST', 'path': '/categories/', 'body': {'label': 'Dairy'}},
+                                         {'method': 'GET', 'path': '/categories/'})
+        self.assertEqual((created['status'], listed['status']), (201, 200))
+        self.assertEqual([category['id'] for category in listed['body']], [created['body']['id']])
+
+    def test_failures_are_independent(self):
+        """A failed request is reported without stopping the next ones."""
+        missing, unknown, nested, listed = self.run_batch(
+            {'method': 'GET', 'path': '/products/999999'},
+            {'method': 'GET', 'path': '/nowhere/'},
+            {'method': 'POST', 'path': '/batch', 'body': {'requests': []}},
+            {'method': 'GET', 'path': '/products/?format=json'})
+        self.assertEqual([missing['status'], unknown['status'], nested['status'], listed['status']], [404, 404, 404, 200])
+
+    def test_requests_use_the_credentials_of_the_batch(self):
+        """The requests run as the user of the batch, whatever their own headers."""
+        connect('other').post('/categories/', {'label': 'Other'}, format='json')
+        [listed] = self.run_batch({'method': 'GET', 'path': '/categories/',
+                                   'headers': {'Authorization': 'Token nope'}})
+        self.assertEqual((listed['status'], listed['body']), (200, []))
+
+    def test_invalid_batches_are_refused(self):
+        """A batch without requests or with an unknown method is answered 400, and needs a user."""
+        self.assertEqual(self.client.post('/batch', {'requests': []}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/batch', {'requests': [{'method': 'PATCH', 'path': '/'}]},
+                                          format='json').status_code, 400)
+        self.client.credentials()
+        self.assertEqual(self.client.post('/batch', {'requests': [{'method': 'GET', 'path': '/categories/'}]},
+                                          format='json').status_code, 401)
+
+
+class ParallelMultiplexTests(TransactionTestCase):
+    """This class tests the GET requests run in parallel threads, on their own connections."""
+
+    databases = '__all__'
+
+    def test_parallel_reads_keep_their_order(self):
+        """The parallel reads answer in the order of the requests, after the writes before them."""
+        client = connect('reader')
+        for label in ('Dairy', 'Fruits'):
+            client.post('/categories/', {'label': label}, format='json')
+        requests = [{'method': 'GET', 'path': '/categories/'}, {'method': 'POST', 'path': '/categories/',
+                                                                 'body': {'label': 'Meat'}}]
+        requests += [{'method': 'GET', 'path': f'/categories/?n={index}'} for index in range(3)]
+        responses = client.post('/batch', {'requests': requests, 'parallel': True}, format='json').json()
+        self.assertEqual([response['status'] for response in responses], [200, 201, 200, 200, 200])
+        self.assertEqual(len(responses[0]['body']), 2)
+        self.assertEqual([len(response['body']) for response in responses[2:]], [3, 3, 3])
+
+
+class TokenBucketsTests(SimpleTestCase):
+    """This class tests the token buckets of the throttle."""
+
+    def setUp(self):
+        """Map buckets in a temporary file."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'throttle.bin')
+        self.buckets = TokenBuckets(self.path, slots=16)
+
+    def test_refill(self):
+        """An empty bucket gets a token back after the refill delay."""
+        now = 1000.0
+        self.assertEqual(self.buckets.take(7, 2, 1.0, now), 0)
+        self.assertEqual(self.buckets.take(7, 2, 1.0, now), 0)
+        self.assertAlmostEqual(self.buckets.take(7, 2, 1.0, now), 1.0)
+        self.assertAlmostEqual(self.buckets.take(7, 2, 1.0, now + 0.5), 0.5)
+        self.assertEqual(self.buckets.take(7, 2, 1.0, now + 1.5), 0)
+
+    def test_keys_have_their_own_buckets(self):
+        """Draining the bucket of a key leaves the others full, in its slot and in the next ones."""
+        self.buckets.take(7, 1, 0.001, 1000.0)
+        for key in (7 + 16, 8):
+            self.assertEqual(self.buckets.take(key, 1, 0.001, 1000.0), 0)
+        self.assertGreater(self.buckets.take(7, 1, 0.001, 1000.0), 0)
+
+    def test_least_recent_slot_is_taken_over(self):
+        """A key without free slot takes the least recently used one over, and starts full."""
+        keys = [7 + 16 * index for index in range(5)]
+        for index, key in enumerate(keys[:4]):
+            self.buckets.take(key, 1, 0.001, 1000.0 + index)
+        self.assertEqual(self.buckets.take(keys[4], 1, 0.001, 1004.0), 0)
+        self.assertEqual(self.buckets.take(keys[0], 1, 0.001, 1004.0), 0)
+        self.assertGreater(self.buckets.take(keys[3], 1, 0.001, 1004.0), 0)
+
+    def test_clock_set_back(self):
+        """A bucket counted at a later time than now is not drained."""
+        self.buckets.take(7, 2, 1.0, 1_700_000_000.0)
+        self.assertEqual(self.buckets.take(7, 2, 1.0, 1000.0), 0)
+
+    def test_buckets_outlive_the_mapping(self):
+        """The buckets of a file are found again by a new mapping, refilled meanwhile."""
+        self.buckets.take(7, 1, 1.0, 1_700_000_000.0)
+        buckets = TokenBuckets(self.path, slots=16)
+        self.assertGreater(buckets.take(7, 1, 1.0, 1_700_000_000.0), 0)
+        self.assertEqual(buckets.take(7, 1, 1.0, 1_700_000_001.0), 0)
+
+
+class ThrottleTests(TestCase):
+    """This class tests the throttling of the requests."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Point the buckets to a new temporary file."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(THROTTLE_FILE=Path(directory.name) / 'throttle.bin')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_too_many_requests(self):
+        """The request over the rate of a route is answered 429 with the delay to wait, on this route only."""
+        client = connect('hasty')
+        with mock.patch.dict('api.throttling._rates', {'user': (2.0, 2.0 / 60)}):
+            self.assertEqual(client.get('/categories/').status_code, 200)
+            self.assertEqual(client.get('/categories/').status_code, 200)
+            response = client.get('/categories/')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '30')
+            self.assertEqual(client.get('/providers/').status_code, 200)
+            self.assertEqual(connect('patient').get('/categories/').status_code, 200)
+
+
+class AdminTests(TestCase):
+    """This class tests the admin pages of the owned resources."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create an owner with five products, a batch of the first one, and log in a superuser."""
+        self.owner = User.objects.create(username='grocer')
+        category = Category.objects.create(owner=self.owner, label='Dairy')  # pylint: disable=no-member
+        self.products = [Product.objects.create(owner=self.owner, label=label, unit='u', category=category)  # pylint: disable=no-member
+                         for label in ('Whole milk', 'Skimmed milk', 'Butter', 'Cream', 'Cheese')]
+        provider = Provider.objects.create(owner=self.owner, label='Shop', address='1 rue', city='Lyon',  # pylint: disable=no-member
+                                           zipcode='69000', phone='0400000000')
+        Batch.objects.create(owner=self.owner, product=self.products[0], provider=provider, initial=1, current=0,  # pylint: disable=no-member
+                             purchase='2026-01-01', limit='2026-02-01')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@foodstock.fr', 'Very-long-pw1'))
+
+    def results(self, path: str, **params: dict) -> list:
+        """Return the objects listed by a changelist."""
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list)
+
+    def test_search_by_label_owner_and_identifier(self):
+        """The search matches the words of the labels, the username of the owner and the identifier."""
+        self.assertEqual(self.results('/admin/products/product/', q='mil'), [self.products[1], self.products[0]])
+        self.assertEqual(len(self.results('/admin/products/product/', q='grocer')), 5)
+        self.assertEqual(self.results('/admin/products/product/', q=str(self.products[2].pk)), [self.products[2]])
+        self.assertEqual([batch.product for batch in self.results('/admin/products/batch/', q='whole')],
+                         [self.products[0]])
+
+    def test_stock_filter(self):
+        """The batches are filtered on their current quantity."""
+        self.assertEqual(self.results('/admin/products/batch/', in_stock='1'), [])
+        self.assertEqual(len(self.results('/admin/products/batch/', in_stock='0')), 1)
+
+    def test_paginator_estimates_large_lists(self):
+        """A large unfiltered list takes the estimated count once analyzed, a filtered one is counted up to the limit."""
+        products = Product.objects.order_by('-id')  # pylint: disable=no-member
+        with mock.patch.object(EstimatedCountPaginator, 'exact_limit', 2):
+            self.assertEqual(EstimatedCountPaginator(products, 2).count, 3)
+            with connections[products.db].cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.assertEqual(EstimatedCountPaginator(products, 2).count, 5)
+            self.assertEqual(EstimatedCountPaginator(products.filter(unit='u'), 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(products.filter(unit='u'), 2).count, 5)
+
+
+@skipUnless(len(shards()) > 1, 'The shard admin tests run with api.test_settings.')
+class ShardAdminTests(TestCase):
+    """This class tests the admin sites of the shards."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect users until one is on another shard than the default one, with a category, and log in a superuser."""
+        for index in range(len(shards()) * 2):
+            connect(f'user{index}')
+        owners = User.objects.select_related('shard').filter(username__startswith='user')
+        self.central = next(user for user in owners if shard_of(user) == DEFAULT_DB_ALIAS)
+        self.sharded = next(user for user in owners if shard_of(user) != DEFAULT_DB_ALIAS)
+        self.database = shard_of(self.sharded)
+        self.category = Category.objects.using(self.database).create(owner=self.sharded, label='Sharded')  # pylint: disable=no-member
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@foodstock.fr', 'Very-long-pw1'))
+
+    def test_site_of_a_shard(self):
+        """The site of a shard lists and edits the resources of the shard only."""
+        response = self.client.get(f'/admin/{self.database}/categories/category/')
+        self.assertEqual([category.label for category in response.context['cl'].result_list], ['Sharded'])
+        response = self.client.get('/admin/categories/category/')
+        self.assertNotIn('Sharded', [category.label for category in response.context['cl'].result_list])
+        path = f'/admin/{self.database}/categories/category/{self.category.pk}/change/'
+        self.assertEqual(self.client.get(path).status_code, 200)
+        response = self.client.post(path, {'label': 'Renamed', 'owner': self.sharded.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Category.objects.using(self.database).get(pk=self.category.pk).label, 'Renamed')  # pylint: disable=no-member
+
+    def test_owner_of_another_shard_is_refused(self):
+        """A resource is only added for an owner whose data is on the shard of the site."""
+        path = f'/admin/{self.database}/categories/category/add/'
+        response = self.client.post(path, {'label': 'Misplaced', 'owner': self.central.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('owner', response.context['adminform'].form.errors)
+        response = self.client.post('/admin/categories/category/add/', {'label': 'Misplaced', 'owner': self.sharded.pk})
+        self.assertIn('owner', response.context['adminform'].form.errors)
+        self.assertEqual(self.client.post(path, {'label': 'Placed', 'owner': self.sharded.pk}).status_code, 302)
+        self.assertTrue(Category.objects.using(self.database).filter(owner=self.sharded, label='Placed').exists())  # pylint: disable=no-member
+
+
+@skipUnless(len(shards()) > 1, 'The sharding tests run with api.test_settings.')
+class ShardingTests(TestCase):
+    """This class tests the assignment of the users to the shards and the routing of their requests."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect users until one is on the default database and one on another shard."""
+        clients = {}
+        for index in range(len(shards()) * 2):
+            client = connect(f'user{index}')
+            user = User.objects.select_related('shard').get(username=f'user{index}')
+            clients.setdefault(shard_of(user), (user, client))
+        self.central, self.central_client = clients[DEFAULT_DB_ALIAS]
+        self.sharded, self.sharded_client = next(
+            owner for database, owner in clients.items() if database != DEFAULT_DB_ALIAS)
+        self.shard = shard_of(self.sharded)
+
+    def test_assignment(self):
+        """A new user is assigned a shard by identifier, and mirrored on it to be referenced."""
+        self.assertEqual(self.shard, shards()[self.sharded.pk % len(shards())])
+        self.assertTrue(ShardAssignment.objects.filter(user=self.sharded, database=self.shard).exists())  # pylint: disable=no-member
+        mirror = User.objects.using(self.shard).get(pk=self.sharded.pk)
+        self.assertEqual(mirror.username, str(self.sharded.pk))
+        self.assertFalse(mirror.has_usable_password())
+        self.assertFalse(User.objects.using(self.shard).filter(pk=self.central.pk).exists())
+
+    def test_requests_are_routed_to_the_shard_of_their_user(self):
+        """The data of a user is written to and read from its shard only."""
+        created = self.sharded_client.post('/categories/', {'label': 'Sharded'}, format='json')
+        self.assertEqual(created.status_code, 201)
+        self.central_client.post('/categories/', {'label': 'Central'}, format='json')
+        self.assertEqual(list(Category.objects.using(self.shard).values_list('label', flat=True)), ['Sharded'])  # pylint: disable=no-member
+        self.assertEqual(list(Category.objects.using(DEFAULT_DB_ALIAS).values_list('label', flat=True)), ['Central'])  # pylint: disable=no-member
+        self.assertEqual([category['label'] for category in self.sharded_client.get('/categories/').json()],
+                         ['Sharded'])
+        self.assertNotEqual(self.central_client.get(f"/categories/{created.json()['id']}").json().get('label'), 'Sharded')
+
+    def test_moving_user_is_refused(self):
+        """The requests of a user whose data is being moved are answered 503."""
+        ShardAssignment.objects.filter(user=self.sharded).update(moving=True)  # pylint: disable=no-member
+        response = self.sharded_client.get('/categories/')
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
+        self.assertEqual(self.central_client.get('/categories/').status_code, 200)
+
+    def test_deleting_a_user_deletes_its_mirror_and_data(self):
+        """A central user deleted is deleted from its shard with its data."""
+        self.sharded_client.post('/categories/', {'label': 'Sharded'}, format='json')
+        self.sharded.delete()
+        self.assertFalse(User.objects.using(self.shard).filter(pk=self.sharded.pk).exists())
+        self.assertFalse(Category.objects.using(self.shard).exists())  # pylint: disable=no-member
+
+
+class LeanMiddlewareTests(TestCase):
+    """This class tests the middleware chains of the api and of the admin site."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user and build the application sending the requests to both chains."""
+        connect('lean')
+        self.token = Token.objects.get(user__username='lean').key  # pylint: disable=no-member
+        self.application = get_wsgi_application()
+
+    def call(self, path: str, **headers: str):
+        """Send a GET request through the application, and return its status and headers."""
+        answer = {}
+
+        def start_response(status: str, response_headers: list):
+            """Keep the status and the headers of the response."""
+            answer.update(response_headers, status=int(status.split()[0]))
+        request_started.disconnect(close_old_connections)
+        try:
+            response = self.application(RequestFactory().get(path, **headers).environ, start_response)
+            response.close()
+        finally:
+            request_started.connect(close_old_connections)
+        return answer
+
+    def test_paths(self):
+        """Only the admin site goes through the full chain."""
+        self.assertTrue(is_full('/admin/login/'))
+        self.assertFalse(is_full('/products/'))
+        self.assertFalse(is_full('/admins'))
+
+    def test_lean_chain(self):
+        """The api handler loads the api chain, without reading nor changing the full one."""
+        full = ['api.missing.Middleware']
+        with override_settings(MIDDLEWARE=full):
+            handler = LeanWSGIHandler()
+            self.assertEqual(settings.MIDDLEWARE, full)
+        views = [type(method.__self__).__name__ for method in handler._view_middleware]  # pylint: disable=protected-access
+        self.assertNotIn('CsrfViewMiddleware', views)
+
+    def test_api_request(self):
+        """An api request is authenticated by its token, without a session, a CSRF check or frame options."""
+        answer = self.call('/categories/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(answer['status'], 200)
+        self.assertNotIn('X-Frame-Options', answer)
+        self.assertNotIn('Set-Cookie', answer)
+
+    def test_admin_request(self):
+        """An admin request goes through the full chain."""
+        answer = self.call('/admin/login/')
+        self.assertEqual(answer['status'], 200)
+        self.assertEqual(answer['X-Frame-Options'], 'DENY')
+        self.assertIn('csrftoken', answer['Set-Cookie'])
+
+
+def answer_pid(sock: socket.socket, max_requests: int, ready):
+    """Serve the process id of the worker to each connection, as the loop of a test worker."""
+    ready()
+    served = 0
+    sock.settimeout(serving.TICK)
+    while not serving.draining and (max_requests is None or served < max_requests):
+        try:
+            connection, _ = sock.accept()
+        except socket.timeout:
+            continue
+        with connection:
+            connection.sendall(str(os.getpid()).encode())
+        served += 1
+
+
+class ServeTests(SimpleTestCase):
+    """This class tests the master process of the serve command, with workers answering their process id."""
+
+    def setUp(self):
+        """Listen on a free port."""
+        self.sock = serving.listen('127.0.0.1', 0, 16)
+        self.addCleanup(self.sock.close)
+        self.options = {'workers': 2, 'max_requests': 1, 'max_requests_jitter': 0, 'graceful_timeout': 5.0}
+        self.messages = []
+
+    def master(self) -> serving.Master:
+        """Return a master of the test workers, stopped after the test."""
+        master = serving.Master(self.sock, answer_pid, self.options, self.messages.append)
+        self.addCleanup(lambda: master.stop(list(master.workers)))
+        return master
+
+    def request(self) -> int:
+        """Connect to the socket and return the process id of the worker answering."""
+        with socket.create_connection(self.sock.getsockname()[:2], timeout=5.0) as connection:
+            return int(connection.recv(16))
+
+    def test_listen_inherits_the_socket(self):
+        """A master run again after a reload listens on the socket of the previous one."""
+        with mock.patch.dict(os.environ, {serving.FD_VARIABLE: str(self.sock.fileno())}):
+            sock = serving.listen('127.0.0.1', 0, 16)
+            self.assertNotIn(serving.FD_VARIABLE, os.environ)
+        self.assertEqual(sock.getsockname(), self.sock.getsockname())
+        sock.detach()
+
+    def test_workers_are_recycled(self):
+        """The workers answer on the shared socket, and are replaced once they served their requests."""
+        master = self.master()
+        master.adopt()
+        first = set(master.workers)
+        self.assertEqual(len(first), 2)
+        pid = self.request()
+        self.assertIn(pid, first)
+        while master.reap() != [pid]:
+            pass
+        master.spawn()
+        self.assertEqual(len(master.workers), 2)
+        self.assertNotIn(pid, master.workers)
+
+    def test_stop(self):
+        """The stopped workers drain and exit."""
+        master = self.master()
+        master.adopt()
+        pids = list(master.workers)
+        master.stop(pids)
+        self.assertFalse(master.workers)
+        for pid in pids:
+            with self.assertRaises(ChildProcessError):
+                os.waitpid(pid, os.WNOHANG)
+
+    def test_reload_replaces_the_workers(self):
+        """A master run again after a reload stops the previous workers once its own accept."""
+        old = self.master()
+        old.adopt()
+        with mock.patch.dict(os.environ, {serving.OLD_WORKERS_VARIABLE: ','.join(map(str, old.workers))}):
+            new = self.master()
+            new.adopt()
+        self.assertEqual(len(new.workers), 2)
+        self.assertFalse(new.workers & old.workers)
+        self.assertEqual(self.messages, ['2 previous workers stopped.'])
+        self.assertIn(self.request(), new.workers)
+
+
+class ReadyTests(TestCase):
+    """This class tests the readiness probe of the workers."""
+
+    databases = '__all__'
+
+    def test_ready(self):
+        """A worker reaching its databases is ready, and a draining one is not."""
+        self.assertEqual(self.client.get('/ready').json(), {'status': 'ready'})
+        with mock.patch('api.serving.draining', True):
+            response = self.client.get('/ready')
+        self.assertEqual((response.status_code, response.json()), (503, {'status': 'draining'}))
+
+
+class StartupTests(SimpleTestCase):
+    """This class tests the start of the api and its report."""
+
+    def test_admin_is_deferred(self):
+        """A started api imports the admin modules on the first admin request only."""
+        code = ('import sys, django; django.setup(); from django.urls import get_resolver; '
+                'get_resolver().url_patterns; print(*(name in sys.modules for name in '
+                '("api.admin_urls", "products.admin", "numpy")))')
+        completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                   env=dict(os.environ, DJANGO_SETTINGS_MODULE='api.settings'))
+        self.assertEqual(completed.stdout.split(), ['False', 'False', 'False'])
+
+    def test_import_times(self):
+        """The import times are summed by top-level package, in seconds."""
+        output = ('import time: self [us] | cumulative | imported package\n'
+                  'import time:    250000 |     250000 |   django.utils\n'
+                  'import time:    500000 |     750000 | django\n'
+                  'import time:      1000 |       1000 | numpy\n')
+        self.assertEqual(_import_times(output), {'django': 0.75, 'numpy': 0.001})
+
+
+class EnsureMigratedTests(TestCase):
+    """This class tests the command migrating the databases only when they are behind."""
+
+    databases = '__all__'
+
+    def ensure_migrated(self, database: str = DEFAULT_DB_ALIAS) -> str:
+        """Run the command on a database, without running `migrate`, and return its output."""
+        out = StringIO()
+        with mock.patch('api.management.commands.ensure_migrated.call_command') as migrate:
+            call_command('ensure_migrated', '--database', database, stdout=out)
+        self.migrated = migrate.called  # pylint: disable=attribute-defined-outside-init
+        return out.getvalue()
+
+    def test_up_to_date(self):
+        """A database with every migration recorded is left as it is."""
+        self.assertEqual(pending_migrations(DEFAULT_DB_ALIAS), set())
+        self.assertEqual(self.ensure_migrated(), 'default: no pending migrations.\n')
+        self.assertFalse(self.migrated)
+
+    def test_triggers_installed_again(self):
+        """An up to date database gets its triggers installed again, the missing ones included."""
+        client = connect('migrated')
+        database = database_of('migrated')
+        uninstall_triggers(versions.TRIGGERS, database)
+        self.assertEqual(self.ensure_migrated(database), f'{database}: no pending migrations.\n')
+        client.post('/categories/', {'label': 'Dairy'}, format='json')
+        self.assertEqual(OwnerVersion.catalog_of(User.objects.get(username='migrated').pk, database), 1)
+
+    def test_behind(self):
+        """A database missing a migration is migrated."""
+        MigrationRecorder(connection).migration_qs.filter(app='products', name='0001_initial').delete()
+        self.assertEqual(pending_migrations(DEFAULT_DB_ALIAS), {('products', '0001_initial')})
+        self.assertEqual(self.ensure_migrated(), 'default: 1 pending migrations.\n')
+        self.assertTrue(self.migrated)
+
+
+class LoadTestTests(LiveServerTestCase):
+    """This class tests the load test replaying the Insomnia collection."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Read the collection."""
+        self.requests = load_collection(os.path.join(settings.BASE_DIR, 'tools', 'insomnia.json'))
+
+    def test_collection(self):
+        """The collection holds every request of the scenarios, with its identifiers and authorization."""
+        self.assertEqual({step for scenario in SCENARIOS for step in scenario.steps} - set(self.requests), set())
+        request = self.requests['batches/update']
+        self.assertEqual((request.method, request.path, request.authorization), ('PUT', '/products/1/batches/2', 'token'))
+        self.assertIsNone(self.requests['authentication/login'].authorization)
+
+    def test_summary(self):
+        """The measures are summarized by percentile, with the throttled requests apart from the errors."""
+        self.assertEqual(percentile([0.1, 0.2, 0.3, 0.4], 0.5), 0.2)
+        summary = LoadTest.summarize([(0.1, 200), (0.2, 429), (0.3, 500), (0.4, 201)], 2.0)
+        self.assertEqual((summary['count'], summary['throughput'], summary['errors'], summary['throttled']),
+                         (4, 2.0, 0.25, 0.25))
+        self.assertEqual((summary['p50'], summary['p99'], summary['max']), (0.2, 0.4, 0.4))
+
+    def test_run(self):
+        """A virtual user seeds its data and runs scenarios against the server, then is deleted."""
+        out = StringIO()
+        call_command('load_test', '--url', self.live_server_url, '--users', '1', '--duration', '0.5',
+                     '--products', '1', '--batches', '1', '--scenarios', 'browse=1', stdout=out, stderr=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('1 users for '))
+        self.assertEqual([line.split()[0] for line in lines[2:]], ['batches/get', 'batches/list', 'products/get',
+                                                                   'products/list', 'total'])
+        self.assertEqual(lines[-1].split()[-2], '0.0%')
+        self.assertFalse(User.objects.filter(username__startswith='load-test-').exists())
+
+
+class DatabasesTests(TestCase):
+    """This class tests the databases of the settings and the chunked reads."""
+
+    databases = '__all__'
+
+    def test_postgresql_settings(self):
+        """The PostgreSQL engine names the shard databases after the default one and keeps the connections."""
+        code = ('from django.conf import settings; '
+                'print(*[(alias, database["ENGINE"].rpartition(".")[2], database["NAME"], database["CONN_MAX_AGE"]) '
+                'for alias, database in settings.DATABASES.items()], sep="\\n")')
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE='api.settings', FOODSTOCK_SHARDS='2',
+                           FOODSTOCK_DB_ENGINE='postgresql', FOODSTOCK_DB_NAME='stock')
+        environment.pop('FOODSTOCK_DB_CONN_MAX_AGE', None)
+        completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                   env=environment)
+        self.assertEqual(completed.stdout.splitlines(), ["('default', 'postgresql', 'stock', 600)",
+                                                         "('shard_1', 'postgresql', 'stock_shard_1', 600)"])
+
+    def test_chunks(self):
+        """A large queryset is read by chunks, their related objects prefetched."""
+        client = connect('reader')
+        category = client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        for label in ('Milk', 'Butter', 'Cream'):
+            client.post('/products/', {'label': label, 'unit': 'L', 'category': category}, format='json')
+        products = Product.objects.using(database_of('reader')).order_by('pk')  # pylint: disable=no-member
+        read = list(chunks(products, 2, 'category'))
+        self.assertEqual([[product.label for product in chunk] for chunk in read], [['Milk', 'Butter'], ['Cream']])
+        with self.assertNumQueries(0, using=database_of('reader')):
+            self.assertEqual({product.category.label for chunk in read for product in chunk}, {'Dairy'})
@@ -0,0 +1,174 @@
+"""This module throttles the requests of each user on each route with token buckets.
+
+The buckets live in a file mapped in memory by every worker process, so a client is
+throttled across the workers without a cache round trip. A bucket is a fixed slot of
+the file, found by hashing the user and the route, and is read and written in place
+without lock: two workers racing on the same bucket may let one extra request pass,
+which a throttle can afford, and the check costs no system call.
+
+The file outlives the processes, so the buckets are counted in wall-clock time, and
+a clock set back refills no bucket but never drains one either.
+"""
+import mmap
+import os
+import time
+import zlib
+from typing import Optional, Tuple
+from django.conf import settings
+from django.test.signals import setting_changed
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+SLOT_WORDS = 3
+
+SLOTS = 1 << 16
+
+PROBES = 4
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class TokenBuckets:
+    """
+    This class defines a table of token buckets shared by the processes mapping its file.
+
+    Each slot holds three aligned 8 bytes words, written one by one: the key of its
+    bucket, its tokens and the time they were counted. A key is looked up in a few
+    consecutive slots; when none holds it, the least recently used one is taken over,
+    and the bucket starts full.
+
+    Attributes:
+        keys (memoryview): The file as 64 bits integers, the keys at the slot starts.
+        values (memoryview): The file as doubles, the tokens and times after the keys.
+        mask (int): The slot count minus one.
+    """
+
+    def __init__(self, path: str, slots: int = SLOTS):
+        """Map the file of the buckets, creating it if needed."""
+        size = slots * SLOT_WORDS * 8
+        descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(descriptor).st_size < size:
+                os.ftruncate(descriptor, size)
+            memory = mmap.mmap(descriptor, size)
+        finally:
+            os.close(descriptor)
+        self.keys = memoryview(memory).cast('Q')
+        self.values = memoryview(memory).cast('d')
+        self.mask = slots - 1
+
+    def take(self, key: int, capacity: float, rate: float, now: float) -> float:
+        """
+        Take a token from a bucket.
+
+        Args:
+            key (int): The bucket key, a non-zero 64 bits integer.
+            capacity (float): The maximum number of tokens of the bucket.
+            rate (float): The tokens added per second.
+            now (float): The current time, in seconds since the epoch.
+
+        Returns:
+            float: 0 if a token was taken, else the seconds until the next one.
+        """
+        keys, values = self.keys, self.values
+        word = (((key >> 32) * 40503 ^ key) & self.mask) * SLOT_WORDS
+        if keys[word] == key:
+            tokens = min(capacity, values[word + 1] + max(0.0, now - values[word + 2]) * rate)
+        else:
+            word, tokens = self.claim(key, word, capacity, rate, now)
+        if tokens < 1:
+            values[word + 1], values[word + 2] = tokens, now
+            return (1 - tokens) / rate
+        values[word + 1], values[word + 2] = tokens - 1, now
+        return 0.0
+
+    def claim(self, key: int, first: int, capacity: float, rate: float, now: float) -> Tuple[int, float]:
+        """Return the first word and the tokens of a bucket missing from its first slot, taking a slot over if needed."""
+        keys, values = self.keys, self.values
+        victim, oldest = first, values[first + 2]
+        for probe in range(1, PROBES):
+            word = (first + probe * SLOT_WORDS) % len(keys)
+            if keys[word] == key:
+                return word, min(capacity, values[word + 1] + max(0.0, now - values[word + 2]) * rate)
+            if values[word + 2] < oldest:
+                victim, oldest = word, values[word + 2]
+        keys[victim] = key
+        return victim, capacity
+
+
+_buckets: Optional[TokenBuckets] = None
+
+_routes = {}
+
+_rates = {}
+
+
+def buckets() -> TokenBuckets:
+    """Return the buckets of the process, mapping their file on the first call."""
+    global _buckets  # pylint: disable=global-statement
+    if _buckets is None:
+        _buckets = TokenBuckets(str(settings.THROTTLE_FILE))
+    return _buckets
+
+
+def reset(setting: str, **kwargs: dict):
+    """Drop the buckets and the rates of the process when their settings change, as in the tests."""
+    global _buckets  # pylint: disable=global-statement
+    if setting == 'THROTTLE_FILE':
+        _buckets = None
+    elif setting == 'REST_FRAMEWORK':
+        _rates.clear()
+
+
+setting_changed.connect(reset)
+
+
+def parse_rate(scope: str) -> Optional[Tuple[float, float]]:
+    """Return the capacity and the tokens per second of the rate of a scope, like `300/min`, or None."""
+    if scope not in _rates:
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            _rates[scope] = None
+        else:
+            count, period = rate.split('/')
+            _rates[scope] = (float(count), float(count) / DURATIONS[period[0]])
+    return _rates[scope]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    This class defines the throttle of the requests of a user on a route.
+
+    Each user has a bucket per route pattern, so a client hammering a route is slowed
+    down on it only. The rate is the one of the `throttle_scope` of the view, `user` by
+    default, and the anonymous requests are counted by client address.
+
+    Attributes:
+        default_scope (str): The scope of the views without `throttle_scope`.
+        delay (float): The seconds to wait before the next allowed request.
+    """
+
+    default_scope = 'user'
+    delay = 0.0
+
+    def allow_request(self, request, view) -> bool:
+        """Take a token from the bucket of the user and the route of the request."""
+        rate = parse_rate(getattr(view, 'throttle_scope', self.default_scope))
+        if rate is None:
+            return True
+        match = getattr(request._request, 'resolver_match', None)  # pylint: disable=protected-access
+        route = match.route if match is not None else request.path
+        route_hash = _routes.get(route)
+        if route_hash is None:
+            route_hash = _routes[route] = zlib.crc32(route.encode())
+        user = request.user
+        if user is not None and user.is_authenticated:
+            key = user.id << 32 | route_hash
+        else:
+            key = 1 << 63 | zlib.crc32(self.get_ident(request).encode()) << 32 | route_hash
+        self.delay = buckets().take(key & 0xFFFFFFFFFFFFFFFF, *rate, time.time())
+        return not self.delay
+
+    def wait(self) -> float:
+        """Return the seconds to wait before the next allowed request."""
+        return self.delay
@@ -12,14 +12,27 @@ Class-based views
 Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
+
+The admin site is routed by a module path rather than by `include()`, which imports it
+right away, so that its modules are only imported on the first admin request.
 """
-from django.contrib import admin
 from django.urls import include, path
+from api.views import MultiplexView, ready
+from snapshots.views import SnapshotView
 
 urlpatterns = [
     path('authentication/', include('authentication.urls')),
     path('categories/', include('categories.urls')),
     path('providers/', include('providers.urls')),
     path('products/', include('products.urls')),
-    path('admin/', admin.site.urls),
+    path('batches/', include('products.batch_urls')),
+    path('search/', include('search.urls')),
+    path('analytics/', include('analytics.urls')),
+    path('ledger/', include('ledger.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('changes/', include('changes.urls')),
+    path('batch', MultiplexView.as_view()),
+    path('snapshot', SnapshotView.as_view()),
+    path('ready', ready),
+    path('admin/', ('api.admin_urls', None, None)),
 ]
@@ -0,0 +1,213 @@
+"""This module manages the views shared by the api resources."""
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import List
+from urllib.parse import urlsplit
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import DatabaseError, connections
+from django.http import HttpRequest, JsonResponse
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api import serving
+from api.serializers import BulkDeleteSerializer, MultiplexRequestSerializer
+from jobs.serializers import JobSerializer
+
+logger = logging.getLogger('django.request')
+
+
+class BulkDeleteView(APIView):
+    """
+    This class manages the view to delete several resources at once.
+
+    The identifiers which are not resources of the owner are listed in the response,
+    the other resources being deleted. A client sending `Prefer: respond-async` gets a
+    202 at once, with the job deleting the resources, followed at its `Location`, see
+    `jobs.queue`, whose result lists the resources deleted.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+        purge (function): The job deleting the resources of an owner from their identifiers, returning the deleted ones.
+
+    Returns:
+            200: The resources found are deleted, the others are listed.
+            202: The resources will be deleted by the returned job.
+            204: The resources are deleted.
+            400: An error is detected on the request data.
+            401: The user must be connected to access this resource.
+            404: None of the resources exists.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    purge = None
+
+    def post(self, request: Request, format=None) -> Response:
+        """
+        Delete the resources of the owner listed in the request.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The resources found are deleted, the others are listed.
+            202: The resources will be deleted by the returned job.
+            204: The resources are deleted.
+            400: An error is detected on the request data.
+            404: None of the resources exists, they are listed.
+        """
+        serializer = BulkDeleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if 'respond-async' in request.headers.get('Prefer', ''):
+            job = self.purge.enqueue(request.user, ids=serializer.validated_data['ids'])
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': f'/jobs/{job.pk}', 'Preference-Applied': 'respond-async'})
+        ids = serializer.validated_data['ids']
+        deleted = self.purge(request.user, ids)
+        missing = sorted(set(ids).difference(deleted))
+        if not missing:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response({'missing': missing}, status=status.HTTP_200_OK if deleted else status.HTTP_404_NOT_FOUND)
+
+
+class MultiplexView(APIView):
+    """
+    This class manages the view to run several requests of the api at once.
+
+    The requests are authenticated once, with the credentials of the batch, and are
+    dispatched straight to the views of their routes, without the middlewares. They
+    run in order and are independent: a failed request does not stop the next ones.
+    With `parallel`, the consecutive GET requests run together in threads.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+        max_threads (int): The maximum number of threads running GET requests.
+
+    Returns:
+            200: The status, headers and body of each request, in order.
+            400: An error is detected on the request data.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    max_threads = 4
+
+    def post(self, request: Request, format=None) -> Response:
+        """
+        Run the requests of the batch.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The responses of the requests.
+            400: An error is detected on the request data.
+        """
+        serializer = MultiplexRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        entries = serializer.validated_data['requests']
+        responses, reads = [None] * len(entries), []
+        for index, entry in enumerate(entries):
+            if serializer.validated_data['parallel'] and entry['method'] == 'GET':
+                reads.append(index)
+                continue
+            self.run_parallel(request, entries, reads, responses)
+            responses[index] = self.run(request, entry)
+        self.run_parallel(request, entries, reads, responses)
+        return Response(responses)
+
+    def run_parallel(self, request: Request, entries: List[dict], indexes: List[int], responses: List[dict]):
+        """Run the pending GET requests together, in the context of the batch, then empty their list."""
+        if len(indexes) == 1:
+            responses[indexes[0]] = self.run(request, entries[indexes[0]])
+        elif indexes:
+            with ThreadPoolExecutor(max_workers=min(self.max_threads, len(indexes))) as pool:
+                runs = [pool.submit(contextvars.copy_context().run, self.run_in_thread, request, entries[index])
+                        for index in indexes]
+                for index, run in zip(indexes, runs):
+                    responses[index] = run.result()
+        indexes.clear()
+
+    def run_in_thread(self, request: Request, entry: dict) -> dict:
+        """Run a request on a thread of the pool, and close the database connections of the thread."""
+        try:
+            return self.run(request, entry)
+        finally:
+            connections.close_all()
+
+    def run(self, request: Request, entry: dict) -> dict:
+        """
+        Run a request of the batch with the credentials of the batch.
+
+        Attributes:
+            request (Request): The batch request.
+            entry (dict): The validated request to run.
+
+        Returns:
+            dict: The status, headers and body of the response.
+        """
+        url = urlsplit(entry['path'])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            match = None
+        view = getattr(match.func, 'cls', None) if match else None
+        if view is None or not issubclass(view, APIView) or issubclass(view, MultiplexView):
+            return {'status': status.HTTP_404_NOT_FOUND, 'headers': {}, 'body': {'detail': 'Not found.'}}
+        body = json.dumps(entry['body']).encode() if 'body' in entry else b''
+        environ = {key: value for key, value in request.META.items()
+                   if key in ('SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR', 'HTTP_HOST', 'HTTP_USER_AGENT')}
+        environ.update({f'HTTP_{name.upper().replace("-", "_")}': value for name, value in entry['headers'].items()})
+        environ.update({'REQUEST_METHOD': entry['method'], 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+                        'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+                        'HTTP_ACCEPT': 'application/json', 'wsgi.input': BytesIO(body),
+                        'wsgi.url_scheme': request.scheme})
+        environ.pop('HTTP_AUTHORIZATION', None)
+        sub_request = WSGIRequest(environ)
+        sub_request.resolver_match = match
+        sub_request._force_auth_user = request.user  # pylint: disable=protected-access
+        sub_request._force_auth_token = request.auth  # pylint: disable=protected-access
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+            response.render()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Internal Server Error: %s', url.path, extra={'status_code': 500, 'request': sub_request})
+            return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'headers': {}, 'body': None}
+        headers = {name: value for name, value in response.items() if name not in ('Content-Type', 'Content-Length')}
+        return {'status': response.status_code, 'headers': headers,
+                'body': json.loads(response.content) if response.content else None}
+
+
+def ready(request: HttpRequest) -> JsonResponse:
+    """
+    Tell whether the worker answering can serve requests, for the probes of the orchestrator.
+
+    The view needs no authentication and is not throttled.
+
+    Args:
+        request (HttpRequest): The probe request.
+
+    Returns:
+            200: The worker accepts requests and reaches its databases.
+            503: The worker is stopping or a database is unreachable.
+    """
+    if serving.draining:
+        return JsonResponse({'status': 'draining'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        for connection in connections.all():
+            connection.ensure_connection()
+    except DatabaseError:
+        return JsonResponse({'status': 'unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return JsonResponse({'status': 'ready'})
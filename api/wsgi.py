@@ -2,6 +2,7 @@
 WSGI config for api project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+The api paths go through a lean middleware chain, see `api.handlers`.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/wsgi/
@@ -9,8 +10,8 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
+from api.handlers import get_wsgi_application  # noqa: E402 pylint: disable=wrong-import-position
+
 application = get_wsgi_application()
@@ -10,3 +10,13 @@ class AuthenticationConfig(AppConfig):
         name (str): The app name.
     """
     name: str = 'authentication'
+
+    def ready(self):
+        """Drop the owner versions and permissions triggers during the migrations, number the shards after, and watch the users."""
+        from api import sharding  # pylint: disable=import-outside-toplevel
+        from api.db import connect_installs  # pylint: disable=import-outside-toplevel
+        from authentication import permissions, versions  # pylint: disable=import-outside-toplevel
+        for triggers in (versions, permissions):
+            connect_installs(self, triggers.install, triggers.uninstall)
+        connect_installs(self, sharding.reserve_blocks)
+        sharding.connect()
@@ -0,0 +1,71 @@
+"""This module runs the password hashing off the event loop, on a bounded thread pool.
+
+Hashing a password is the costly part of a login or a registration. The hashers of
+`hashlib` release the GIL, so the pool hashes on several cores while the event loop
+keeps serving the other requests. The pool has one thread per core and admits a
+bounded number of waiting hashes: beyond, the request is refused rather than queued,
+so a login storm cannot pile up unbounded work.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+from django.contrib.auth.hashers import check_password, make_password
+
+HASHING_THREADS = os.cpu_count() or 2
+
+MAX_PENDING = HASHING_THREADS * 32
+
+executor = ThreadPoolExecutor(max_workers=HASHING_THREADS, thread_name_prefix='hashing')
+
+_pending = 0
+
+
+class Overloaded(Exception):
+    """This class defines the error of a hash refused because too many are waiting."""
+
+
+async def _run(function: Callable, *args: tuple):
+    """Run a hashing function on the pool, or raise Overloaded when it is saturated."""
+    global _pending  # pylint: disable=global-statement
+    if _pending >= MAX_PENDING:
+        raise Overloaded
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    """Return the encoded hash of a password."""
+    return await _run(make_password, password)
+
+
+def _check(password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+    """Check a password, hashing it again with the preferred hasher when the hash is outdated."""
+    rehashed = []
+    valid = check_password(password, encoded, setter=lambda raw: rehashed.append(make_password(raw)))
+    return valid, rehashed[0] if rehashed else None
+
+
+async def verify_password(password: str, encoded: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password against an encoded hash.
+
+    Without hash, as for an unknown user, a password is hashed anyway, so the time of
+    the answer does not tell whether the user exists. A valid password whose hash was
+    made by another hasher or with fewer iterations than the preferred ones is hashed
+    again on the pool, as `User.check_password` does, for the caller to save.
+
+    Args:
+        password (str): The password sent.
+        encoded (str): The encoded hash of the user password.
+
+    Returns:
+        tuple(bool, str): Whether the password matches, and its new encoded hash if it must be saved, else None.
+    """
+    if encoded is None:
+        await _run(make_password, password)
+        return False, None
+    return await _run(_check, password, encoded)
@@ -0,0 +1,82 @@
+"""This module defines the command measuring the logins per second of the api."""
+import asyncio
+import json
+import statistics
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+PREFIX = 'benchmark-login-'
+
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command measuring the logins per second of the api.
+
+    The logins are sent to the ASGI application in process, without network, by
+    temporary users deleted at the end, at several concurrency levels.
+    """
+
+    help = 'Measure the logins per second of the ASGI application.'
+
+    def add_arguments(self, parser):
+        """Add the size options of the benchmark."""
+        parser.add_argument('--users', type=int, default=20, help='The number of users logging in.')
+        parser.add_argument('--logins', type=int, default=200, help='The number of logins per concurrency level.')
+        parser.add_argument('--concurrency', default='1,8,32', help='The concurrency levels, separated by commas.')
+
+    def handle(self, *args, **options):
+        """Create the users, run the logins at each concurrency level and delete the users."""
+        from api.asgi import application  # pylint: disable=import-outside-toplevel
+        password = make_password(PASSWORD)
+        users = [User(username=f'{PREFIX}{index}', password=password) for index in range(options['users'])]
+        User.objects.bulk_create(users)
+        try:
+            for concurrency in map(int, options['concurrency'].split(',')):
+                durations, statuses, elapsed = asyncio.run(
+                    self.run(application, options['users'], options['logins'], concurrency))
+                durations.sort()
+                self.stdout.write(
+                    f'concurrency {concurrency:>3}: {len(durations) / elapsed:8.1f} logins/s, '
+                    f'p50 {statistics.median(durations) * 1000:7.1f} ms, '
+                    f'p95 {durations[int(len(durations) * 0.95) - 1] * 1000:7.1f} ms, '
+                    f'{statuses.count(503)} refused, {len(durations) - statuses.count(200) - statuses.count(503)} failed')
+        finally:
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    @staticmethod
+    async def run(application, users: int, logins: int, concurrency: int):
+        """Send the logins with a concurrency, and return their durations, statuses and total time."""
+        host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'localhost')
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login(index: int):
+            body = json.dumps({'username': f'{PREFIX}{index % users}', 'password': PASSWORD}).encode()
+            scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+                     'scheme': 'http', 'path': '/authentication/login/', 'raw_path': b'/authentication/login/',
+                     'query_string': b'', 'root_path': '', 'server': (host, 80), 'client': ('127.0.0.1', 0),
+                     'headers': [(b'host', host.encode()), (b'content-type', b'application/json'),
+                                 (b'content-length', str(len(body)).encode())]}
+            messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+            status = []
+
+            async def receive():
+                return messages.pop() if messages else await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                start = time.perf_counter()
+                await application(scope, receive, send)
+                return time.perf_counter() - start, status[0]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(login(index) for index in range(logins)))
+        elapsed = time.perf_counter() - start
+        return [duration for duration, _ in results], [status for _, status in results], elapsed
@@ -0,0 +1,30 @@
+"""This module defines the command moving the data of a user to another shard."""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.rebalance import GRACE, move
+from api.sharding import shards
+
+
+class Command(BaseCommand):
+    """This class defines the command moving the data of a user to another shard, refusing its requests meanwhile."""
+
+    help = 'Move the data of a user to another shard.'
+
+    def add_arguments(self, parser):
+        """Add the user, the shard and the grace option."""
+        parser.add_argument('username', help='The user to move.')
+        parser.add_argument('database', choices=shards(), help='The target shard.')
+        parser.add_argument('--grace', type=float, default=GRACE,
+                            help='The seconds given to the requests in flight before the copy.')
+
+    def handle(self, *args, **options):
+        """Move the data."""
+        user = User.objects.select_related('shard').filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"User {options['username']} does not exist.")
+        copied = move(user, options['database'], options['grace'])
+        if not copied:
+            self.stdout.write(f"{user.username} is already on {options['database']}.")
+            return
+        counts = ', '.join(f'{name}: {count}' for name, count in copied.items())
+        self.stdout.write(self.style.SUCCESS(f"{user.username} moved to {options['database']}: {counts}."))
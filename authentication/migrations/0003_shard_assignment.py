@@ -0,0 +1,23 @@
+# Generated by Django 3.1 on 2026-10-19 11:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0002_unconstrained_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardAssignment',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='auth.user')),
+                ('database', models.CharField(max_length=32)),
+                ('moving', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-19 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_shard_assignment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ownerversion',
+            name='catalog',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-19 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_ownerversion_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ownerversion',
+            name='forecast',
+            field=models.BigIntegerField(null=True),
+        ),
+    ]
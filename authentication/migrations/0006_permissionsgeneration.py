@@ -0,0 +1,20 @@
+# Generated by Django 3.1 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_ownerversion_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PermissionsGeneration',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('generation', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,2 +1,72 @@
 """This module defines the models of the authentication app."""
 from django.db import models
+from django.contrib.auth.models import User
+
+
+class OwnerVersion(models.Model):
+    """
+    This class defines the version of the data of an owner.
+
+    The version is incremented by triggers on every write to the categories, providers,
+    products and batches of the owner, so it identifies a state of the owner's data
+    and is used as the key of the caches derived from it. The deletion of an owner
+    writes to its data, so the owner is not constrained and a trigger on the users
+    removes the version.
+
+    Attributes:
+        owner (User): The data owner.
+        version (int): The number of writes to the owner's data.
+        catalog (int): The number of writes to the owner's categories and providers.
+        forecast (int): The version the forecasts of the owner were last computed for, None before.
+    """
+
+    owner = models.OneToOneField(User, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False)
+    version = models.BigIntegerField(default=0)
+    catalog = models.BigIntegerField(default=0)
+    forecast = models.BigIntegerField(null=True)
+
+    @classmethod
+    def of(cls, owner_id: int, using: str = 'default') -> int:
+        """Return the current version of the data of an owner."""
+        return cls.objects.using(using).filter(owner=owner_id).values_list('version', flat=True).first() or 0  # pylint: disable=no-member
+
+    @classmethod
+    def catalog_of(cls, owner_id: int, using: str = 'default') -> int:
+        """Return the current catalog version of an owner."""
+        return cls.objects.using(using).filter(owner=owner_id).values_list('catalog', flat=True).first() or 0  # pylint: disable=no-member
+
+
+class ShardAssignment(models.Model):
+    """
+    This class defines the database holding the data of a user.
+
+    The assignments are central, next to the users and their tokens, and are read with
+    the token of each request. A user without assignment has its data in the default
+    database, as before the shards were added.
+
+    Attributes:
+        user (User): The data owner.
+        database (str): The alias of the shard holding the owner's data.
+        moving (bool): Whether the data is being moved to another shard, which refuses the requests.
+    """
+
+    user = models.OneToOneField(User, primary_key=True, related_name='shard', on_delete=models.CASCADE)
+    database = models.CharField(max_length=32)
+    moving = models.BooleanField(default=False)
+
+
+class PermissionsGeneration(models.Model):
+    """
+    This class defines the generation of the cached permissions of the users.
+
+    The single row is central, next to the users, their groups and permissions, and is
+    incremented by triggers on their writes, see `authentication.permissions`. Every
+    process reads it to key its cache, so a change is seen by all the workers at once.
+
+    Attributes:
+        id (int): Always 1.
+        generation (int): The number of writes to the permissions of the users.
+    """
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    generation = models.BigIntegerField(default=0)
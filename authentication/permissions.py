@@ -0,0 +1,72 @@
+"""This module caches the permission set of each user.
+
+Computing the permissions of a user costs a query on its permissions and one on the
+permissions of its groups. They rarely change, so they are cached, and any change of
+the permissions of a user or a group, of the groups of a user, or of its active and
+superuser flags, invalidates the whole cache by moving it to a new generation.
+
+The cache is kept by each process, so the generation is kept in the database: triggers
+increment it on every write path, and the processes read it with the cached
+permissions, a primary key lookup instead of the two queries.
+"""
+from typing import List
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from api.db import Trigger, install_triggers, plpgsql_trigger, uninstall_triggers
+from authentication.models import PermissionsGeneration
+
+PERMISSIONS_TTL = 300
+
+TABLES = ['auth_user_user_permissions', 'auth_user_groups', 'auth_group_permissions']
+
+_BUMP = ('INSERT INTO authentication_permissionsgeneration(id, generation) VALUES (1, 1) '
+         'ON CONFLICT(id) DO UPDATE SET generation = authentication_permissionsgeneration.generation + 1;')
+
+_FLAGS = {
+    'sqlite': 'OLD.is_active != NEW.is_active OR OLD.is_superuser != NEW.is_superuser',
+    'postgresql': 'OLD.is_active IS DISTINCT FROM NEW.is_active OR OLD.is_superuser IS DISTINCT FROM NEW.is_superuser',
+}
+
+TRIGGERS = {
+    'sqlite': [
+        Trigger(f'permissions_{table}_{event.lower()}', table,
+                f'CREATE TRIGGER permissions_{table}_{event.lower()} AFTER {event} ON {table} BEGIN {_BUMP} END')
+        for table in TABLES for event in ('INSERT', 'DELETE')
+    ] + [
+        Trigger('permissions_auth_user_update', 'auth_user',
+                'CREATE TRIGGER permissions_auth_user_update AFTER UPDATE OF is_active, is_superuser ON auth_user '
+                f"WHEN {_FLAGS['sqlite']} BEGIN {_BUMP} END"),
+    ],
+    'postgresql': [
+        plpgsql_trigger(f'permissions_{table}', table, 'INSERT OR DELETE', _BUMP) for table in TABLES
+    ] + [
+        plpgsql_trigger('permissions_auth_user', 'auth_user', 'UPDATE OF is_active, is_superuser', _BUMP,
+                        _FLAGS['postgresql']),
+    ],
+}
+
+
+def _key(user_id: int) -> str:
+    """Return the cache key of the permissions of a user in the current generation."""
+    generation = PermissionsGeneration.objects.values_list('generation', flat=True).first() or 0  # pylint: disable=no-member
+    return f'permissions:{generation}:{user_id}'
+
+
+def permissions_of(user: User) -> List[str]:
+    """Return the sorted permissions of a user, from the cache if possible."""
+    key = _key(user.pk)
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = sorted(user.get_all_permissions())
+        cache.set(key, permissions, PERMISSIONS_TTL)
+    return permissions
+
+
+def install(sender, using: str = 'default', **kwargs: dict):
+    """Install the triggers of the permissions generation on a database, after a migration."""
+    install_triggers(TRIGGERS, using, requires=[PermissionsGeneration._meta.db_table])  # pylint: disable=protected-access
+
+
+def uninstall(sender, using: str = 'default', **kwargs: dict):
+    """Drop the triggers of the permissions generation from a database, before a migration."""
+    uninstall_triggers(TRIGGERS, using)
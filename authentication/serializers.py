@@ -23,3 +23,16 @@ class RegisterSerializer(serializers.ModelSerializer):
 
         model = User
         fields = ['username', 'password', 'first_name', 'last_name', 'email']
+
+
+class LoginSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer for the login view.
+
+    Attributes:
+        username (str): The user name.
+        password (str): The user password.
+    """
+
+    username = serializers.CharField()
+    password = serializers.CharField(trim_whitespace=False)
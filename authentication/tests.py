@@ -1,2 +1,216 @@
 """This module manages the tests for the authentication app."""
-from django.test import TestCase
+from io import StringIO
+from unittest import mock, skipUnless
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission, User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from api.sharding import ID_BLOCK, MAX_SHARDS, shard_of, shards
+from api.testing import PASSWORD, connect
+from authentication.models import PermissionsGeneration, ShardAssignment
+from authentication.permissions import permissions_of
+from products.models import Batch, Product
+
+
+class RegisterLoginTests(TransactionTestCase):
+    """This class tests the async registration and login views."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Register a user."""
+        self.client = APIClient()
+        self.credentials = {'username': 'member', 'password': PASSWORD}
+        self.response = self.client.post('/authentication/register/', dict(self.credentials, email='member@foodstock.fr'),
+                                         format='json')
+
+    def login(self, **credentials: dict):
+        """Log in with the credentials of the user, overridden by some values."""
+        return self.client.post('/authentication/login/', dict(self.credentials, **credentials), format='json')
+
+    def test_register_hashes_the_password(self):
+        """A registration creates the user with a hashed password, and does not answer it."""
+        self.assertEqual(self.response.status_code, 201)
+        self.assertNotIn('password', self.response.json())
+        user = User.objects.get(username='member')
+        self.assertNotEqual(user.password, PASSWORD)
+        self.assertTrue(user.check_password(PASSWORD))
+
+    def test_register_refuses_a_taken_username(self):
+        """A second registration of a username is answered 400."""
+        response = self.client.post('/authentication/register/', self.credentials, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json())
+
+    def test_login_answers_a_stable_token(self):
+        """A login answers the token of the user, created at the first login only."""
+        first, second = self.login(), self.login()
+        self.assertEqual((first.status_code, first.json()['created'], second.json()['created']), (200, True, False))
+        self.assertEqual(first.json()['token'], second.json()['token'])
+        self.assertEqual(first.json()['permissions'], [])
+
+    def test_login_refuses_invalid_credentials(self):
+        """A wrong password, an unknown user and an inactive user get the same answer."""
+        answers = [self.login(password='Wrong-password1'), self.login(username='nobody')]
+        User.objects.filter(username='member').update(is_active=False)
+        answers.append(self.login())
+        self.assertEqual({(answer.status_code, answer.content) for answer in answers}, {(400, answers[0].content)})
+
+    def test_malformed_requests(self):
+        """The views only take a POST with a valid body."""
+        self.assertEqual(self.client.get('/authentication/login/').status_code, 405)
+        self.assertEqual(self.client.post('/authentication/login/', b'{', content_type='application/json').status_code,
+                         400)
+        self.assertEqual(self.login(password='').status_code, 400)
+
+    def test_outdated_hash_is_upgraded(self):
+        """A login with a password hashed by another hasher saves it hashed by the preferred one."""
+        User.objects.filter(username='member').update(password=make_password(PASSWORD, hasher='pbkdf2_sha1'))
+        self.assertEqual(self.login().status_code, 200)
+        user = User.objects.get(username='member')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password(PASSWORD))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_registration_is_atomic(self):
+        """A user whose shard cannot be assigned is not created."""
+        with mock.patch('authentication.views.assign', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post('/authentication/register/', {'username': 'lost', 'password': PASSWORD,
+                                                               'email': 'lost@foodstock.fr'}, format='json')
+        self.assertFalse(User.objects.filter(username='lost').exists())
+
+    def test_saturated_pool_is_refused(self):
+        """A login is answered 503 with Retry-After while the hashing pool is saturated."""
+        with mock.patch('authentication.hashing.MAX_PENDING', 0):
+            response = self.login()
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
+
+    def test_login_answers_the_current_permissions(self):
+        """The permissions answered at login follow the grants of the user."""
+        self.login()
+        User.objects.get(username='member').user_permissions.add(Permission.objects.get(codename='view_group'))
+        self.assertEqual(self.login().json()['permissions'], ['auth.view_group'])
+
+    def test_token_authenticates(self):
+        """The token answered at login authenticates the requests of the api."""
+        self.assertEqual(connect('other').get('/categories/').status_code, 200)
+
+
+class PermissionsCacheTests(TestCase):
+    """This class tests the invalidation of the cached permissions through the database."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create a user with its permissions cached."""
+        self.user = User.objects.create(username='clerk')
+        self.permission = Permission.objects.get(codename='view_group')
+        self.assertEqual(permissions_of(self.user), [])
+
+    @staticmethod
+    def generation() -> int:
+        """Return the current generation of the permissions."""
+        return PermissionsGeneration.objects.values_list('generation', flat=True).first() or 0  # pylint: disable=no-member
+
+    def test_write_from_another_process_is_seen(self):
+        """A permission granted without the signals of this process invalidates its cache."""
+        User.user_permissions.through.objects.create(user=self.user, permission=self.permission)
+        self.assertEqual(permissions_of(User.objects.get(pk=self.user.pk)), ['auth.view_group'])
+
+    def test_group_writes_invalidate(self):
+        """The permissions of a group and the groups of a user move the cache to a new generation."""
+        group = Group.objects.create(name='clerks')
+        before = self.generation()
+        group.permissions.add(self.permission)
+        self.user.groups.add(group)
+        self.assertEqual(self.generation(), before + 2)
+        self.assertEqual(permissions_of(User.objects.get(pk=self.user.pk)), ['auth.view_group'])
+        self.user.groups.remove(group)
+        self.assertEqual(permissions_of(User.objects.get(pk=self.user.pk)), [])
+
+    def test_flags_invalidate_and_logins_do_not(self):
+        """Changing the superuser flag of a user invalidates the cache, recording a login does not."""
+        before = self.generation()
+        User.objects.filter(pk=self.user.pk).update(last_login='2026-01-01T00:00:00Z')
+        self.assertEqual(self.generation(), before)
+        User.objects.filter(pk=self.user.pk).update(is_superuser=True)
+        self.assertEqual(self.generation(), before + 1)
+
+
+@skipUnless(len(shards()) > 1, 'The rebalance tests run with api.test_settings.')
+class RebalanceUserTests(TestCase):
+    """This class tests the move of the data of a user to another shard."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user with a product and a batch."""
+        self.client = connect('mover')
+        category = self.client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        provider = self.client.post('/providers/', {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon',
+                                                    'zipcode': '69000', 'phone': '0400000000'}, format='json').json()['id']
+        self.product = self.client.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': category},
+                                        format='json').json()['id']
+        self.batch = self.client.post(f'/products/{self.product}/batches/', {
+            'provider': provider, 'initial': 4, 'current': 3, 'price': 1.5,
+            'purchase': '2026-01-01', 'limit': '2026-02-01'
+        }, format='json').json()['id']
+        self.user = User.objects.select_related('shard').get(username='mover')
+        self.source = shard_of(self.user)
+        self.target = next(database for database in shards() if database != self.source)
+
+    @staticmethod
+    def rebalance(database: str) -> str:
+        """Run the command moving the user to a shard, and return its output."""
+        out = StringIO()
+        call_command('rebalance_user', 'mover', database, '--grace', '0', stdout=out)
+        return out.getvalue()
+
+    def test_move(self):
+        """The data of the user is copied to the target, deleted from the source and served from the target."""
+        output = self.rebalance(self.target)
+        self.assertIn(f'mover moved to {self.target}', output)
+        self.assertIn('product: 1', output)
+        assignment = ShardAssignment.objects.get(user=self.user)  # pylint: disable=no-member
+        self.assertEqual((assignment.database, assignment.moving), (self.target, False))
+        self.assertEqual(Product.objects.using(self.target).filter(owner=self.user).count(), 1)  # pylint: disable=no-member
+        self.assertFalse(Product.objects.using(self.source).filter(owner=self.user).exists())  # pylint: disable=no-member
+        self.assertFalse(Batch.objects.using(self.source).filter(owner=self.user).exists())  # pylint: disable=no-member
+        self.assertEqual(User.objects.using(self.source).filter(pk=self.user.pk).exists(),
+                         self.source == DEFAULT_DB_ALIAS)
+        products = self.client.get('/products/').json()
+        self.assertEqual([(product['id'], product['label'], product['category']) for product in products],
+                         [(self.product, 'Milk', 'Dairy')])
+        self.assertEqual([(batch['id'], batch['current']) for batch in products[0]['batches']], [(self.batch, 3.0)])
+        self.assertEqual(self.client.get(f'/products/{self.product}/batches/{self.batch}').json()['current'], 3.0)
+
+    def test_move_back(self):
+        """A user moved back to its first shard finds its data there."""
+        self.rebalance(self.target)
+        self.rebalance(self.source)
+        self.assertEqual(shard_of(User.objects.select_related('shard').get(pk=self.user.pk)), self.source)
+        self.assertEqual([product['id'] for product in self.client.get('/products/').json()], [self.product])
+
+    def test_shards_number_in_their_blocks(self):
+        """The rows created after moves are numbered in the blocks of their shard, whatever the rows moved in."""
+        self.rebalance(self.target)
+        created = self.client.post('/categories/', {'label': 'Fruits'}, format='json').json()['id']
+        self.rebalance(self.source)
+        self.assertIn(created, [category['id'] for category in self.client.get('/categories/').json()])
+        again = self.client.post('/categories/', {'label': 'Meat'}, format='json').json()['id']
+        self.assertEqual([created // ID_BLOCK % MAX_SHARDS, again // ID_BLOCK % MAX_SHARDS],
+                         [shards().index(self.target), shards().index(self.source)])
+
+    def test_move_to_the_same_shard(self):
+        """A user already on the target shard is left in place."""
+        self.assertIn('already on', self.rebalance(self.source))
+        self.assertEqual(Product.objects.using(self.source).filter(owner=self.user).count(), 1)  # pylint: disable=no-member
+
+    def test_unknown_user(self):
+        """The command refuses a user that does not exist."""
+        with self.assertRaises(CommandError):
+            call_command('rebalance_user', 'nobody', self.target, '--grace', '0', stdout=StringIO())
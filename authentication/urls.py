@@ -1,8 +1,8 @@
 """This module defines the routes for the authentication resources."""
 from django.urls import path
-from authentication.views import RegisterView, LoginView
+from authentication.views import register, login
 
 urlpatterns = [
-    path('register/', RegisterView.as_view()),
-    path('login/', LoginView.as_view())
+    path('register/', register),
+    path('login/', login)
 ]
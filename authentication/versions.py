@@ -0,0 +1,64 @@
+"""This module maintains the version of the data of each owner.
+
+The catalog version counts the writes to the categories and the providers only, whose
+labels are cached by `api.labels`.
+"""
+from typing import List
+from api.db import Trigger, install_triggers, plpgsql_trigger, uninstall_triggers
+from authentication.models import OwnerVersion
+
+TABLES = ['categories_category', 'providers_provider', 'products_product', 'products_batch']
+
+CATALOG = {'categories_category', 'providers_provider'}
+
+
+def _bump(row: str, table: str) -> str:
+    """Return the statement incrementing the version of the owner of a row, and its catalog one for a label."""
+    catalog = int(table in CATALOG)
+    return (f'INSERT INTO authentication_ownerversion(owner_id, version, catalog) VALUES ({row}.owner_id, 1, {catalog}) '
+            f'ON CONFLICT(owner_id) DO UPDATE SET version = authentication_ownerversion.version + 1, '
+            f'catalog = authentication_ownerversion.catalog + excluded.catalog;')
+
+
+def _triggers(table: str) -> List[Trigger]:
+    """Return the triggers incrementing the owner version on the writes to a table."""
+    name = f'version_{table}'
+    return [
+        Trigger(f'{name}_insert', table,
+                f'CREATE TRIGGER {name}_insert AFTER INSERT ON {table} BEGIN {_bump("NEW", table)} END'),
+        Trigger(f'{name}_update', table,
+                f'CREATE TRIGGER {name}_update AFTER UPDATE ON {table} BEGIN {_bump("NEW", table)} '
+                f'UPDATE authentication_ownerversion SET version = version + 1, catalog = catalog + {int(table in CATALOG)} '
+                f'WHERE owner_id = OLD.owner_id AND OLD.owner_id != NEW.owner_id; END'),
+        Trigger(f'{name}_delete', table,
+                f'CREATE TRIGGER {name}_delete AFTER DELETE ON {table} BEGIN {_bump("OLD", table)} END'),
+    ]
+
+
+TRIGGERS = {
+    'sqlite': [trigger for table in TABLES for trigger in _triggers(table)] + [
+        Trigger('version_auth_user_delete', 'auth_user',
+                'CREATE TRIGGER version_auth_user_delete AFTER DELETE ON auth_user BEGIN '
+                'DELETE FROM authentication_ownerversion WHERE owner_id = OLD.id; END'),
+    ],
+    'postgresql': [
+        plpgsql_trigger(f'version_{table}', table, 'INSERT OR UPDATE OR DELETE',
+                        f"IF TG_OP != 'DELETE' THEN {_bump('NEW', table)} END IF; "
+                        f"IF TG_OP = 'DELETE' OR TG_OP = 'UPDATE' AND OLD.owner_id != NEW.owner_id THEN "
+                        f"{_bump('OLD', table)} END IF;")
+        for table in TABLES
+    ] + [
+        plpgsql_trigger('version_auth_user_delete', 'auth_user', 'DELETE',
+                        'DELETE FROM authentication_ownerversion WHERE owner_id = OLD.id;'),
+    ],
+}
+
+
+def install(sender, using: str = 'default', **kwargs: dict):
+    """Install the triggers of the owner versions on a database, after a migration."""
+    install_triggers(TRIGGERS, using, requires=[OwnerVersion._meta.db_table])  # pylint: disable=protected-access
+
+
+def uninstall(sender, using: str = 'default', **kwargs: dict):
+    """Drop the triggers of the owner versions from a database, before a migration."""
+    uninstall_triggers(TRIGGERS, using)
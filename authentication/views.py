@@ -1,67 +1,154 @@
-"""This module manages the views of the authentication app."""
-from django.contrib.auth.hashers import make_password
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.request import Request
+"""This module manages the views of the authentication app.
+
+The login and the registration are async views: the password is hashed on the pool
+of `authentication.hashing` and the database is queried on the thread of the sync
+code, so a login storm neither blocks the workers nor the other requests.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.http import HttpRequest, JsonResponse
 from rest_framework import status
-from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from authentication.serializers import RegisterSerializer
-
-
-class RegisterView(APIView):
-    """This class manages the view for the register resources."""
-
-    def post(self, request: Request, format=None) -> Response:
-        """
-        Registrer a new user.
-
-        Args:
-            request (Request): The api request.
-            format (NoneType): The suffix format to retrieve the result. Always none. 
-                               The format of result is managed by the Accept header.
-
-        Returns:
-            201: The user is created.
-            400: An error is detected on the request data.
-            406: The response format is not acceptable by the server.
-            500: An error was occured in the treatment of the request.
-        """
-        serializer = RegisterSerializer(data=request.data)
-        if serializer.is_valid():
-            instance = serializer.save()
-            instance.set_password(instance.password)
-            instance.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class LoginView(ObtainAuthToken):
-    """This class manages the view for the login resources."""
-
-    def post(self, request: Request, *args: tuple, **kwargs: dict):
-        """
-        Log in a user.
-
-        Args:
-            request (Request): The api request.
-            args (tuple): The key list of arguments.
-            kwargs (dict): The value list of arguments.
-
-        Returns:
-            201: The user is logged.
-            400: An error is detected on the request data.
-            406: The response format is not acceptable by the server.
-            500: An error was occured in the treatment of the request.
-        """
-        serializer = self.serializer_class(data=request.data,
-                                           context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)  # pylint: disable=no-member
-        return Response({
-            'token': token.key,
-            'email': user.email,
-            'created': created,
-            'permissions': user.get_all_permissions()
-        })
+from api.sharding import assign
+from authentication.hashing import Overloaded, hash_password, verify_password
+from authentication.permissions import permissions_of
+from authentication.serializers import LoginSerializer, RegisterSerializer
+
+INVALID_CREDENTIALS = {'non_field_errors': ['Unable to log in with provided credentials.']}
+
+OVERLOADED = {'detail': 'Too many authentications in progress, retry later.'}
+
+
+def _body(request: HttpRequest):
+    """Return the JSON or form body of a request, or None if it cannot be parsed."""
+    if request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        return request.POST.dict()
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+def _overloaded() -> JsonResponse:
+    """Return the answer to a request refused by the hashing pool."""
+    response = JsonResponse(OVERLOADED, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
+@sync_to_async
+def _validate_registration(data: dict) -> RegisterSerializer:
+    """Validate a registration, whose username must not be taken."""
+    serializer = RegisterSerializer(data=data)
+    serializer.is_valid()
+    return serializer
+
+
+@sync_to_async
+def _create_user(fields: dict, password: str) -> User:
+    """Create a user with a hashed password, in a single INSERT, and assign it to a shard, in one transaction."""
+    with transaction.atomic():
+        user = User.objects.create(password=password, **fields)
+        assign(user)
+    return user
+
+
+@sync_to_async
+def _save_password(user: User, password: str):
+    """Save the new hash of the password of a user, in a single UPDATE."""
+    User.objects.filter(pk=user.pk).update(password=password)
+
+
+@sync_to_async
+def _find_user(username: str):
+    """Return the active user of a username with its token, in a single query, or None."""
+    users = User.objects.filter(username=username, is_active=True).select_related('auth_token')
+    return users.first()
+
+
+@sync_to_async
+def _open_session(user: User) -> dict:
+    """Return the token and the cached permissions of a logged user, creating the token if needed."""
+    try:
+        token, created = user.auth_token, False
+    except Token.DoesNotExist:  # pylint: disable=no-member
+        try:
+            token, created = Token.objects.create(user=user), True  # pylint: disable=no-member
+        except IntegrityError:
+            token, created = Token.objects.get(user=user), False  # pylint: disable=no-member
+    return {'token': token.key, 'email': user.email, 'created': created, 'permissions': permissions_of(user)}
+
+
+async def register(request: HttpRequest) -> JsonResponse:
+    """
+    Register a new user.
+
+    Args:
+        request (HttpRequest): The api request.
+
+    Returns:
+        201: The user is created.
+        400: An error is detected on the request data.
+        405: Only POST is allowed.
+        503: Too many authentications are in progress.
+        500: An error was occured in the treatment of the request.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    data = _body(request)
+    if data is None:
+        return JsonResponse({'detail': 'JSON parse error.'}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = await _validate_registration(data)
+    if serializer.errors:
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    fields = dict(serializer.validated_data)
+    try:
+        password = await hash_password(fields.pop('password'))
+    except Overloaded:
+        return _overloaded()
+    try:
+        user = await _create_user(fields, password)
+    except IntegrityError:
+        return JsonResponse({'username': ['A user with that username already exists.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(RegisterSerializer(user).data, status=status.HTTP_201_CREATED)
+
+
+async def login(request: HttpRequest) -> JsonResponse:
+    """
+    Log in a user.
+
+    Args:
+        request (HttpRequest): The api request.
+
+    Returns:
+        200: The user is logged.
+        400: An error is detected on the request data.
+        405: Only POST is allowed.
+        503: Too many authentications are in progress.
+        500: An error was occured in the treatment of the request.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    data = _body(request)
+    if data is None:
+        return JsonResponse({'detail': 'JSON parse error.'}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    user = await _find_user(serializer.validated_data['username'])
+    try:
+        valid, rehashed = await verify_password(serializer.validated_data['password'], user.password if user else None)
+    except Overloaded:
+        return _overloaded()
+    if not valid:
+        return JsonResponse(INVALID_CREDENTIALS, status=status.HTTP_400_BAD_REQUEST)
+    if rehashed:
+        await _save_password(user, rehashed)
+    return JsonResponse(await _open_session(user))
+
+
+register.csrf_exempt = True
+login.csrf_exempt = True
@@ -1,5 +1,13 @@
 """This module manages the admin section for the categories app."""
 from django.contrib import admin
+from api.admin import OwnedModelAdmin
+from search.index import CATEGORY
 from .models import Category
 
-admin.site.register(Category)
\ No newline at end of file
+
+@admin.register(Category)
+class CategoryAdmin(OwnedModelAdmin):
+    """This class defines the admin of the categories."""
+
+    list_display = ('id', 'label', 'owner')
+    indexed_search = ('pk', CATEGORY)
@@ -1,8 +1,9 @@
 """This module defines the routes for the categories resources."""
 from django.urls import path
-from categories.views import CategoryView, CategoryDetail
+from categories.views import CategoryView, CategoryDetail, CategoryBulkDelete
 
 urlpatterns = [
     path('', CategoryView.as_view()),
-    path('<int:pk>', CategoryDetail.as_view())
+    path('<int:pk>', CategoryDetail.as_view()),
+    path('delete/', CategoryBulkDelete.as_view())
 ]
@@ -1,7 +1,11 @@
 """This module manages the views of the categories app."""
-from rest_framework import generics, permissions
+from django.http import Http404
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from api.views import BulkDeleteView
 from categories.models import Category
 from categories.serializers import CategorySerializer
+from products.purge import purge_categories
 
 
 class CategoryView(generics.ListCreateAPIView):
@@ -46,6 +50,7 @@ class CategoryDetail(generics.RetrieveUpdateDestroyAPIView):
             204: The category is deleted.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The category does not exist.
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
     """
@@ -60,3 +65,20 @@ class CategoryDetail(generics.RetrieveUpdateDestroyAPIView):
     def perform_update(self, serializer):
         """Update the owner of the category before update it."""
         serializer.save(owner=self.request.user)
+
+    def destroy(self, request, *args, **kwargs):
+        """Delete the category with its products and batches in set-based statements."""
+        if not purge_categories(request.user, [self.kwargs['pk']]):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CategoryBulkDelete(BulkDeleteView):
+    """
+    This class manages the view to delete several categories with their products.
+
+    Attributes:
+        purge (function): The function deleting the categories of an owner.
+    """
+
+    purge = staticmethod(purge_categories)
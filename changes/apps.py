@@ -0,0 +1,19 @@
+"""This module defines the configuration for the changes app."""
+from django.apps import AppConfig
+
+
+class ChangesConfig(AppConfig):
+    """
+    This class defines the configuration for the changes app.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'changes'
+
+    def ready(self):
+        """Drop the triggers recording the changes during the migrations, and install them after."""
+        from api.db import connect_installs  # pylint: disable=import-outside-toplevel
+        from changes.events import install, uninstall  # pylint: disable=import-outside-toplevel
+        connect_installs(self, install, uninstall)
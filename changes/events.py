@@ -0,0 +1,179 @@
+"""This module records the changes of the resources and reads them back for the streams.
+
+Triggers on the categories, providers, products and batches append a change for every
+write, in its transaction and whatever the write path, bulk purges included. The
+changes of each shard are numbered in its own range, see `api.sharding`.
+
+The streams read the changes after the last one read, so the changes of an owner must
+be committed in the order of their identifiers. SQLite commits one write at a time; on
+PostgreSQL, a transaction recording changes takes a transaction lock of their owner
+before numbering them, held until its commit. The transactions of different owners
+still commit in any order, so the hub reading the changes of every owner keeps the
+identifiers it skipped, and reads them again until the transactions that may commit
+them ended, see `changes_after`.
+"""
+import datetime
+from typing import Dict, List, Optional, Tuple
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from api.db import Trigger, install_triggers, plpgsql_trigger, reserve_ids, uninstall_triggers
+from api.sharding import ID_RANGE, id_base
+from changes.models import Change
+
+KINDS = {
+    'categories_category': 'category',
+    'providers_provider': 'provider',
+    'products_product': 'product',
+    'products_batch': 'batch',
+}
+
+RETENTION = datetime.timedelta(days=7)
+
+_NOW = {'sqlite': "strftime('%Y-%m-%d %H:%M:%f', 'now')", 'postgresql': 'now()'}
+
+_LOCK = 0x63686e67
+
+
+def _record(row: str, kind: str, action: str, vendor: str = 'sqlite') -> str:
+    """Return the statement appending a change of a row."""
+    return (f'INSERT INTO changes_change(owner_id, kind, resource, action, created) '
+            f"VALUES ({row}.owner_id, '{kind}', {row}.id, '{action}', {_NOW[vendor]});")
+
+
+def _triggers(table: str, kind: str) -> List[Trigger]:
+    """Return the triggers recording the writes to a table."""
+    name = f'change_{table}'
+    return [
+        Trigger(f'{name}_insert', table,
+                f'CREATE TRIGGER {name}_insert AFTER INSERT ON {table} BEGIN '
+                f'{_record("NEW", kind, Change.CREATE)} END'),
+        Trigger(f'{name}_update', table,
+                f'CREATE TRIGGER {name}_update AFTER UPDATE ON {table} BEGIN '
+                f'{_record("NEW", kind, Change.UPDATE)} END'),
+        Trigger(f'{name}_delete', table,
+                f'CREATE TRIGGER {name}_delete AFTER DELETE ON {table} BEGIN '
+                f'{_record("OLD", kind, Change.DELETE)} END'),
+    ]
+
+
+TRIGGERS = {
+    'sqlite': [trigger for table, kind in KINDS.items() for trigger in _triggers(table, kind)] + [
+        Trigger('change_auth_user_delete', 'auth_user',
+                'CREATE TRIGGER change_auth_user_delete AFTER DELETE ON auth_user BEGIN '
+                'DELETE FROM changes_change WHERE owner_id = OLD.id; END'),
+    ],
+    'postgresql': [
+        plpgsql_trigger(f'change_{table}', table, 'INSERT OR UPDATE OR DELETE',
+                        f"PERFORM pg_advisory_xact_lock({_LOCK}, "
+                        f"CASE WHEN TG_OP = 'DELETE' THEN OLD.owner_id ELSE NEW.owner_id END); "
+                        f"IF TG_OP = 'INSERT' THEN {_record('NEW', kind, Change.CREATE, 'postgresql')} "
+                        f"ELSIF TG_OP = 'UPDATE' THEN {_record('NEW', kind, Change.UPDATE, 'postgresql')} "
+                        f"ELSE {_record('OLD', kind, Change.DELETE, 'postgresql')} END IF;")
+        for table, kind in KINDS.items()
+    ] + [
+        plpgsql_trigger('change_auth_user_delete', 'auth_user', 'DELETE',
+                        'DELETE FROM changes_change WHERE owner_id = OLD.id;'),
+    ],
+}
+
+
+def install(sender, using: str = 'default', **kwargs: dict):
+    """Install the triggers recording the changes on a database, after a migration, and number them in its range."""
+    install_triggers(TRIGGERS, using, requires=[Change._meta.db_table])  # pylint: disable=protected-access
+    reserve_ids(Change, using, id_base(using))
+
+
+def uninstall(sender, using: str = 'default', **kwargs: dict):
+    """Drop the triggers recording the changes from a database, before a migration."""
+    uninstall_triggers(TRIGGERS, using)
+
+
+def last_change(using: str = 'default') -> int:
+    """Return the identifier of the last committed change, 0 without change."""
+    connections[using].close_if_unusable_or_obsolete()
+    return Change.objects.using(using).aggregate(last=Max('id'))['last'] or 0  # pylint: disable=no-member
+
+
+def changes_after(last: int, pending: Dict[int, int], using: str = 'default') -> List[Tuple[int, int, str, int, str]]:
+    """
+    Return the changes of all the owners committed after a change, or skipped before.
+
+    On PostgreSQL, an identifier missing below a change read may belong to a
+    transaction still running. It is kept in `pending` with the end of the snapshot it
+    was missed in, and read again until every transaction older than this end is over:
+    the identifier is then either read or never committed. The snapshot is the one of
+    the statement reading the changes.
+
+    Args:
+        last (int): The identifier of the last change read.
+        pending (dict(int, int)): The identifiers skipped by the previous reads, updated in place.
+        using (str): The database alias.
+
+    Returns:
+        list(tuple): The id, owner, kind, resource and action of the changes, in order.
+    """
+    connection = connections[using]
+    connection.close_if_unusable_or_obsolete()
+    if connection.vendor != 'postgresql':
+        changes = Change.objects.using(using).filter(id__gt=last).order_by('id')  # pylint: disable=no-member
+        return list(changes.values_list('id', 'owner', 'kind', 'resource', 'action'))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT txid_snapshot_xmin(s), txid_snapshot_xmax(s), c.id, c.owner_id, c.kind, c.resource, c.action '
+            'FROM txid_current_snapshot() s LEFT JOIN changes_change c ON c.id > %s OR c.id = ANY(%s) '
+            'ORDER BY c.id', [last, list(pending)])
+        rows = cursor.fetchall()
+    oldest, horizon = rows[0][:2]
+    changes = [row[2:] for row in rows if row[2] is not None]
+    for identifier in [identifier for identifier, end in pending.items() if end <= oldest]:
+        del pending[identifier]
+    previous = max(last, id_base(using))
+    for change in changes:
+        pending.pop(change[0], None)
+        if change[0] > previous:
+            pending.update(dict.fromkeys(range(previous + 1, change[0]), horizon))
+            previous = change[0]
+    return changes
+
+
+def replay(owner_id: int, after: int, until: int, limit: int,
+           using: str = 'default') -> Optional[List[Tuple[int, int, str, int, str]]]:
+    """
+    Return the changes of an owner missed by a client, between two changes.
+
+    Args:
+        owner_id (int): The owner identifier.
+        after (int): The last change received by the client, excluded.
+        until (int): The last change to replay, included.
+        limit (int): The maximum number of changes to replay.
+        using (str): The database alias.
+
+    Returns:
+        list(tuple): The changes in order, or None when they are pruned, too many or
+            numbered by another shard, so the client must reload its data.
+    """
+    base = id_base(using)
+    if not base <= after < min(until + 1, base + ID_RANGE):
+        return None
+    changes = Change.objects.using(using).filter(id__lte=until)  # pylint: disable=no-member
+    if after < (changes.aggregate(first=Min('id'))['first'] or 1) - 1:
+        return None
+    missed = list(changes.filter(owner=owner_id, id__gt=after).order_by('id')
+                  .values_list('id', 'owner', 'kind', 'resource', 'action')[:limit + 1])
+    return None if len(missed) > limit else missed
+
+
+def prune(before: datetime.datetime = None, using: str = 'default') -> int:
+    """
+    Delete the changes older than the retention, which can no longer be replayed.
+
+    Args:
+        before (DateTime): The date of the oldest change kept, now minus the retention by default.
+        using (str): The database alias.
+
+    Returns:
+        int: The number of changes deleted.
+    """
+    old = Change.objects.using(using).filter(created__lt=before or timezone.now() - RETENTION)  # pylint: disable=no-member
+    return old._raw_delete(using)  # pylint: disable=protected-access
@@ -0,0 +1,136 @@
+"""This module fans the committed changes out to the streams of their owners.
+
+A process runs a single hub: one task polls the changes committed since its last read,
+whatever the number of streams, and pushes each of them to the queues of its owner.
+An idle stream costs a queue and a waiting coroutine, no query nor thread. The hub
+reads the databases on its own thread, so it holds a single connection to each shard.
+"""
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set, Tuple
+from api.sharding import shards
+from changes import events
+
+POLL_INTERVAL = 0.5
+
+QUEUE_SIZE = 256
+
+
+class Subscription:
+    """
+    This class defines the stream of the changes of an owner.
+
+    A stream too slow to read its changes is ended with a `None` rather than made to
+    hold them all, and its client resumes it from the last change it received.
+
+    Attributes:
+        owner_id (int): The owner identifier.
+        database (str): The shard of the owner.
+        since (int): The last change of the shard already sent when the subscription started.
+        queue (Queue): The changes to send.
+    """
+
+    def __init__(self, owner_id: int, database: str, since: int):
+        """Create an empty subscription."""
+        self.owner_id = owner_id
+        self.database = database
+        self.since = since
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def push(self, change: Optional[Tuple]) -> bool:
+        """Queue a change, or end the subscription if it is full, and return whether it is still open."""
+        try:
+            self.queue.put_nowait(change)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+
+class Hub:
+    """
+    This class defines the fan-out of the changes to the subscriptions.
+
+    Attributes:
+        subscriptions (dict(int, set(Subscription))): The open subscriptions by owner.
+        last (dict(str, int)): The last change read from each shard, None while the hub is stopped.
+        pending (dict(str, dict(int, int))): The changes skipped on each shard, see `events.changes_after`.
+        executor (Executor): The thread reading the database.
+    """
+
+    def __init__(self):
+        """Create a stopped hub."""
+        self.subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self.last: Optional[Dict[str, int]] = None
+        self.pending: Dict[str, Dict[int, int]] = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='changes')
+        self.task: Optional[asyncio.Task] = None
+        self.started: Optional[asyncio.Future] = None
+
+    async def run_sync(self, function, *args):
+        """Run a blocking database function on the thread of the hub."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def subscribe(self, owner_id: int, database: str) -> Subscription:
+        """
+        Open a subscription to the changes of an owner committed from now on.
+
+        Args:
+            owner_id (int): The owner identifier.
+            database (str): The shard of the owner.
+
+        Returns:
+            Subscription: The subscription, whose `since` bounds the changes to replay.
+        """
+        if self.task is None or self.task.done():
+            self.started = asyncio.get_running_loop().create_future()
+            self.task = asyncio.ensure_future(self.run())
+        await asyncio.shield(self.started)
+        subscription = Subscription(owner_id, database, self.last[database])
+        self.subscriptions[owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Close a subscription."""
+        subscriptions = self.subscriptions.get(subscription.owner_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.owner_id]
+
+    def close(self):
+        """End the open subscriptions, whose clients resume from their last change."""
+        for subscriptions in list(self.subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.push(None)
+        self.subscriptions.clear()
+
+    async def run(self):
+        """Poll the committed changes and dispatch them, until the last subscription is closed."""
+        try:
+            self.last = {database: await self.run_sync(events.last_change, database) for database in shards()}
+            self.pending = {database: {} for database in shards()}
+            self.started.set_result(None)
+            while True:
+                await asyncio.sleep(POLL_INTERVAL)
+                if not self.subscriptions:
+                    break
+                for database, last in self.last.items():
+                    for change in await self.run_sync(events.changes_after, last, self.pending[database], database):
+                        self.last[database] = max(self.last[database], change[0])
+                        for subscription in list(self.subscriptions.get(change[1], ())):
+                            if subscription.database == database and not subscription.push(change):
+                                self.unsubscribe(subscription)
+        except Exception as error:  # pylint: disable=broad-except
+            if not self.started.done():
+                self.started.set_exception(error)
+            self.close()
+            raise
+        finally:
+            self.last = None
+
+
+hub = Hub()
@@ -0,0 +1,21 @@
+"""This module defines the command deleting the changes older than their retention."""
+from django.core.management.base import BaseCommand
+from api.sharding import shards
+from changes.events import prune
+
+
+class Command(BaseCommand):
+    """This class defines the command deleting the changes no stream can replay any more, to run periodically."""
+
+    help = 'Delete the changes older than their retention.'
+
+    def add_arguments(self, parser):
+        """Add the database option."""
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A shard to prune, repeated for several ones, every shard by default.')
+
+    def handle(self, *args, **options):
+        """Delete the changes of each shard."""
+        for database in options['databases'] or shards():
+            count = prune(using=database)
+            self.stdout.write(self.style.SUCCESS(f'{database}: {count} changes deleted.'))
@@ -0,0 +1,46 @@
+"""This module defines the models of the changes app."""
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class Change(models.Model):
+    """
+    This class defines a committed write on a resource of an owner.
+
+    The changes are only inserted, by triggers on the resources, in the transaction of
+    the write, so they are visible once it is committed. Their identifier is the id of
+    the server-sent event, from which a client resumes the stream. The changes are
+    written while the owner is being deleted, so the owner is not constrained and a
+    trigger on the users removes them.
+
+    Attributes:
+        owner (User): The resource owner.
+        kind (str): The resource type: category, provider, product or batch.
+        resource (int): The resource identifier.
+        action (str): The write: create, update or delete.
+        created (DateTime): The date of the change.
+    """
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    id = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    kind = models.CharField(max_length=8)
+    resource = models.IntegerField()
+    action = models.CharField(max_length=6)
+    created = models.DateTimeField()
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            indexes (list(Index)): The indexes of the resume and prune queries.
+        """
+
+        indexes = [
+            models.Index(fields=['owner', 'id'], name='change_owner_idx'),
+            models.Index(fields=['created'], name='change_created_idx'),
+        ]
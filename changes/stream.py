@@ -0,0 +1,134 @@
+"""This module serves the changes of the connected user as server-sent events.
+
+The stream is a raw ASGI application: a connection holds no thread and no database
+connection while it waits, so thousands of idle clients cost a few coroutines. The
+clients resume with the `Last-Event-ID` header, from which the missed changes are
+replayed before the live ones.
+
+The browsers' `EventSource` sends no header of its own: a web client gets a ticket from
+`/changes/ticket/` with its token, and opens the stream with it in the `ticket` query
+parameter, along with `lastEventId` when it opens the stream again. A ticket is signed,
+so it needs no storage, and is valid for a minute, to keep the token out of the URLs
+the servers log.
+"""
+import asyncio
+import json
+from typing import Callable, Optional, Tuple
+from urllib.parse import parse_qs
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from rest_framework.authtoken.models import Token
+from api.sharding import shard_of
+from changes import events
+from changes.hub import hub
+
+KEEP_ALIVE = 15.0
+
+REPLAY_LIMIT = 1000
+
+RETRY = 3000
+
+TICKET_AGE = 60
+
+TICKET_SALT = 'changes.stream'
+
+
+def issue_ticket(user: User) -> str:
+    """Return a ticket opening the stream of a user within `TICKET_AGE` seconds."""
+    return signing.dumps(user.pk, salt=TICKET_SALT)
+
+
+def _authenticate(authorization: str, ticket: str = '') -> Optional[Tuple[int, str]]:
+    """Return the identifier and the shard of the active user of a token authorization header or of a ticket."""
+    if ticket:
+        try:
+            user_id = signing.loads(ticket, salt=TICKET_SALT, max_age=TICKET_AGE)
+        except signing.BadSignature:
+            return None
+        user = User.objects.filter(pk=user_id, is_active=True).select_related('shard').first()
+        return (user.pk, shard_of(user)) if user is not None else None
+    keyword, _, key = authorization.partition(' ')
+    if keyword != 'Token' or not key:
+        return None
+    tokens = Token.objects.filter(key=key.strip(), user__is_active=True)  # pylint: disable=no-member
+    token = tokens.select_related('user__shard').first()
+    return (token.user_id, shard_of(token.user)) if token is not None else None
+
+
+def _event(change: tuple) -> bytes:
+    """Return the server-sent event of a change."""
+    identifier, _, kind, resource, action = change
+    data = json.dumps({'kind': kind, 'id': resource, 'action': action})
+    return f'id: {identifier}\ndata: {data}\n\n'.encode()
+
+
+async def _send_status(send: Callable, status: int, headers: list = ()):
+    """Send an empty response."""
+    await send({'type': 'http.response.start', 'status': status, 'headers': list(headers)})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _disconnected(receive: Callable):
+    """Wait for the client to close the connection."""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream(scope: dict, receive: Callable, send: Callable):
+    """
+    Stream the changes of the user of the request.
+
+    Each event has the change identifier as id, and the kind, id and action of the
+    changed resource as data. A `reset` event asks the client to reload its data, when
+    the changes since its `Last-Event-ID` were pruned, are too many to replay or were
+    numbered by another shard.
+
+    Returns:
+            200: The stream of changes.
+            401: The user must be connected to access this resource.
+            405: Only GET is allowed.
+    """
+    if scope['method'] != 'GET':
+        await _send_status(send, 405, [(b'allow', b'GET')])
+        return
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+    query = {name: values[-1] for name, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+    user = await hub.run_sync(_authenticate, headers.get('authorization', ''), query.get('ticket', ''))
+    if user is None:
+        await _send_status(send, 401, [(b'www-authenticate', b'Token')])
+        return
+    owner_id, database = user
+    subscription = await hub.subscribe(owner_id, database)
+    disconnected = asyncio.ensure_future(_disconnected(receive))
+    try:
+        response = [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no')]
+        origin = headers.get('origin')
+        if origin in settings.CORS_ORIGIN_WHITELIST:
+            response += [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': response})
+        await send({'type': 'http.response.body', 'body': f'retry: {RETRY}\n\n'.encode(), 'more_body': True})
+        last = headers.get('last-event-id', query.get('lastEventId', ''))
+        if last.isdigit() and int(last) != subscription.since:
+            missed = await hub.run_sync(events.replay, owner_id, int(last), subscription.since, REPLAY_LIMIT, database)
+            body = b''.join(map(_event, missed)) if missed is not None else \
+                f'id: {subscription.since}\nevent: reset\ndata: {{}}\n\n'.encode()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        while not disconnected.done():
+            received = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait([received, disconnected], timeout=KEEP_ALIVE, return_when=asyncio.FIRST_COMPLETED)
+            if not received.done():
+                received.cancel()
+                if not disconnected.done():
+                    await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+            change = received.result()
+            if change is None:
+                break
+            await send({'type': 'http.response.body', 'body': _event(change), 'more_body': True})
+        if not disconnected.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        hub.unsubscribe(subscription)
+        disconnected.cancel()
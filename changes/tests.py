@@ -0,0 +1,220 @@
+"""This module manages the tests for the changes app."""
+import asyncio
+import time
+from io import StringIO
+from typing import Callable, List
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from api.sharding import shards
+from api.testing import connect, database_of
+from categories.models import Category
+from changes import events
+from changes.hub import hub
+from changes.models import Change
+from changes.stream import TICKET_AGE, _authenticate, stream
+from products.purge import purge_categories
+
+
+def age(change: int, using: str = DEFAULT_DB_ALIAS):
+    """Move a change back beyond the retention."""
+    Change.objects.using(using).filter(pk=change).update(created=timezone.now() - events.RETENTION * 2)  # pylint: disable=no-member
+
+
+class ChangeLogTests(TestCase):
+    """This class tests the changes recorded by the triggers and read back by the streams."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create an owner."""
+        self.owner = User.objects.create(username='writer')
+
+    @staticmethod
+    def log(after: int = 0) -> list:
+        """Return the kind, resource and action of the changes after one."""
+        return [change[2:] for change in events.changes_after(after, {})]
+
+    def test_every_write_path_is_recorded(self):
+        """The inserts, updates and set-based deletes append their changes, in order."""
+        category = Category.objects.create(owner=self.owner, label='Dairy')  # pylint: disable=no-member
+        Category.objects.filter(pk=category.pk).update(label='Milk')  # pylint: disable=no-member
+        purge_categories(self.owner, [category.pk])
+        self.assertEqual(self.log(), [('category', category.pk, Change.CREATE), ('category', category.pk, Change.UPDATE),
+                                      ('category', category.pk, Change.DELETE)])
+        self.assertEqual(events.last_change(), events.changes_after(0, {})[-1][0])
+
+    def test_replay(self):
+        """The missed changes of an owner are replayed, unless they were pruned or are too many."""
+        other = User.objects.create(username='other')
+        first = Category.objects.create(owner=self.owner, label='Dairy')  # pylint: disable=no-member
+        Category.objects.create(owner=other, label='Fruits')  # pylint: disable=no-member
+        second = Category.objects.create(owner=self.owner, label='Meat')  # pylint: disable=no-member
+        start, last = events.changes_after(0, {})[0][0], events.last_change()
+        self.assertEqual([change[3] for change in events.replay(self.owner.pk, start, last, 10)], [second.pk])
+        self.assertEqual([change[3] for change in events.replay(self.owner.pk, start - 1, last, 10)],
+                         [first.pk, second.pk])
+        self.assertIsNone(events.replay(self.owner.pk, start - 1, last, 1))
+        age(start)
+        self.assertEqual(events.prune(), 1)
+        self.assertIsNone(events.replay(self.owner.pk, start - 1, last, 10))
+        self.assertEqual([change[3] for change in events.replay(self.owner.pk, start, last, 10)], [second.pk])
+
+    def test_owner_delete_removes_its_changes(self):
+        """Deleting an owner deletes its changes."""
+        Category.objects.create(owner=self.owner, label='Dairy')  # pylint: disable=no-member
+        self.owner.delete()
+        self.assertFalse(Change.objects.exists())  # pylint: disable=no-member
+
+    def test_prune_command(self):
+        """The command prunes every shard, or the given ones."""
+        out = StringIO()
+        call_command('prune_changes', stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), [f'{database}: 0 changes deleted.' for database in shards()])
+        out = StringIO()
+        call_command('prune_changes', '--database', DEFAULT_DB_ALIAS, stdout=out)
+        self.assertEqual(out.getvalue(), f'{DEFAULT_DB_ALIAS}: 0 changes deleted.\n')
+
+
+class StreamTests(TransactionTestCase):
+    """This class tests the server-sent events of the changes."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Register a user."""
+        self.client = connect('watcher')
+        self.token = self.client._credentials['HTTP_AUTHORIZATION']  # pylint: disable=protected-access
+        self.database = database_of('watcher')
+
+    def open(self, headers: dict, until: Callable[[bytes], bool], write: Callable = None,
+             method: str = 'GET') -> List[dict]:
+        """
+        Open the stream, run a write once it started, and return its messages once a body matches.
+
+        Args:
+            headers (dict): The headers of the request.
+            until (callable): The predicate on the body received, ending the stream when true.
+            write (callable): The write to run once the stream started.
+            method (str): The method of the request.
+
+        Returns:
+            list(dict): The messages sent by the application.
+        """
+        async def run():
+            messages, received, done = [], asyncio.Event(), asyncio.Event()
+
+            async def receive():
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                received.set()
+
+            scope = {'type': 'http', 'method': method, 'path': '/changes/',
+                     'headers': [(name.encode(), value.encode()) for name, value in headers.items()]}
+            application = asyncio.ensure_future(stream(scope, receive, send))
+            written = False
+            while not application.done():
+                await asyncio.wait_for(received.wait(), 5)
+                received.clear()
+                body = b''.join(message.get('body', b'') for message in messages)
+                if write and not written and messages[0].get('status') == 200:
+                    written = True
+                    await sync_to_async(write)()
+                if until(body):
+                    break
+            done.set()
+            await asyncio.wait_for(application, 5)
+            if hub.task is not None and not hub.task.done():
+                await asyncio.wait_for(hub.task, 5)
+            return messages
+        return asyncio.run(run())
+
+    def test_refused_requests(self):
+        """The stream needs a token and a GET."""
+        messages = self.open({}, lambda body: True)
+        self.assertEqual(messages[0]['status'], 401)
+        messages = self.open({'authorization': self.token}, lambda body: True, method='POST')
+        self.assertEqual(messages[0]['status'], 405)
+
+    def test_live_changes(self):
+        """The changes committed after the stream started are sent to their owner."""
+        def write():
+            category = self.client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+            connect('other').post('/categories/', {'label': 'Fruits'}, format='json')
+            self.client.delete(f'/categories/{category}')
+        messages = self.open({'authorization': self.token}, lambda body: b'"delete"' in body, write)
+        body = b''.join(message.get('body', b'') for message in messages).decode()
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertEqual(body.count('data: '), 2)
+        self.assertIn('"action": "create"', body)
+
+    def test_resume_replays_the_missed_changes(self):
+        """A client resuming from a change receives the changes of its owner committed since."""
+        self.client.post('/categories/', {'label': 'Dairy'}, format='json')
+        first = events.last_change(self.database)
+        self.client.post('/categories/', {'label': 'Fruits'}, format='json')
+        messages = self.open({'authorization': self.token, 'last-event-id': str(first)},
+                             lambda body: b'data: {"kind"' in body)
+        body = b''.join(message.get('body', b'') for message in messages).decode()
+        self.assertIn(f'id: {events.last_change(self.database)}\n', body)
+        self.assertEqual(body.count('data: '), 1)
+
+    def test_resume_from_a_pruned_change_resets(self):
+        """A client resuming from a pruned change is asked to reload its data."""
+        self.client.post('/categories/', {'label': 'Dairy'}, format='json')
+        age(events.last_change(self.database), self.database)
+        self.client.post('/categories/', {'label': 'Fruits'}, format='json')
+        events.prune(using=self.database)
+        messages = self.open({'authorization': self.token, 'last-event-id': '0'}, lambda body: b'event: reset' in body)
+        self.assertIn(b'event: reset', b''.join(message.get('body', b'') for message in messages))
+
+
+class TicketTests(TransactionTestCase):
+    """This class tests the tickets opening the stream of the changes from a browser."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Register a user."""
+        self.client = connect('watcher')
+        self.user = User.objects.get(username='watcher')
+
+    def ticket(self) -> str:
+        """Return a new ticket of the user."""
+        response = self.client.post('/changes/ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['expires_in'], TICKET_AGE)
+        return response.json()['ticket']
+
+    def test_ticket_opens_the_stream_of_its_user(self):
+        """A ticket authenticates its user on the shard of its data."""
+        self.assertEqual(_authenticate('', self.ticket()), (self.user.pk, database_of('watcher')))
+
+    def test_ticket_needs_a_token(self):
+        """The tickets are only issued to the connected users."""
+        self.client.credentials()
+        self.assertEqual(self.client.post('/changes/ticket/').status_code, 401)
+
+    def test_expired_ticket_is_refused(self):
+        """A ticket older than its lifetime is refused."""
+        ticket = self.ticket()
+        with mock.patch('time.time', return_value=time.time() + TICKET_AGE + 1):
+            self.assertIsNone(_authenticate('', ticket))
+
+    def test_forged_ticket_is_refused(self):
+        """A ticket altered by the client is refused."""
+        ticket = self.ticket()
+        self.assertIsNone(_authenticate('', ticket[:-1] + ('A' if ticket[-1] != 'A' else 'B')))
+
+    def test_ticket_of_an_inactive_user_is_refused(self):
+        """The ticket of a user deactivated since it was issued is refused."""
+        ticket = self.ticket()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(_authenticate('', ticket))
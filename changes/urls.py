@@ -0,0 +1,7 @@
+"""This module defines the routes for the changes resources."""
+from django.urls import path
+from changes.views import TicketView
+
+urlpatterns = [
+    path('ticket/', TicketView.as_view())
+]
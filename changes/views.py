@@ -0,0 +1,39 @@
+"""This module manages the views of the changes app."""
+from rest_framework import permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from changes.stream import TICKET_AGE, issue_ticket
+
+
+class TicketView(APIView):
+    """
+    This class manages the view to get a ticket opening the stream of the changes.
+
+    The browsers open the stream without headers, so without the token of the user:
+    the ticket is sent instead, in the `ticket` query parameter of the stream.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+
+    Returns:
+            200: The ticket and its lifetime in seconds.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request: Request, format=None) -> Response:
+        """
+        Issue a ticket for the stream of the user.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The ticket and its lifetime in seconds.
+        """
+        return Response({'ticket': issue_ticket(request.user), 'expires_in': TICKET_AGE})
@@ -0,0 +1,13 @@
+"""This module defines the configuration for the digests app."""
+from django.apps import AppConfig
+
+
+class DigestsConfig(AppConfig):
+    """
+    This class defines the configuration for the digests app.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'digests'
@@ -0,0 +1,66 @@
+"""This module defines the delivery backends of the digests.
+
+The backend is chosen by the `DIGEST_BACKEND` setting, like the email backends of
+Django, and receives the pending digests by chunks. A backend delivering elsewhere,
+by mail or through a push service, subclasses `BaseBackend`.
+"""
+import json
+import sys
+from typing import Dict, List
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.module_loading import import_string
+from digests.models import Digest
+
+
+class BaseBackend:
+    """This class defines a delivery backend of the digests."""
+
+    def send(self, digests: List[Digest]) -> List[int]:
+        """
+        Deliver digests.
+
+        Args:
+            digests (list(Digest)): The pending digests.
+
+        Returns:
+            list(int): The identifiers of the digests delivered, the others are retried.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def messages(digests: List[Digest]) -> List[dict]:
+        """Return the messages of digests, with the username and the email of their owner."""
+        owners: Dict[int, dict] = {user['pk']: user for user in User.objects.filter(  # pylint: disable=no-member
+            pk__in={digest.owner_id for digest in digests}).values('pk', 'username', 'email')}
+        return [{'digest': digest.pk, 'owner': digest.owner_id,
+                 'username': owners.get(digest.owner_id, {}).get('username'),
+                 'email': owners.get(digest.owner_id, {}).get('email'), 'day': digest.day.isoformat(),
+                 'expiring': digest.expiring, 'expiring_count': digest.expiring_count,
+                 'expired': digest.expired, 'expired_count': digest.expired_count} for digest in digests]
+
+
+class FileBackend(BaseBackend):
+    """This class delivers the digests as JSON lines appended to the `DIGEST_FILE`."""
+
+    def send(self, digests: List[Digest]) -> List[int]:
+        """Append the messages of the digests to the file."""
+        with open(settings.DIGEST_FILE, 'a', encoding='utf-8') as outbox:
+            for message in self.messages(digests):
+                outbox.write(json.dumps(message) + '\n')
+        return [digest.pk for digest in digests]
+
+
+class ConsoleBackend(BaseBackend):
+    """This class writes the digests to the standard output, for the development."""
+
+    def send(self, digests: List[Digest]) -> List[int]:
+        """Write the messages of the digests."""
+        for message in self.messages(digests):
+            sys.stdout.write(json.dumps(message, indent=2) + '\n')
+        return [digest.pk for digest in digests]
+
+
+def get_backend() -> BaseBackend:
+    """Return the delivery backend of the settings."""
+    return import_string(settings.DIGEST_BACKEND)()
@@ -0,0 +1,46 @@
+"""This module defines the command writing and delivering the daily expiry digests."""
+import datetime
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.sharding import shards
+from digests.backends import get_backend
+from digests.outbox import EXPIRED_DAYS, OWNERS_PER_CHUNK, SOON_DAYS, build, deliver, prune
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command writing and delivering the daily expiry digests.
+
+    It is scheduled once a day: the digests of the day are written for every owner of
+    each shard, then the pending ones are delivered, the ones not delivered earlier
+    included, and the digests out of retention are deleted. Running it again the same
+    day only delivers the digests still pending.
+    """
+
+    help = 'Write the expiry digests of a day, deliver the pending ones and delete the old ones.'
+
+    def add_arguments(self, parser):
+        """Add the day, the window, the database and the delivery options."""
+        parser.add_argument('--day', type=datetime.date.fromisoformat, help='The day of the digests, today by default.')
+        parser.add_argument('--soon', type=int, default=SOON_DAYS,
+                            help='The days after the day a batch expires soon within.')
+        parser.add_argument('--expired', type=int, default=EXPIRED_DAYS,
+                            help='The days before the day a batch expired lately within.')
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A shard to scan, repeated for several ones, every shard by default.')
+        parser.add_argument('--chunk', type=int, default=OWNERS_PER_CHUNK,
+                            help='The number of owners whose batches are grouped together.')
+        parser.add_argument('--no-deliver', action='store_false', dest='deliver',
+                            help='Write the digests without delivering them.')
+
+    def handle(self, *args, **options):
+        """Write, deliver and prune the digests of each shard."""
+        day = options['day'] or timezone.localdate()
+        backend = get_backend()
+        for database in options['databases'] or shards():
+            written = build(day, options['soon'], options['expired'], database, options['chunk'])
+            self.stdout.write(f'{database}: {written} digests written for {day.isoformat()}.')
+            if options['deliver']:
+                sent, missed = deliver(backend, database)
+                self.stdout.write(f'{database}: {sent} digests sent, {missed} not delivered.')
+            prune(database)
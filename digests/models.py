@@ -0,0 +1,57 @@
+"""This module defines the models of the digests app."""
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class Digest(models.Model):
+    """
+    This class defines the daily digest of the expiring and expired batches of an owner.
+
+    The digests are an outbox: they are written by the daily scan of the batches, then
+    sent by the delivery backend, and kept until their retention ends.
+
+    Attributes:
+        owner (User): The owner of the batches.
+        day (Date): The day of the digest.
+        expiring (list(dict)): The batches in stock expiring soon, first to expire first.
+        expired (list(dict)): The batches in stock expired lately, first expired first.
+        expiring_count (int): The number of batches expiring soon, the listed ones being capped.
+        expired_count (int): The number of batches expired lately, the listed ones being capped.
+        state (str): The delivery state: pending, sent or failed.
+        attempts (int): The number of failed deliveries.
+        created (DateTime): The date the digest was written.
+        sent (DateTime): The date the digest was delivered.
+    """
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATES = [(PENDING, PENDING), (SENT, SENT), (FAILED, FAILED)]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    expiring = models.JSONField(default=list)
+    expired = models.JSONField(default=list)
+    expiring_count = models.PositiveIntegerField(default=0)
+    expired_count = models.PositiveIntegerField(default=0)
+    state = models.CharField(max_length=7, choices=STATES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True)
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            constraints (list(Constraint)): The single digest of an owner by day, which makes a scan idempotent.
+            indexes (list(Index)): The indexes of the delivery and the prune.
+        """
+
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'day'], name='digest_owner_day'),
+        ]
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(state='pending'), name='digest_pending_idx'),
+            models.Index(fields=['day'], name='digest_day_idx'),
+        ]
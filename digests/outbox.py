@@ -0,0 +1,135 @@
+"""This module writes the daily expiry digests of the owners and delivers them.
+
+The digests of a day are built by one pass over the batches in stock whose DLUO is in
+the window of the day, whatever the number of owners: the owners with such batches are
+read from the `batch_expiry_idx` index, ordered by DLUO, then their batches are read by
+chunks of owners from the `batch_stock_limit_idx` index, already ordered by owner and
+DLUO, and grouped per owner as they stream. The owners without batches in the window
+cost nothing, and the listed batches of an owner are capped, so the memory used is
+bounded by the chunk.
+
+The digests are written to the outbox table, once by owner and day, then sent by the
+delivery backend, see `digests.backends`.
+"""
+import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator, List, Tuple
+from django.db.models import F
+from django.utils import timezone
+from digests.backends import BaseBackend
+from digests.models import Digest
+from products.models import Batch
+
+SOON_DAYS = 3
+
+EXPIRED_DAYS = 7
+
+OWNERS_PER_CHUNK = 500
+
+MAX_ITEMS = 100
+
+DELIVERY_CHUNK = 200
+
+MAX_ATTEMPTS = 3
+
+RETENTION = datetime.timedelta(days=30)
+
+
+def _owners(batches, size: int) -> Iterator[List[int]]:
+    """Yield the owners of batches, by sorted chunks."""
+    owners = sorted(batches.values_list('owner', flat=True).distinct())
+    for start in range(0, len(owners), size):
+        yield owners[start:start + size]
+
+
+def _digest(owner: int, day: datetime.date, rows: Iterator[tuple]) -> Digest:
+    """Return the digest of an owner from its batches in the window, ordered by DLUO."""
+    digest = Digest(owner_id=owner, day=day)
+    for _, batch, product, label, unit, current, limit in rows:
+        items, count = ('expired', 'expired_count') if limit < day else ('expiring', 'expiring_count')
+        setattr(digest, count, getattr(digest, count) + 1)
+        if getattr(digest, count) <= MAX_ITEMS:
+            getattr(digest, items).append({'batch': batch, 'product': product, 'label': label, 'unit': unit,
+                                           'current': current, 'limit': limit.isoformat()})
+    return digest
+
+
+def build(day: datetime.date, soon: int = SOON_DAYS, expired: int = EXPIRED_DAYS, using: str = 'default',
+          chunk: int = OWNERS_PER_CHUNK) -> int:
+    """
+    Write the digests of a day of the owners with batches in stock expiring soon or expired lately.
+
+    Args:
+        day (Date): The day of the digests.
+        soon (int): The days after the day a batch expires soon within, the day included.
+        expired (int): The days before the day a batch expired lately within.
+        using (str): The database alias.
+        chunk (int): The number of owners whose batches are grouped together.
+
+    Returns:
+        int: The number of digests written, the ones already written for the day excepted.
+    """
+    window = Batch.objects.using(using).filter(  # pylint: disable=no-member
+        current__gt=0, limit__range=(day - datetime.timedelta(days=expired), day + datetime.timedelta(days=soon)))
+    written = 0
+    for owners in _owners(window.order_by(), chunk):
+        rows = (window.filter(owner__in=owners).order_by('owner', 'limit', 'id')
+                .values_list('owner', 'id', 'product', 'product__label', 'product__unit', 'current', 'limit')
+                .iterator(chunk_size=2000))
+        digests = [_digest(owner, day, group) for owner, group in groupby(rows, key=itemgetter(0))]
+        existing = set(Digest.objects.using(using).filter(  # pylint: disable=no-member
+            owner__in=owners, day=day).values_list('owner', flat=True))
+        digests = [digest for digest in digests if digest.owner_id not in existing]
+        Digest.objects.using(using).bulk_create(digests, batch_size=500, ignore_conflicts=True)  # pylint: disable=no-member
+        written += len(digests)
+    return written
+
+
+def deliver(backend: BaseBackend, using: str = 'default', chunk: int = DELIVERY_CHUNK) -> Tuple[int, int]:
+    """
+    Send the pending digests with a backend, by chunks.
+
+    A digest the backend did not deliver stays pending for the next delivery, and fails
+    once out of attempts.
+
+    Args:
+        backend (BaseBackend): The delivery backend.
+        using (str): The database alias.
+        chunk (int): The number of digests given to the backend at once.
+
+    Returns:
+        tuple(int, int): The number of digests sent, and of digests not delivered.
+    """
+    pending = Digest.objects.using(using).filter(state=Digest.PENDING)  # pylint: disable=no-member
+    sent, missed, last = 0, 0, 0
+    while True:
+        digests = list(pending.filter(pk__gt=last).order_by('pk')[:chunk])
+        if not digests:
+            return sent, missed
+        last = digests[-1].pk
+        try:
+            delivered = set(backend.send(digests))
+        except Exception:  # pylint: disable=broad-except
+            delivered = set()
+        undelivered = [digest.pk for digest in digests if digest.pk not in delivered]
+        pending.filter(pk__in=delivered).update(state=Digest.SENT, sent=timezone.now())
+        pending.filter(pk__in=undelivered).update(attempts=F('attempts') + 1)
+        pending.filter(pk__in=undelivered, attempts__gte=MAX_ATTEMPTS).update(state=Digest.FAILED)
+        sent += len(delivered)
+        missed += len(undelivered)
+
+
+def prune(using: str = 'default', before: datetime.date = None) -> int:
+    """
+    Delete the digests of the days before the retention.
+
+    Args:
+        using (str): The database alias.
+        before (Date): The oldest day kept, today minus the retention by default.
+
+    Returns:
+        int: The number of digests deleted.
+    """
+    old = Digest.objects.using(using).filter(day__lt=before or timezone.localdate() - RETENTION)  # pylint: disable=no-member
+    return old._raw_delete(using)  # pylint: disable=protected-access
@@ -0,0 +1,111 @@
+"""This module manages the tests for the digests app."""
+import datetime
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import List
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from api.testing import connect, database_of
+from digests.backends import BaseBackend, FileBackend
+from digests.models import Digest
+from digests.outbox import MAX_ATTEMPTS, build, deliver, prune
+
+DAY = datetime.date(2026, 3, 10)
+
+
+class RefusingBackend(BaseBackend):
+    """This class defines a backend delivering no digest."""
+
+    def send(self, digests: List[Digest]) -> List[int]:
+        """Deliver nothing."""
+        return []
+
+
+class OutboxTests(TestCase):
+    """This class tests the writing and the delivery of the expiry digests."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user with batches around the day and a user without, and use a new outbox file."""
+        self.limits = {'soon': '2026-03-12', 'expired': '2026-03-07', 'later': '2026-03-20', 'empty': '2026-03-11'}
+        self.batches = self.stock('alice', self.limits)
+        self.stock('bob', {'later': '2026-04-01'})
+        self.database = database_of('alice')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        outbox = override_settings(DIGEST_FILE=Path(directory.name) / 'digests.jsonl')
+        outbox.enable()
+        self.addCleanup(outbox.disable)
+
+    @staticmethod
+    def stock(username: str, limits: dict) -> dict:
+        """Connect a user with a product and a batch by DLUO, and return the batches by name."""
+        client = connect(username)
+        category = client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        provider = client.post('/providers/', {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon',
+                                               'zipcode': '69000', 'phone': '0400000000'}, format='json').json()['id']
+        product = client.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': category},
+                              format='json').json()['id']
+        return {name: client.post(f'/products/{product}/batches/', {
+            'provider': provider, 'initial': 4, 'current': 0 if name == 'empty' else 2, 'price': 1.5,
+            'purchase': '2026-01-01', 'limit': limit
+        }, format='json').json()['id'] for name, limit in limits.items()}
+
+    def digests(self):
+        """Return the digests of the shard of the user."""
+        return Digest.objects.using(self.database).order_by('pk')  # pylint: disable=no-member
+
+    def test_build(self):
+        """A digest lists the batches in stock of an owner expiring soon or expired lately, once a day."""
+        self.assertEqual(build(DAY, using=self.database), 1)
+        digest = self.digests().get()
+        self.assertEqual([item['batch'] for item in digest.expiring], [self.batches['soon']])
+        self.assertEqual(digest.expiring[0]['label'], 'Milk')
+        self.assertEqual([item['batch'] for item in digest.expired], [self.batches['expired']])
+        self.assertEqual((digest.expiring_count, digest.expired_count, digest.state), (1, 1, Digest.PENDING))
+        self.assertEqual(build(DAY, using=self.database), 0)
+
+    def test_capped_items(self):
+        """The listed batches are capped, and counted whole."""
+        with mock.patch('digests.outbox.MAX_ITEMS', 0):
+            build(DAY, using=self.database)
+        digest = self.digests().get()
+        self.assertEqual((digest.expiring, digest.expiring_count, digest.expired, digest.expired_count),
+                         ([], 1, [], 1))
+
+    def test_deliver(self):
+        """The pending digests are appended to the outbox file and sent once."""
+        build(DAY, using=self.database)
+        self.assertEqual(deliver(FileBackend(), self.database), (1, 0))
+        self.assertEqual(deliver(FileBackend(), self.database), (0, 0))
+        with open(settings.DIGEST_FILE, encoding='utf-8') as outbox:
+            messages = [json.loads(line) for line in outbox]
+        self.assertEqual([(message['username'], message['day']) for message in messages], [('alice', '2026-03-10')])
+        self.assertEqual(self.digests().get().state, Digest.SENT)
+
+    def test_undelivered(self):
+        """A digest not delivered is retried, then fails once out of attempts."""
+        build(DAY, using=self.database)
+        for _ in range(MAX_ATTEMPTS):
+            self.assertEqual(deliver(RefusingBackend(), self.database), (0, 1))
+        digest = self.digests().get()
+        self.assertEqual((digest.state, digest.attempts), (Digest.FAILED, MAX_ATTEMPTS))
+        self.assertEqual(deliver(RefusingBackend(), self.database), (0, 0))
+
+    def test_prune(self):
+        """The digests of the days before the retention are deleted."""
+        build(DAY, using=self.database)
+        self.assertEqual(prune(self.database, before=DAY), 0)
+        self.assertEqual(prune(self.database, before=DAY + datetime.timedelta(days=1)), 1)
+
+    def test_command(self):
+        """The command writes and delivers the digests of every shard."""
+        out = StringIO()
+        call_command('expiry_digests', '--day', DAY.isoformat(), stdout=out)
+        self.assertIn(f'{self.database}: 1 digests written for 2026-03-10.', out.getvalue())
+        self.assertIn(f'{self.database}: 1 digests sent, 0 not delivered.', out.getvalue())
@@ -3,6 +3,6 @@
 set -e
 
 cd /usr/src/app
-python manage.py migrate
+python manage.py ensure_migrated
 
-exec "$@"
\ No newline at end of file
+exec "$@"
@@ -0,0 +1,13 @@
+"""This module defines the configuration for the jobs app."""
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    """
+    This class defines the configuration for the jobs app.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'jobs'
@@ -0,0 +1,14 @@
+"""This module defines the command deleting the jobs finished before their retention."""
+from django.core.management.base import BaseCommand
+from jobs.queue import prune
+
+
+class Command(BaseCommand):
+    """This class defines the command deleting the jobs finished before their retention, to run periodically."""
+
+    help = 'Delete the jobs finished before their retention.'
+
+    def handle(self, *args, **options):
+        """Delete the jobs."""
+        count = prune()
+        self.stdout.write(self.style.SUCCESS(f'{count} jobs deleted.'))
@@ -0,0 +1,37 @@
+"""This module defines the command running the queued jobs."""
+import os
+from django.core.management.base import BaseCommand
+from jobs.worker import Pool, work
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command running the queued jobs, beside the servers of the api.
+
+    The jobs are run by a pool of worker processes, see `jobs.worker`. Send SIGTERM to
+    stop them once their current job ends.
+    """
+
+    help = 'Run the queued jobs with a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        """Add the workers and the polling options."""
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='The number of worker processes.')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='The seconds between two looks of a worker at an empty queue.')
+        parser.add_argument('--graceful-timeout', type=float, default=60.0,
+                            help='The seconds given to a stopped worker to end its job.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Run the queued jobs in this process, and exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        """Run the jobs."""
+        if options['burst']:
+            self.stdout.write(self.style.SUCCESS(f'{work(options["poll"], burst=True)} jobs run.'))
+            return
+        Pool(options['processes'], options['poll'], options['graceful_timeout'], self.log).run()
+
+    def log(self, message: str):
+        """Write a message of the master right away."""
+        self.stdout.write(message)
+        self.stdout.flush()
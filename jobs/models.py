@@ -0,0 +1,69 @@
+"""This module defines the models of the jobs app."""
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class Job(models.Model):
+    """
+    This class defines a job, an expensive work run by a worker out of the request.
+
+    The jobs are queued in the central database, whatever the shard of their owner. A
+    worker claims a job with a conditional update, and holds it until its lease ends: a
+    job still running then is taken again, its worker being presumed dead.
+
+    Attributes:
+        owner (User): The user the job runs for, None for a job of the whole api.
+        name (str): The registered function run by the job, see `jobs.queue.job`.
+        arguments (dict): The keyword arguments of the function.
+        state (str): The job state: queued, running, succeeded or failed.
+        attempts (int): The number of runs started.
+        max_attempts (int): The number of runs before the job fails.
+        run_after (DateTime): The date the job can run from, delayed by the retries.
+        lease_until (DateTime): The date a running job is taken again from.
+        worker (str): The host and process running the job.
+        result (dict): The value returned by the function.
+        error (str): The last error of the function.
+        created (DateTime): The date the job was queued.
+        started (DateTime): The date of the last run.
+        finished (DateTime): The date the job succeeded or failed.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATES = [(QUEUED, QUEUED), (RUNNING, RUNNING), (SUCCEEDED, SUCCEEDED), (FAILED, FAILED)]
+
+    id = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+')
+    name = models.CharField(max_length=200)
+    arguments = models.JSONField(default=dict)
+    state = models.CharField(max_length=9, choices=STATES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    lease_until = models.DateTimeField(null=True)
+    worker = models.CharField(max_length=100, blank=True)
+    result = models.JSONField(null=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
+
+    def __str__(self):
+        """Return the value when the model is called directly."""
+        return f'{self.name} #{self.pk}'
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            indexes (list(Index)): The indexes of the claims, the status lists and the prune.
+        """
+
+        indexes = [
+            models.Index(fields=['state', 'run_after'], name='job_claim_idx'),
+            models.Index(fields=['owner', 'id'], name='job_owner_idx'),
+            models.Index(fields=['finished'], name='job_finished_idx'),
+        ]
@@ -0,0 +1,214 @@
+"""This module queues the jobs in the database and runs them in the workers.
+
+A job runs a function registered with the `job` decorator, called with the owner of
+the job, if any, and the keyword arguments given when it was queued, which must be
+JSON serializable, as its result. The function runs on the shard of its owner, and is
+run again after a growing delay when it raises, up to the attempts of the job.
+
+A claimed job is leased to its worker, which extends the lease while the job runs,
+so that only the jobs of a stopped worker are taken again. The result of a run is
+recorded only while the job is still leased to its worker for the same attempt.
+"""
+import contextvars
+import datetime
+import os
+import socket
+import threading
+import traceback
+from importlib import import_module
+from typing import Callable, Dict, Optional
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connections
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+from api.exceptions import Moving
+from api.sharding import enter
+from jobs.models import Job
+
+LEASE = datetime.timedelta(minutes=10)
+
+HEARTBEAT = LEASE / 3
+
+BACKOFF = datetime.timedelta(seconds=10)
+
+RETENTION = datetime.timedelta(days=7)
+
+JOBS: Dict[str, Callable] = {}
+
+
+def job(function: Callable) -> Callable:
+    """
+    Register a function as a job, and add it an `enqueue` method queuing a run.
+
+    Args:
+        function (Callable): A module level function, taking the owner of the job first
+            when the job has one.
+
+    Returns:
+        Callable: The function.
+    """
+    name = f'{function.__module__}.{function.__qualname__}'
+    JOBS[name] = function
+    function.enqueue = lambda owner=None, **arguments: enqueue(name, owner, **arguments)
+    return function
+
+
+def enqueue(name: str, owner: Optional[User] = None, max_attempts: int = 3, **arguments: dict) -> Job:
+    """
+    Queue a run of a registered function.
+
+    Args:
+        name (str): The registered name of the function.
+        owner (User): The user the job runs for, None for a job of the whole api.
+        max_attempts (int): The number of runs before the job fails.
+        arguments (dict): The keyword arguments of the function.
+
+    Raises:
+        KeyError: The function is not registered.
+
+    Returns:
+        Job: The queued job.
+    """
+    if name not in JOBS:
+        raise KeyError(f'{name} is not a registered job.')
+    return Job.objects.create(owner=owner, name=name, arguments=arguments,  # pylint: disable=no-member
+                              max_attempts=max_attempts, run_after=timezone.now())
+
+
+def resolve(name: str) -> Optional[Callable]:
+    """Return the registered function of a name, importing its module, or None."""
+    if name not in JOBS:
+        try:
+            import_module(name.rpartition('.')[0])
+        except ImportError:
+            return None
+    return JOBS.get(name)
+
+
+def claim(worker: str) -> Optional[Job]:
+    """
+    Take the next job to run: the oldest queued one, or a running one whose lease ended.
+
+    Two workers may select the same job, only one of them updates it. The running jobs
+    whose lease ended out of attempts fail first.
+
+    Args:
+        worker (str): The host and process of the worker.
+
+    Returns:
+        Job: The claimed job, None when no job is ready.
+    """
+    now = timezone.now()
+    Job.objects.filter(state=Job.RUNNING, lease_until__lt=now, attempts__gte=F('max_attempts')).update(  # pylint: disable=no-member
+        state=Job.FAILED, lease_until=None, finished=now, error='The worker stopped during the job.')
+    ready = Q(state=Job.QUEUED, run_after__lte=now) | Q(state=Job.RUNNING, lease_until__lt=now)
+    for pk in Job.objects.filter(ready).order_by('run_after', 'id').values_list('pk', flat=True)[:8]:  # pylint: disable=no-member
+        if Job.objects.filter(ready, pk=pk).update(  # pylint: disable=no-member
+                state=Job.RUNNING, attempts=F('attempts') + 1, lease_until=now + LEASE, worker=worker, started=now):
+            return Job.objects.select_related('owner__shard').get(pk=pk)  # pylint: disable=no-member
+    return None
+
+
+def leased(claimed: Job) -> QuerySet:
+    """Return the job while it is still leased to the worker for the attempt it claimed."""
+    return Job.objects.filter(pk=claimed.pk, state=Job.RUNNING, worker=claimed.worker,  # pylint: disable=no-member
+                              attempts=claimed.attempts)
+
+
+class Heartbeat(threading.Thread):
+    """
+    This class defines the thread extending the lease of a job while it runs.
+
+    Attributes:
+        claimed (Job): The job, claimed by the current worker.
+        stopped (Event): Set once the job ended.
+    """
+
+    def __init__(self, claimed: Job):
+        """Create the heartbeat of a claimed job."""
+        super().__init__(name=f'heartbeat-{claimed.pk}', daemon=True)
+        self.claimed = claimed
+        self.stopped = threading.Event()
+
+    def beat(self) -> bool:
+        """Extend the lease of the job, and return whether it is still leased to the worker."""
+        return bool(leased(self.claimed).update(lease_until=timezone.now() + LEASE))
+
+    def run(self):
+        """Extend the lease every heartbeat until the job ends or is taken by another worker."""
+        try:
+            while not self.stopped.wait(HEARTBEAT.total_seconds()):
+                try:
+                    if not self.beat():
+                        return
+                except DatabaseError:
+                    continue
+        finally:
+            connections.close_all()
+
+    def __enter__(self) -> 'Heartbeat':
+        """Start the heartbeat."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the heartbeat."""
+        self.stopped.set()
+        self.join()
+
+
+def run(claimed: Job):
+    """
+    Run a claimed job on the shard of its owner, and record its result or its error.
+
+    A failed job is queued again after a delay doubling at each attempt, and fails once
+    out of attempts. A job whose owner is being moved is queued again without counting
+    the attempt. Nothing is recorded once the lease of the attempt was lost.
+
+    Args:
+        claimed (Job): The job, claimed by the current worker.
+    """
+    function = resolve(claimed.name)
+    try:
+        if function is None:
+            raise LookupError(f'{claimed.name} is not a registered job.')
+        with Heartbeat(claimed):
+            result = contextvars.copy_context().run(_call, function, claimed.owner, claimed.arguments)
+        values = {'state': Job.SUCCEEDED, 'result': result, 'error': '', 'finished': timezone.now()}
+    except Moving as error:
+        values = {'state': Job.QUEUED, 'attempts': F('attempts') - 1,
+                  'run_after': timezone.now() + datetime.timedelta(seconds=error.wait)}
+    except Exception:  # pylint: disable=broad-except
+        values = {'error': traceback.format_exc()}
+        if function is not None and claimed.attempts < claimed.max_attempts:
+            values.update(state=Job.QUEUED, run_after=timezone.now() + BACKOFF * 2 ** (claimed.attempts - 1))
+        else:
+            values.update(state=Job.FAILED, finished=timezone.now())
+    leased(claimed).update(lease_until=None, **values)
+
+
+def _call(function: Callable, owner: Optional[User], arguments: dict):
+    """Call the function of a job on the shard of its owner."""
+    if owner is None:
+        return function(**arguments)
+    enter(owner)
+    return function(owner, **arguments)
+
+
+def worker_name() -> str:
+    """Return the name of the current process as a worker."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def prune(before: datetime.datetime = None) -> int:
+    """
+    Delete the jobs finished before the retention.
+
+    Args:
+        before (DateTime): The date of the oldest finished job kept, now minus the retention by default.
+
+    Returns:
+        int: The number of jobs deleted.
+    """
+    old = Job.objects.filter(finished__lt=before or timezone.now() - RETENTION)  # pylint: disable=no-member
+    return old._raw_delete(old.db)  # pylint: disable=protected-access
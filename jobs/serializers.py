@@ -0,0 +1,20 @@
+"""This module defines the serializers for the jobs app."""
+from rest_framework import serializers
+from jobs.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """This class defines the serializer for the jobs views."""
+
+    class Meta:
+        """
+        This class defines the validation metadata for the jobs views.
+
+        Attributes:
+            model (Model): The model linked to the serializer.
+            fields (list(str)): The field list expencted by the serializer.
+        """
+
+        model = Job
+        fields = ['id', 'name', 'state', 'attempts', 'max_attempts', 'result', 'error', 'created', 'started',
+                  'finished']
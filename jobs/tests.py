@@ -0,0 +1,168 @@
+"""This module manages the tests for the jobs app."""
+import datetime
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from api.testing import connect
+from authentication.models import ShardAssignment
+from categories.models import Category
+from jobs.models import Job
+from jobs.queue import BACKOFF, LEASE, Heartbeat, claim, enqueue, job, prune, run
+from jobs.worker import work
+
+
+@job
+def count_categories(owner: User) -> int:
+    """Return the number of categories of the owner, as a test job."""
+    return Category.objects.filter(owner=owner).count()  # pylint: disable=no-member
+
+
+@job
+def explode():
+    """Raise an error, as a test job."""
+    raise ValueError('Exploded.')
+
+
+class QueueTests(TestCase):
+    """This class tests the queuing, the claims and the runs of the jobs."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user with a category."""
+        self.client = connect('jobber')
+        self.client.post('/categories/', {'label': 'Dairy'}, format='json')
+        self.user = User.objects.select_related('shard').get(username='jobber')
+
+    def test_run_on_the_shard_of_the_owner(self):
+        """A job runs with its owner on the shard of its data, and records its result."""
+        queued = count_categories.enqueue(self.user)
+        self.assertEqual(work(0.0, burst=True), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.result, queued.attempts, queued.lease_until),
+                         (Job.SUCCEEDED, 1, 1, None))
+        self.assertIsNotNone(queued.finished)
+
+    def test_unknown_job(self):
+        """Only the registered functions are queued."""
+        with self.assertRaises(KeyError):
+            enqueue('jobs.tests.unknown')
+
+    def test_claimed_once(self):
+        """A job is claimed by one worker only."""
+        queued = explode.enqueue()
+        self.assertEqual(claim('first').pk, queued.pk)
+        self.assertIsNone(claim('second'))
+
+    def test_retry_with_backoff(self):
+        """A failed job is queued again after a doubling delay, then fails once out of attempts."""
+        queued = explode.enqueue(max_attempts=2)
+        before = timezone.now()
+        run(claim('worker'))
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.attempts), (Job.QUEUED, 1))
+        self.assertIn('ValueError: Exploded.', queued.error)
+        self.assertGreaterEqual(queued.run_after, before + BACKOFF)
+        self.assertIsNone(claim('worker'))
+        Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())  # pylint: disable=no-member
+        run(claim('worker'))
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.attempts), (Job.FAILED, 2))
+
+    def test_expired_lease(self):
+        """A job whose lease ended is taken again, and the result of its first worker is dropped."""
+        queued = count_categories.enqueue(self.user)
+        stale = claim('dead')
+        Job.objects.filter(pk=queued.pk).update(lease_until=timezone.now() - datetime.timedelta(seconds=1))  # pylint: disable=no-member
+        taken = claim('alive')
+        self.assertEqual((taken.pk, taken.worker, taken.attempts), (queued.pk, 'alive', 2))
+        run(stale)
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.worker), (Job.RUNNING, 'alive'))
+
+    def test_heartbeat(self):
+        """The heartbeat extends the lease of a running job until another worker takes it."""
+        queued = count_categories.enqueue(self.user)
+        claimed = claim('alive')
+        Job.objects.filter(pk=queued.pk).update(lease_until=timezone.now())  # pylint: disable=no-member
+        before = timezone.now()
+        self.assertTrue(Heartbeat(claimed).beat())
+        queued.refresh_from_db()
+        self.assertGreaterEqual(queued.lease_until, before + LEASE)
+        Job.objects.filter(pk=queued.pk).update(lease_until=timezone.now() - datetime.timedelta(seconds=1))  # pylint: disable=no-member
+        claim('other')
+        self.assertFalse(Heartbeat(claimed).beat())
+
+    def test_result_of_a_former_attempt(self):
+        """The result of an attempt whose lease ended is dropped, even when the same worker took the job again."""
+        queued = count_categories.enqueue(self.user)
+        stale = claim('worker')
+        Job.objects.filter(pk=queued.pk).update(lease_until=timezone.now() - datetime.timedelta(seconds=1))  # pylint: disable=no-member
+        claim('worker')
+        run(stale)
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.attempts, queued.result), (Job.RUNNING, 2, None))
+
+    def test_expired_lease_out_of_attempts(self):
+        """A job whose lease ended after its last attempt fails."""
+        queued = explode.enqueue(max_attempts=1)
+        claim('dead')
+        Job.objects.filter(pk=queued.pk).update(lease_until=timezone.now() - datetime.timedelta(seconds=1))  # pylint: disable=no-member
+        self.assertIsNone(claim('alive'))
+        queued.refresh_from_db()
+        self.assertEqual(queued.state, Job.FAILED)
+
+    def test_moving_owner(self):
+        """A job whose owner is being moved is queued again without counting the attempt."""
+        queued = count_categories.enqueue(self.user)
+        ShardAssignment.objects.update_or_create(user=self.user, defaults={'moving': True})  # pylint: disable=no-member
+        run(claim('worker'))
+        queued.refresh_from_db()
+        self.assertEqual((queued.state, queued.attempts), (Job.QUEUED, 0))
+
+    def test_prune(self):
+        """The jobs finished before the retention are deleted."""
+        old, recent = explode.enqueue(), explode.enqueue()
+        Job.objects.filter(pk=old.pk).update(finished=timezone.now() - datetime.timedelta(days=8))  # pylint: disable=no-member
+        Job.objects.filter(pk=recent.pk).update(finished=timezone.now())  # pylint: disable=no-member
+        self.assertEqual(prune(), 1)
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [recent.pk])  # pylint: disable=no-member
+
+    def test_burst_command(self):
+        """The worker command in burst mode runs the queue once."""
+        count_categories.enqueue(self.user)
+        out = StringIO()
+        call_command('worker', '--burst', stdout=out)
+        self.assertIn('1 jobs run.', out.getvalue())
+
+
+class JobViewsTests(TestCase):
+    """This class tests the asynchronous bulk deletes and the views following the jobs."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user with two categories."""
+        self.client = connect('jobber')
+        self.ids = [self.client.post('/categories/', {'label': label}, format='json').json()['id']
+                    for label in ('Dairy', 'Fruits')]
+
+    def test_asynchronous_bulk_delete(self):
+        """A bulk delete preferring an asynchronous response is answered 202 and done by the job."""
+        response = self.client.post('/categories/delete/', {'ids': self.ids}, format='json', HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], f"/jobs/{response.json()['id']}")
+        self.assertEqual(len(self.client.get('/categories/').json()), 2)
+        work(0.0, burst=True)
+        self.assertEqual(self.client.get('/categories/').json(), [])
+        self.assertEqual(self.client.get(response['Location']).json()['state'], Job.SUCCEEDED)
+
+    def test_jobs_of_the_user(self):
+        """A user follows its own jobs only."""
+        queued = count_categories.enqueue(User.objects.get(username='jobber'))
+        other = connect('other')
+        self.assertEqual([item['id'] for item in self.client.get('/jobs/').json()['results']], [queued.pk])
+        self.assertEqual(other.get('/jobs/').json()['results'], [])
+        self.assertEqual(other.get(f'/jobs/{queued.pk}').status_code, 404)
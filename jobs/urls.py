@@ -0,0 +1,8 @@
+"""This module defines the routes for the jobs resources."""
+from django.urls import path
+from jobs.views import JobView, JobDetail
+
+urlpatterns = [
+    path('', JobView.as_view()),
+    path('<int:pk>', JobDetail.as_view())
+]
@@ -0,0 +1,58 @@
+"""This module manages the views of the jobs app."""
+from rest_framework import generics, permissions
+from api.pagination import OrderedCursorPagination
+from jobs.models import Job
+from jobs.serializers import JobSerializer
+
+
+class JobView(generics.ListAPIView):
+    """
+    This class manages the view to list the jobs of the user, latest first.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+        serializer_class (Serializer): The serializer to bind the request and the response object.
+        pagination_class (Pagination): The cursor pagination of the list.
+
+    Returns:
+            200: The page of jobs.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = JobSerializer
+    pagination_class = OrderedCursorPagination
+
+    def get_ordering(self) -> str:
+        """Return the ordering of the list, used by the pagination."""
+        return '-id'
+
+    def get_queryset(self):
+        """Return the jobs of the user."""
+        return Job.objects.filter(owner=self.request.user)  # pylint: disable=no-member
+
+
+class JobDetail(generics.RetrieveAPIView):
+    """
+    This class manages the view to follow a job of the user.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+        serializer_class (Serializer): The serializer to bind the request and the response object.
+
+    Returns:
+            200: The job, with its result once succeeded.
+            401: The user must be connected to access this resource.
+            404: The job does not exist.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        """Return the jobs of the user."""
+        return Job.objects.filter(owner=self.request.user)  # pylint: disable=no-member
@@ -0,0 +1,143 @@
+"""This module runs the queued jobs in a pool of worker processes.
+
+The master process forks the workers and replaces the ones that exit. Each worker
+claims the jobs one at a time, see `jobs.queue`, and polls the queue while it is
+empty. A SIGTERM or SIGINT stops the workers once their current job ends, and kills
+the ones still running after the graceful timeout: their jobs are taken again by
+another worker when their lease ends.
+"""
+import os
+import signal
+import time
+from typing import Callable, Optional, Set
+from django.db import close_old_connections, connections
+from jobs.queue import claim, run, worker_name
+
+TICK = 0.2
+
+stopping = False
+
+
+def work(poll: float, burst: bool = False) -> int:
+    """
+    Run the queued jobs until stopped.
+
+    Args:
+        poll (float): The seconds between two looks at an empty queue.
+        burst (bool): Whether to return once the queue is empty.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    name, count = worker_name(), 0
+    while not stopping:
+        close_old_connections()
+        claimed = claim(name)
+        if claimed is not None:
+            run(claimed)
+            count += 1
+        elif burst:
+            break
+        else:
+            time.sleep(poll)
+    return count
+
+
+class Pool:
+    """
+    This class defines the master process, which forks and supervises the workers.
+
+    Attributes:
+        processes (int): The number of workers.
+        poll (float): The seconds between two looks of a worker at an empty queue.
+        graceful_timeout (float): The seconds given to a stopped worker to end its job.
+        log (Callable): The output of the messages.
+        workers (set(int)): The process ids of the running workers.
+        signal (int): The stop signal received, None until then.
+    """
+
+    def __init__(self, processes: int, poll: float, graceful_timeout: float, log: Callable):
+        """Create a master without workers."""
+        self.processes = processes
+        self.poll = poll
+        self.graceful_timeout = graceful_timeout
+        self.log = log
+        self.workers: Set[int] = set()
+        self.signal: Optional[int] = None
+
+    def spawn(self) -> int:
+        """Fork a worker and return its process id."""
+        connections.close_all()
+        pid = os.fork()
+        if pid == 0:
+            self.work()
+        self.workers.add(pid)
+        return pid
+
+    def work(self):
+        """Run the jobs in a forked process, and exit once stopped."""
+        def drain(signum: int, frame):
+            global stopping  # pylint: disable=global-statement
+            stopping = True
+
+        status = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, drain)
+            work(self.poll)
+        except BaseException:  # pylint: disable=broad-except
+            status = 1
+            import traceback  # pylint: disable=import-outside-toplevel
+            traceback.print_exc()
+        finally:
+            os._exit(status)  # pylint: disable=protected-access
+
+    def reap(self) -> int:
+        """Collect the exited workers and return their number."""
+        exited = 0
+        for pid in list(self.workers):
+            try:
+                done = os.waitpid(pid, os.WNOHANG)[0] != 0
+            except ChildProcessError:
+                done = True
+            if done:
+                self.workers.discard(pid)
+                exited += 1
+        return exited
+
+    def stop(self):
+        """Stop the workers once their job ends, and kill the ones still running after the timeout."""
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            time.sleep(TICK)
+            self.reap()
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+        self.workers.clear()
+
+    def run(self):
+        """Start the workers and supervise them until a stop signal."""
+        def notify(signum: int, frame):
+            self.signal = signum
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, notify)
+        for _ in range(self.processes):
+            self.spawn()
+        self.log(f'Running the jobs with {len(self.workers)} workers (pid {os.getpid()}).')
+        while self.signal is None:
+            time.sleep(TICK)
+            for _ in range(self.reap()):
+                if self.signal is None:
+                    self.spawn()
+        self.log('Stopping.')
+        self.stop()
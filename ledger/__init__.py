@@ -0,0 +1 @@
+"""This module initializes the ledger app."""
@@ -0,0 +1,19 @@
+"""This module defines the configuration for the ledger app."""
+from django.apps import AppConfig
+
+
+class LedgerConfig(AppConfig):
+    """
+    This class defines the configuration for the ledger app.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'ledger'
+
+    def ready(self):
+        """Drop the triggers recording the stock movements during the migrations, and install them after."""
+        from api.db import connect_installs  # pylint: disable=import-outside-toplevel
+        from ledger.movements import install, uninstall  # pylint: disable=import-outside-toplevel
+        connect_installs(self, install, uninstall)
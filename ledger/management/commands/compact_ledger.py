@@ -0,0 +1,21 @@
+"""This module defines the command folding the stock movements into snapshots."""
+from django.core.management.base import BaseCommand
+from api.sharding import shards
+from ledger.movements import compact
+
+
+class Command(BaseCommand):
+    """This class defines the command folding the new stock movements into snapshots, to run periodically."""
+
+    help = 'Fold the stock movements recorded since the last run into snapshots.'
+
+    def add_arguments(self, parser):
+        """Add the database option."""
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A shard to compact, repeated for several ones, every shard by default.')
+
+    def handle(self, *args, **options):
+        """Fold the movements of each shard."""
+        for database in options['databases'] or shards():
+            count = compact(using=database)
+            self.stdout.write(self.style.SUCCESS(f'{database}: {count} snapshots taken.'))
@@ -0,0 +1,83 @@
+# Generated by Django 3.1 on 2026-10-19 11:02
+
+import itertools
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def open_ledger(apps, schema_editor):
+    """Record the current quantity of the existing batches as their first movement."""
+    Batch = apps.get_model('products', 'Batch')
+    StockMovement = apps.get_model('ledger', 'StockMovement')
+    using = schema_editor.connection.alias
+    now = timezone.now()
+    batches = Batch.objects.using(using).exclude(current=0).order_by('pk').values('pk', 'owner', 'product', 'current')
+    movements = (StockMovement(owner_id=batch['owner'], product_id=batch['product'], batch_id=batch['pk'],
+                               reason='create', delta=batch['current'], level=batch['current'], created=now)
+                 for batch in batches.iterator())
+    while True:
+        chunk = list(itertools.islice(movements, 1000))
+        if not chunk:
+            break
+        StockMovement.objects.using(using).bulk_create(chunk)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0004_productforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement', models.BigIntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.FloatField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('reason', models.CharField(max_length=6)),
+                ('delta', models.FloatField()),
+                ('level', models.FloatField()),
+                ('created', models.DateTimeField()),
+                ('batch', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.batch')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['product', 'taken_at'], name='snapshot_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['movement'], name='snapshot_movement_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'id'], name='movement_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['batch', 'id'], name='movement_batch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['owner', 'id'], name='movement_owner_idx'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
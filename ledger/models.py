@@ -0,0 +1,86 @@
+"""This module defines the models of the ledger app.
+
+The ledger outlives the batches and products it describes, so their foreign keys are
+not constrained. The movements are written by triggers while the owner is being deleted,
+so their owner is not constrained either and a trigger on the users removes them.
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from products.models import Product, Batch
+
+
+class StockMovement(models.Model):
+    """
+    This class defines a change of the current quantity of a batch.
+
+    The movements are only inserted, by triggers on the batches, in the transaction of
+    the change.
+
+    Attributes:
+        owner (User): The batch owner.
+        product (Product): The product of the batch.
+        batch (Batch): The moved batch.
+        reason (str): The write recorded: create, update or delete.
+        delta (float): The change of the current quantity.
+        level (float): The current quantity of the batch after the movement.
+        created (DateTime): The date of the movement.
+    """
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    id = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    batch = models.ForeignKey(Batch, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    reason = models.CharField(max_length=6)
+    delta = models.FloatField()
+    level = models.FloatField()
+    created = models.DateTimeField()
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            indexes (list(Index)): The indexes of the history and snapshot queries.
+        """
+
+        indexes = [
+            models.Index(fields=['product', 'id'], name='movement_product_idx'),
+            models.Index(fields=['batch', 'id'], name='movement_batch_idx'),
+            models.Index(fields=['owner', 'id'], name='movement_owner_idx'),
+        ]
+
+
+class StockSnapshot(models.Model):
+    """
+    This class defines the stock of a product folded from the movements up to one of them.
+
+    Attributes:
+        owner (User): The product owner.
+        product (Product): The product.
+        movement (int): The last movement folded in the snapshot.
+        taken_at (DateTime): The date of the last movement folded.
+        quantity (float): The current quantity of the product batches after that movement.
+    """
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    movement = models.BigIntegerField()
+    taken_at = models.DateTimeField()
+    quantity = models.FloatField()
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            indexes (list(Index)): The index finding the last snapshot of a product before a date.
+        """
+
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='snapshot_product_idx'),
+            models.Index(fields=['movement'], name='snapshot_movement_idx'),
+        ]
@@ -0,0 +1,143 @@
+"""This module records the stock movements and folds them into snapshots.
+
+Triggers on the batches append a movement for every change of their current quantity,
+in the transaction of the change, whatever the write path. The compaction folds the
+movements recorded since the last run into one snapshot per moved product, so the
+stock of a date is the last snapshot before it plus the few movements that follow.
+"""
+import datetime
+from typing import List, Tuple
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from api.db import Trigger, install_triggers, plpgsql_trigger, uninstall_triggers
+from ledger.models import StockMovement, StockSnapshot
+from products.models import Product
+
+COMPACTION_LAG = datetime.timedelta(minutes=1)
+
+CHUNK_SIZE = 1000
+
+_NOW = {'sqlite': "strftime('%Y-%m-%d %H:%M:%f', 'now')", 'postgresql': 'now()'}
+
+
+def _record(row: str, reason: str, delta: str, level: str, condition: str = '', vendor: str = 'sqlite') -> str:
+    """Return the statement appending a movement of a batch."""
+    return (f'INSERT INTO ledger_stockmovement(owner_id, product_id, batch_id, reason, delta, level, created) '
+            f"SELECT {row}.owner_id, {row}.product_id, {row}.id, '{reason}', {delta}, {level}, {_NOW[vendor]}"
+            f'{" WHERE " + condition if condition else ""};')
+
+
+TRIGGERS = {
+    'sqlite': [
+        Trigger('ledger_batch_insert', 'products_batch',
+                'CREATE TRIGGER ledger_batch_insert AFTER INSERT ON products_batch WHEN NEW.current != 0 BEGIN '
+                + _record('NEW', StockMovement.CREATE, 'NEW.current', 'NEW.current') + ' END'),
+        Trigger('ledger_batch_update', 'products_batch',
+                'CREATE TRIGGER ledger_batch_update AFTER UPDATE OF current, product_id ON products_batch '
+                'WHEN OLD.current != NEW.current OR OLD.product_id != NEW.product_id BEGIN '
+                + _record('NEW', StockMovement.UPDATE, 'NEW.current - OLD.current', 'NEW.current',
+                          'OLD.product_id = NEW.product_id')
+                + _record('OLD', StockMovement.UPDATE, '-OLD.current', '0', 'OLD.product_id != NEW.product_id')
+                + _record('NEW', StockMovement.UPDATE, 'NEW.current', 'NEW.current', 'OLD.product_id != NEW.product_id')
+                + ' END'),
+        Trigger('ledger_batch_delete', 'products_batch',
+                'CREATE TRIGGER ledger_batch_delete AFTER DELETE ON products_batch WHEN OLD.current != 0 BEGIN '
+                + _record('OLD', StockMovement.DELETE, '-OLD.current', '0') + ' END'),
+        Trigger('ledger_auth_user_delete', 'auth_user',
+                'CREATE TRIGGER ledger_auth_user_delete AFTER DELETE ON auth_user BEGIN '
+                'DELETE FROM ledger_stockmovement WHERE owner_id = OLD.id; END'),
+    ],
+    'postgresql': [
+        plpgsql_trigger('ledger_batch_insert', 'products_batch', 'INSERT',
+                        _record('NEW', StockMovement.CREATE, 'NEW.current', 'NEW.current', vendor='postgresql'),
+                        'NEW.current != 0'),
+        plpgsql_trigger('ledger_batch_update', 'products_batch', 'UPDATE OF current, product_id',
+                        'IF OLD.product_id = NEW.product_id THEN '
+                        + _record('NEW', StockMovement.UPDATE, 'NEW.current - OLD.current', 'NEW.current',
+                                  vendor='postgresql')
+                        + ' ELSE '
+                        + _record('OLD', StockMovement.UPDATE, '-OLD.current', '0', vendor='postgresql')
+                        + _record('NEW', StockMovement.UPDATE, 'NEW.current', 'NEW.current', vendor='postgresql')
+                        + ' END IF;',
+                        'OLD.current != NEW.current OR OLD.product_id != NEW.product_id'),
+        plpgsql_trigger('ledger_batch_delete', 'products_batch', 'DELETE',
+                        _record('OLD', StockMovement.DELETE, '-OLD.current', '0', vendor='postgresql'),
+                        'OLD.current != 0'),
+        plpgsql_trigger('ledger_auth_user_delete', 'auth_user', 'DELETE',
+                        'DELETE FROM ledger_stockmovement WHERE owner_id = OLD.id;'),
+    ],
+}
+
+
+def install(sender, using: str = 'default', **kwargs: dict):
+    """Install the triggers of the ledger on a database, after a migration."""
+    install_triggers(TRIGGERS, using, requires=[StockMovement._meta.db_table])  # pylint: disable=protected-access
+
+
+def uninstall(sender, using: str = 'default', **kwargs: dict):
+    """Drop the triggers of the ledger from a database, before a migration."""
+    uninstall_triggers(TRIGGERS, using)
+
+
+def compact(now: datetime.datetime = None, using: str = 'default') -> int:
+    """
+    Fold the movements recorded since the last compaction into snapshots.
+
+    Only the movements older than the compaction lag are folded, and the fold stops at
+    the first younger one, so a movement committed late with a lower id is never skipped.
+
+    Args:
+        now (DateTime): The date of the compaction, now by default.
+        using (str): The database alias.
+
+    Returns:
+        int: The number of snapshots taken.
+    """
+    cutoff = (now or timezone.now()) - COMPACTION_LAG
+    snapshots = StockSnapshot.objects.using(using)  # pylint: disable=no-member
+    movements = StockMovement.objects.using(using)  # pylint: disable=no-member
+    watermark = snapshots.aggregate(last=Max('movement'))['last'] or 0
+    pending = movements.filter(id__gt=watermark)
+    first_young = pending.filter(created__gte=cutoff).order_by('id').values_list('id', flat=True).first()
+    folds = pending.filter(id__lt=first_young) if first_young else pending
+    folds = list(folds.order_by().values('owner', 'product')
+                 .annotate(delta=Sum('delta'), last=Max('id'), at=Max('created')))
+    taken = 0
+    with transaction.atomic(using=using):
+        for start in range(0, len(folds), CHUNK_SIZE):
+            chunk = folds[start:start + CHUNK_SIZE]
+            products = [fold['product'] for fold in chunk]
+            lasts = (snapshots.filter(product__in=products).order_by().values('product')
+                     .annotate(last=Max('movement')).values_list('last', flat=True))
+            quantities = dict(snapshots.filter(movement__in=list(lasts)).values_list('product', 'quantity'))
+            taken += len(snapshots.bulk_create([
+                StockSnapshot(owner_id=fold['owner'], product_id=fold['product'], movement=fold['last'],
+                              taken_at=fold['at'], quantity=quantities.get(fold['product'], 0.0) + fold['delta'])
+                for fold in chunk]))
+    return taken
+
+
+def stock_as_of(owner: User, moment: datetime.datetime) -> List[Tuple[Product, float]]:
+    """
+    Return the stock of each product of an owner at a date.
+
+    Args:
+        owner (User): The owner of the products.
+        moment (DateTime): The date of the stock, excluded.
+
+    Returns:
+        list(tuple(Product, float)): The products with their stock at the date.
+    """
+    snapshots = (StockSnapshot.objects.filter(product=OuterRef('pk'), taken_at__lt=moment)  # pylint: disable=no-member
+                 .order_by('-taken_at', '-movement'))
+    tail = (StockMovement.objects.filter(product=OuterRef('pk'), id__gt=OuterRef('folded'),  # pylint: disable=no-member
+                                         created__lt=moment)
+            .order_by().values('product').annotate(total=Sum('delta')).values('total'))
+    products = (Product.objects.filter(owner=owner)  # pylint: disable=no-member
+                .annotate(base=Coalesce(Subquery(snapshots.values('quantity')[:1]), Value(0.0)),
+                          folded=Coalesce(Subquery(snapshots.values('movement')[:1]), Value(0)))
+                .annotate(stock=F('base') + Coalesce(Subquery(tail), Value(0.0))))
+    return [(product, product.stock) for product in products]
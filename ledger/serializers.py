@@ -0,0 +1,43 @@
+"""This module defines the serializers for the ledger app."""
+from rest_framework import serializers
+from ledger.models import StockMovement
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    """This class defines the serializer for the movements view."""
+
+    class Meta:
+        """
+         This class defines the validation metadata for the movements view.
+
+        Attributes:
+            model (Model): The model linked to the serializer.
+            fields (list(str)): The field list expencted by the serializer.
+        """
+
+        model = StockMovement
+        fields = ['id', 'product', 'batch', 'reason', 'delta', 'level', 'created']
+
+
+class MovementFilterSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer validating the filters of the movements view.
+
+    Attributes:
+        product (int): The product of the movements.
+        batch (int): The batch of the movements.
+    """
+
+    product = serializers.IntegerField(required=False)
+    batch = serializers.IntegerField(required=False)
+
+
+class StockDateSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer validating the date of the stock view.
+
+    Attributes:
+        date (Date): The day whose closing stock is requested, today by default.
+    """
+
+    date = serializers.DateField(required=False)
@@ -0,0 +1,112 @@
+"""This module manages the tests for the ledger app."""
+import datetime
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from api.testing import connect
+from categories.models import Category
+from ledger.models import StockMovement, StockSnapshot
+from ledger.movements import COMPACTION_LAG, compact, stock_as_of
+from products.models import Batch, Product
+from providers.models import Provider
+
+
+class LedgerTests(TestCase):
+    """This class tests the movements recorded on the batches, their compaction and the stock at a date."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create an owner with two products, and a batch of the first one."""
+        self.owner = User.objects.create(username='keeper')
+        category = Category.objects.create(owner=self.owner, label='Dairy')  # pylint: disable=no-member
+        self.provider = Provider.objects.create(owner=self.owner, label='Shop', address='1 rue', city='Lyon',  # pylint: disable=no-member
+                                                zipcode='69000', phone='0400000000')
+        self.products = [Product.objects.create(owner=self.owner, label=label, unit='L', category=category)  # pylint: disable=no-member
+                         for label in ('Milk', 'Cream')]
+        self.batch = self.create(self.products[0], 5)
+
+    def create(self, product: Product, quantity: float) -> Batch:
+        """Create a batch of a product."""
+        return Batch.objects.create(owner=self.owner, product=product, provider=self.provider, initial=quantity,  # pylint: disable=no-member
+                                    current=quantity, purchase=datetime.date(2026, 1, 1), limit=datetime.date(2026, 2, 1))
+
+    def stock(self, moment: datetime.datetime = None) -> dict:
+        """Return the stock of the products by label at a date, later than the movements by default."""
+        moment = moment or timezone.now() + datetime.timedelta(days=1)
+        return {product.label: stock for product, stock in stock_as_of(self.owner, moment)}
+
+    @staticmethod
+    def age(delta: datetime.timedelta):
+        """Move the date of every movement back in time."""
+        for movement in StockMovement.objects.all():  # pylint: disable=no-member
+            StockMovement.objects.filter(pk=movement.pk).update(created=movement.created - delta)  # pylint: disable=no-member
+
+    def test_every_write_path_is_recorded(self):
+        """The inserts, updates, product moves and deletes of the batches append their movements."""
+        Batch.objects.filter(pk=self.batch.pk).update(current=3)  # pylint: disable=no-member
+        Batch.objects.filter(pk=self.batch.pk).update(product=self.products[1])  # pylint: disable=no-member
+        Batch.objects.filter(pk=self.batch.pk).update(price=2)  # pylint: disable=no-member
+        Batch.objects.filter(pk=self.batch.pk).delete()  # pylint: disable=no-member
+        movements = StockMovement.objects.order_by('id').values_list('reason', 'product', 'delta', 'level')  # pylint: disable=no-member
+        milk, cream = (product.pk for product in self.products)
+        self.assertEqual(list(movements), [
+            (StockMovement.CREATE, milk, 5.0, 5.0), (StockMovement.UPDATE, milk, -2.0, 3.0),
+            (StockMovement.UPDATE, milk, -3.0, 0.0), (StockMovement.UPDATE, cream, 3.0, 3.0),
+            (StockMovement.DELETE, cream, -3.0, 0.0),
+        ])
+
+    def test_compaction_keeps_the_stock(self):
+        """Folding the movements into snapshots gives the same stock, before and after later movements."""
+        self.create(self.products[1], 2)
+        self.age(datetime.timedelta(days=2))
+        before = self.stock()
+        self.assertEqual(before, {'Milk': 5.0, 'Cream': 2.0})
+        self.assertEqual(compact(), 2)
+        self.assertEqual(self.stock(), before)
+        Batch.objects.filter(pk=self.batch.pk).update(current=1)  # pylint: disable=no-member
+        self.assertEqual(self.stock(), {'Milk': 1.0, 'Cream': 2.0})
+        self.assertEqual(self.stock(timezone.now() - datetime.timedelta(days=1)), before)
+        self.assertEqual(compact(), 0)
+
+    def test_compaction_stops_at_the_young_movements(self):
+        """The movements younger than the lag, and the ones after them, are left for the next run."""
+        self.age(datetime.timedelta(days=2))
+        Batch.objects.filter(pk=self.batch.pk).update(current=4)  # pylint: disable=no-member
+        self.assertEqual(compact(), 1)
+        self.assertEqual(StockSnapshot.objects.get().quantity, 5.0)  # pylint: disable=no-member
+        self.assertEqual(compact(timezone.now() + COMPACTION_LAG * 2), 1)
+        self.assertEqual(StockSnapshot.objects.order_by('movement').last().quantity, 4.0)  # pylint: disable=no-member
+        self.assertEqual(self.stock(), {'Milk': 4.0, 'Cream': 0.0})
+
+    def test_owner_delete_removes_the_ledger(self):
+        """Deleting an owner with batches deletes its movements and snapshots."""
+        self.age(datetime.timedelta(days=2))
+        compact()
+        self.owner.delete()
+        self.assertFalse(StockMovement.objects.exists())  # pylint: disable=no-member
+        self.assertFalse(StockSnapshot.objects.exists())  # pylint: disable=no-member
+
+
+class LedgerViewsTests(TestCase):
+    """This class tests the views of the movements and of the stock at a date."""
+
+    databases = '__all__'
+
+    def test_views_are_scoped_to_the_owner(self):
+        """The movements and the stock of the connected user are listed, latest movement first."""
+        client = connect('viewer')
+        category = client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        provider = client.post('/providers/', {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon', 'zipcode': '69000',
+                                               'phone': '0400000000'}, format='json').json()['id']
+        product = client.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': category}, format='json').json()['id']
+        batch = client.post(f'/products/{product}/batches/', {'provider': provider, 'initial': 3, 'current': 3,
+                                                              'purchase': '2026-01-01', 'limit': '2026-02-01'},
+                            format='json').json()['id']
+        client.put(f'/products/{product}/batches/{batch}', {'provider': provider, 'initial': 3, 'current': 1,
+                                                            'purchase': '2026-01-01', 'limit': '2026-02-01'},
+                   format='json')
+        movements = client.get('/ledger/movements/', {'batch': batch}).json()['results']
+        self.assertEqual([movement['delta'] for movement in movements], [-2.0, 3.0])
+        self.assertEqual(client.get('/ledger/stock/').json(), [{'product': {'id': product, 'label': 'Milk'}, 'stock': 1.0}])
+        self.assertEqual(connect('other').get('/ledger/movements/').json()['results'], [])
@@ -0,0 +1,8 @@
+"""This module defines the routes for the ledger resources."""
+from django.urls import path
+from ledger.views import MovementView, StockView
+
+urlpatterns = [
+    path('movements/', MovementView.as_view()),
+    path('stock/', StockView.as_view())
+]
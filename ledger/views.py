@@ -0,0 +1,84 @@
+"""This module manages the views of the ledger app."""
+import datetime
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api.pagination import OrderedCursorPagination
+from ledger.models import StockMovement
+from ledger.movements import stock_as_of
+from ledger.serializers import StockMovementSerializer, MovementFilterSerializer, StockDateSerializer
+
+
+class MovementView(generics.ListAPIView):
+    """
+    This class manages the view to list the stock movements, latest first.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+        serializer_class (Serializer): The serializer to bind the request and the response object.
+        pagination_class (Pagination): The cursor pagination of the list.
+
+    Returns:
+            200: The page of movements.
+            400: An error is detected on the request parameters.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = StockMovementSerializer
+    pagination_class = OrderedCursorPagination
+
+    def get_ordering(self) -> str:
+        """Return the ordering of the list, used by the pagination."""
+        return '-id'
+
+    def get_queryset(self):
+        """Return the movements of the owner matching the filters of the request."""
+        serializer = MovementFilterSerializer(data=self.request.query_params)
+        if not serializer.is_valid():
+            raise ValidationError(serializer.errors)
+        movements = StockMovement.objects.filter(owner=self.request.user)  # pylint: disable=no-member
+        if 'product' in serializer.validated_data:
+            movements = movements.filter(product=serializer.validated_data['product'])
+        if 'batch' in serializer.validated_data:
+            movements = movements.filter(batch=serializer.validated_data['batch'])
+        return movements
+
+
+class StockView(APIView):
+    """
+    This class manages the view of the stock of the products at a date.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request: Request, format=None) -> Response:
+        """
+        Retrieve the stock of each product at the end of a day.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The stock of each product.
+            400: An error is detected on the request parameters.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+        """
+        serializer = StockDateSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        day = serializer.validated_data.get('date', timezone.localdate())
+        moment = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+        return Response([{'product': {'id': product.pk, 'label': product.label}, 'stock': stock}
+                         for product, stock in stock_as_of(request.user, moment)])
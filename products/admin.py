@@ -1,6 +1,26 @@
 """This module manages the admin section for the products app."""
 from django.contrib import admin
+from api.admin import InStockFilter, OwnedModelAdmin
+from search.index import PRODUCT
 from .models import Product, Batch
 
-admin.site.register(Product)
-admin.site.register(Batch)
+
+@admin.register(Product)
+class ProductAdmin(OwnedModelAdmin):
+    """This class defines the admin of the products, searched by label through the search index."""
+
+    list_display = ('id', 'label', 'unit', 'category', 'barcode', 'owner')
+    list_select_related = ('owner', 'category')
+    autocomplete_fields = ('category',)
+    indexed_search = ('pk', PRODUCT)
+
+
+@admin.register(Batch)
+class BatchAdmin(OwnedModelAdmin):
+    """This class defines the admin of the batches, searched by the label of their product."""
+
+    list_display = ('id', 'product', 'provider', 'current', 'limit', 'owner')
+    list_select_related = ('owner', 'product', 'provider')
+    list_filter = (InStockFilter, 'limit')
+    autocomplete_fields = ('product', 'provider')
+    indexed_search = ('product', PRODUCT)
@@ -0,0 +1,64 @@
+"""This module moves the consumed batches out of the batches, into the archive.
+
+The consumed batches are never listed again, but they would stay in the batches table,
+which every product list, prefetch and cascade reads. The ones bought before the
+archival age are moved to the archive table by chunks, each in its own transaction of
+the shard: the chunk is locked, copied and deleted, so a batch refilled meanwhile is
+left in place.
+
+The writes to the batches table are seen by its triggers as deletes: the clients are
+told by their change stream that the batches left, and the ledger records nothing for
+a consumed batch. The rollup triggers of the archive add the spend of the archived
+batches back, so the analytics read them as before.
+"""
+import datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from products.models import ArchivedBatch, Batch
+
+CHUNK = 1000
+
+FIELDS = ['id', 'owner_id', 'product_id', 'provider_id', 'initial', 'current', 'price', 'purchase', 'limit', 'version']
+
+
+def move(batches: QuerySet) -> int:
+    """
+    Move batches to the archive, in the current transaction.
+
+    Args:
+        batches (QuerySet): The batches to archive, locked until the end of the transaction.
+
+    Returns:
+        int: The number of batches archived.
+    """
+    rows = list(batches.select_for_update().values(*FIELDS))
+    ArchivedBatch.objects.using(batches.db).bulk_create(  # pylint: disable=no-member
+        [ArchivedBatch(**row) for row in rows], batch_size=500)
+    deleted = Batch.objects.using(batches.db).filter(pk__in=[row['id'] for row in rows])  # pylint: disable=no-member
+    return deleted._raw_delete(batches.db)  # pylint: disable=protected-access
+
+
+def archive(before: datetime.date = None, using: str = 'default', chunk: int = CHUNK) -> int:
+    """
+    Archive the consumed batches bought before a date.
+
+    Args:
+        before (Date): The first purchase date kept, today minus the archival age by default.
+        using (str): The database alias.
+        chunk (int): The number of batches archived by transaction.
+
+    Returns:
+        int: The number of batches archived.
+    """
+    before = before or timezone.localdate() - datetime.timedelta(days=settings.BATCH_ARCHIVE_DAYS)
+    consumed = Batch.objects.using(using).filter(current__lte=0, purchase__lt=before).order_by('pk')  # pylint: disable=no-member
+    archived, last = 0, 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(consumed.filter(pk__gt=last).values_list('pk', flat=True)[:chunk])
+            if not ids:
+                return archived
+            last = ids[-1]
+            archived += move(consumed.filter(pk__in=ids))
@@ -0,0 +1,7 @@
+"""This module defines the routes for the batches resources across products."""
+from django.urls import path
+from products.views import BatchListView
+
+urlpatterns = [
+    path('', BatchListView.as_view())
+]
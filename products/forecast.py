@@ -0,0 +1,146 @@
+"""This module forecasts the consumption of the products from their batch history.
+
+The batches, with the archived ones of the history window, are pulled as columns and
+every product of a group of owners is computed in one NumPy pass: the consumed
+quantity of the batches bought in the history window, over the days since the first
+of them, gives a daily rate, and the usable stock over that rate gives the run-out
+date. NumPy is only imported by the first forecast, not to slow down the start of the
+processes that never compute one.
+"""
+import datetime
+from typing import Iterable, List
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.db.models import CharField, F, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+from authentication.models import OwnerVersion
+from products.models import ArchivedBatch, Batch, ProductForecast
+
+HISTORY_DAYS = 365
+
+OWNERS_PER_PASS = 500
+
+
+def compute(owner_ids: Iterable[int], today: datetime.date, using: str = 'default') -> List[ProductForecast]:
+    """
+    Compute the forecasts of every product of some owners.
+
+    Args:
+        owner_ids (Iterable(int)): The owners to forecast.
+        today (Date): The first day of the forecast.
+        using (str): The database alias.
+
+    Returns:
+        list(ProductForecast): The unsaved forecasts of the products with a history or a stock.
+    """
+    import numpy  # pylint: disable=import-outside-toplevel
+    owner_ids = list(owner_ids)
+    versions = dict(OwnerVersion.objects.using(using).filter(owner__in=owner_ids)  # pylint: disable=no-member
+                    .values_list('owner', 'version'))
+    start = today - datetime.timedelta(days=HISTORY_DAYS)
+    columns = {'purchase_day': Cast('purchase', CharField()), 'limit_day': Cast('limit', CharField())}
+    fields = ('owner', 'product', 'initial', 'current', 'purchase_day', 'limit_day')
+    archived = (ArchivedBatch.objects.using(using).filter(owner__in=owner_ids, purchase__gte=start)  # pylint: disable=no-member
+                .order_by().annotate(**columns).values_list(*fields))
+    rows = (Batch.objects.using(using).filter(owner__in=owner_ids)  # pylint: disable=no-member
+            .filter(Q(purchase__gte=start) | Q(current__gt=0)).order_by()
+            .annotate(**columns).values_list(*fields)
+            .union(archived, all=True))
+    sql, params = rows.query.sql_with_params()
+    with connections[using].cursor() as cursor:
+        # The raw rows skip the per-value converters, and the dates are read as ISO strings
+        # that NumPy parses a whole column at a time.
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return []
+    owners, products, initial, current, purchase, limit = zip(*rows)
+    owners, products = numpy.array(owners, dtype=numpy.int64), numpy.array(products, dtype=numpy.int64)
+    initial, current = numpy.array(initial, dtype=numpy.float64), numpy.array(current, dtype=numpy.float64)
+    purchase = numpy.array(purchase, dtype='datetime64[D]').astype(numpy.int64)
+    limit = numpy.array(limit, dtype='datetime64[D]').astype(numpy.int64)
+    day = numpy.datetime64(today, 'D').astype(numpy.int64)
+
+    product_ids, index = numpy.unique(products, return_inverse=True)
+    in_history = purchase >= day - HISTORY_DAYS
+    consumed = numpy.bincount(index, weights=numpy.where(in_history, numpy.clip(initial - current, 0, None), 0),
+                              minlength=len(product_ids))
+    first = numpy.full(len(product_ids), day)
+    numpy.minimum.at(first, index[in_history], purchase[in_history])
+    rate = consumed / (day - first + 1)
+    stock = numpy.bincount(index, weights=numpy.where(limit >= day, current, 0), minlength=len(product_ids))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        days_left = numpy.where(rate > 0, numpy.floor(stock / rate), -1).astype(numpy.int64)
+    product_owners = numpy.empty(len(product_ids), dtype=owners.dtype)
+    product_owners[index] = owners
+
+    return [ProductForecast(owner_id=int(owner), product_id=int(product), version=versions.get(int(owner), 0),
+                            stock=float(quantity), rate=float(speed),
+                            runs_out=today + datetime.timedelta(days=int(left)) if left >= 0 else None)
+            for owner, product, quantity, speed, left in zip(product_owners, product_ids, stock, rate, days_left)]
+
+
+def refresh(owner_ids: Iterable[int], today: datetime.date = None, using: str = 'default') -> int:
+    """
+    Compute and store again the forecasts of some owners.
+
+    Args:
+        owner_ids (Iterable(int)): The owners to forecast.
+        today (Date): The first day of the forecast, today by default.
+        using (str): The database alias.
+
+    Returns:
+        int: The number of forecasts stored.
+    """
+    owner_ids = list(owner_ids)
+    # The versions are read before the batches, so a write in between makes the forecasts
+    # computed again rather than kept for a version they miss.
+    versions = dict(OwnerVersion.objects.using(using).filter(owner__in=owner_ids)  # pylint: disable=no-member
+                    .values_list('owner', 'version'))
+    forecasts = compute(owner_ids, today or timezone.localdate(), using)
+    with transaction.atomic(using=using):
+        ProductForecast.objects.using(using).filter(owner__in=owner_ids).delete()  # pylint: disable=no-member
+        ProductForecast.objects.using(using).bulk_create(forecasts, batch_size=1000)  # pylint: disable=no-member
+        OwnerVersion.objects.using(using).bulk_create(  # pylint: disable=no-member
+            [OwnerVersion(owner_id=owner_id) for owner_id in owner_ids if owner_id not in versions],
+            ignore_conflicts=True)
+        OwnerVersion.objects.using(using).bulk_update(  # pylint: disable=no-member
+            [OwnerVersion(owner_id=owner_id, forecast=versions.get(owner_id, 0)) for owner_id in owner_ids],
+            ['forecast'], batch_size=500)
+    return len(forecasts)
+
+
+def refresh_all(today: datetime.date = None, using: str = 'default') -> int:
+    """
+    Compute and store again the forecasts of every owner, by groups of owners.
+
+    Args:
+        today (Date): The first day of the forecast, today by default.
+        using (str): The database alias.
+
+    Returns:
+        int: The number of forecasts stored.
+    """
+    owner_ids = list(User.objects.using(using).order_by('pk').values_list('pk', flat=True))
+    return sum(refresh(owner_ids[start:start + OWNERS_PER_PASS], today, using)
+               for start in range(0, len(owner_ids), OWNERS_PER_PASS))
+
+
+def current_forecasts(owner: User) -> List[ProductForecast]:
+    """
+    Return the forecasts of an owner, computed again if the owner data changed since.
+
+    Args:
+        owner (User): The owner of the products.
+
+    Returns:
+        list(ProductForecast): The forecasts with their product, soonest run-out first.
+    """
+    using = router.db_for_write(ProductForecast)
+    version, forecast = OwnerVersion.objects.using(using).filter(owner=owner).values_list(  # pylint: disable=no-member
+        'version', 'forecast').first() or (0, None)
+    if forecast != version:
+        refresh([owner.pk], using=using)
+    return list(ProductForecast.objects.filter(owner=owner)  # pylint: disable=no-member
+                .select_related('product').order_by(F('runs_out').asc(nulls_last=True), 'product__label'))
@@ -0,0 +1,37 @@
+"""This module defines the command archiving the consumed batches."""
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.sharding import shards
+from products.archive import CHUNK, archive
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command archiving the consumed batches.
+
+    It is scheduled once a day: the batches consumed and bought before the archival age
+    are moved from the batches of each shard to its archive. Running it again the same
+    day only archives the batches consumed meanwhile.
+    """
+
+    help = 'Move the consumed batches bought before the archival age to the archive.'
+
+    def add_arguments(self, parser):
+        """Add the age, the database and the chunk options."""
+        parser.add_argument('--days', type=int, default=settings.BATCH_ARCHIVE_DAYS,
+                            help='The age of the purchase after which a consumed batch is archived.')
+        parser.add_argument('--before', type=datetime.date.fromisoformat,
+                            help='The first purchase date kept, today minus the age by default.')
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A shard to archive, repeated for several ones, every shard by default.')
+        parser.add_argument('--chunk', type=int, default=CHUNK,
+                            help='The number of batches archived by transaction.')
+
+    def handle(self, *args, **options):
+        """Archive the consumed batches of each shard."""
+        before = options['before'] or timezone.localdate() - datetime.timedelta(days=options['days'])
+        for database in options['databases'] or shards():
+            archived = archive(before, database, options['chunk'])
+            self.stdout.write(f'{database}: {archived} batches archived before {before.isoformat()}.')
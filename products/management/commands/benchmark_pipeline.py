@@ -0,0 +1,75 @@
+"""This module defines the command measuring the cost of the middleware chains of the api."""
+import statistics
+import time
+from io import BytesIO
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+from api.handlers import LeanWSGIHandler
+from api.sharding import assign
+
+PREFIX = 'benchmark-pipeline-'
+
+REQUESTS_PER_USER = 200
+
+
+class Command(BaseCommand):
+    """
+    This class defines the command measuring the cost of the middleware chains of the api.
+
+    The same token authenticated requests are sent in process, without network, in turn
+    to a WSGI handler with the full `MIDDLEWARE` chain and to one with `API_MIDDLEWARE`,
+    by temporary users deleted at the end, each staying under its throttle rate.
+    """
+
+    help = 'Measure the time of the api requests through the full and the lean middleware chains.'
+
+    def add_arguments(self, parser):
+        """Add the size options of the benchmark."""
+        parser.add_argument('--requests', type=int, default=2000, help='The number of requests per path and chain.')
+        parser.add_argument('--paths', default='/categories/,/products/,/missing',
+                            help='The paths requested, separated by commas.')
+
+    def handle(self, *args, **options):
+        """Create the users, send the requests through both chains and delete the users."""
+        requests = options['requests']
+        User.objects.bulk_create(
+            User(username=f'{PREFIX}{index}') for index in range(requests * 2 // REQUESTS_PER_USER + 1))
+        users = list(User.objects.filter(username__startswith=PREFIX))
+        for user in users:
+            assign(user)
+        keys = [Token.objects.create(user=user).key for user in users]  # pylint: disable=no-member
+        try:
+            chains = [WSGIHandler(), LeanWSGIHandler()]
+            for path in options['paths'].split(','):
+                (full, statuses), (lean, _) = self.run(chains, path, keys, requests)
+                self.stdout.write(
+                    f'{path:<16} status {statuses}: full {full * 1e6:7.1f} µs, lean {lean * 1e6:7.1f} µs, '
+                    f'saved {(full - lean) * 1e6:6.1f} µs ({(full - lean) / full:.0%})')
+        finally:
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    @staticmethod
+    def run(handlers: list, path: str, keys: list, requests: int) -> list:
+        """Send the requests of a path to each handler in turn, and return their median duration and statuses."""
+        host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'localhost')
+        durations = [[] for _ in handlers]
+        statuses = [set() for _ in handlers]
+        for index in range(requests * len(handlers)):
+            turn = index % len(handlers)
+
+            def start_response(status: str, headers: list, turn: int = turn):
+                statuses[turn].add(int(status[:3]))
+
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+                       'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'REMOTE_ADDR': '127.0.0.1',
+                       'HTTP_AUTHORIZATION': f'Token {keys[index // len(handlers) % len(keys)]}',
+                       'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'SERVER_PROTOCOL': 'HTTP/1.1'}
+            start = time.perf_counter()
+            response = handlers[turn](environ, start_response)
+            b''.join(response)
+            response.close()
+            durations[turn].append(time.perf_counter() - start)
+        return [(statistics.median(times), sorted(codes)) for times, codes in zip(durations, statuses)]
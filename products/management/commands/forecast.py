@@ -0,0 +1,21 @@
+"""This module defines the command computing the consumption forecasts."""
+from django.core.management.base import BaseCommand
+from api.sharding import shards
+from products.forecast import refresh_all
+
+
+class Command(BaseCommand):
+    """This class defines the command computing the forecasts of every owner, to run nightly."""
+
+    help = 'Compute the consumption forecasts of the products of every owner.'
+
+    def add_arguments(self, parser):
+        """Add the database option."""
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A shard to forecast, repeated for several ones, every shard by default.')
+
+    def handle(self, *args, **options):
+        """Compute the forecasts of each shard."""
+        for database in options['databases'] or shards():
+            count = refresh_all(using=database)
+            self.stdout.write(self.style.SUCCESS(f'{database}: {count} forecasts computed.'))
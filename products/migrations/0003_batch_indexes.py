@@ -0,0 +1,33 @@
+# Generated by Django 3.1 on 2026-10-19 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_auto_20200808_2111'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['owner', 'limit'], name='batch_owner_limit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['owner', 'purchase'], name='batch_owner_purchase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(current__gt=0), fields=['owner', 'limit'], name='batch_stock_limit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['provider', 'purchase'], name='batch_provider_purchase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['product', 'limit'], name='batch_product_limit_idx'),
+        ),
+    ]
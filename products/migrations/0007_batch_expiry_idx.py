@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_barcode'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(current__gt=0), fields=['limit', 'owner'], name='batch_expiry_idx'),
+        ),
+    ]
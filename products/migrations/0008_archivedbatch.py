@@ -0,0 +1,37 @@
+# Generated by Django 3.1 on 2026-10-19 12:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('providers', '0001_initial'),
+        ('products', '0007_batch_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBatch',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('initial', models.FloatField()),
+                ('current', models.FloatField()),
+                ('price', models.FloatField()),
+                ('purchase', models.DateField()),
+                ('limit', models.DateField()),
+                ('version', models.PositiveIntegerField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_batches', to='products.product')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='providers.provider')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedbatch',
+            index=models.Index(fields=['owner', 'purchase'], name='archived_owner_purchase_idx'),
+        ),
+    ]
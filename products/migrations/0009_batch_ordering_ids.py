@@ -0,0 +1,37 @@
+# Generated by Django 3.1 on 2026-10-19 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_archivedbatch'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='batch',
+            name='batch_owner_limit_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='batch',
+            name='batch_owner_purchase_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='batch',
+            name='batch_stock_limit_idx',
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['owner', 'limit', 'id'], name='batch_owner_limit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['owner', 'purchase', 'id'], name='batch_owner_purchase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(current__gt=0), fields=['owner', 'limit', 'id'], name='batch_stock_limit_idx'),
+        ),
+    ]
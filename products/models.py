@@ -15,6 +15,8 @@ class Product(models.Model):
         label (str):  The product label.
         unit (str): The product unit.
         icon (str): The product icon.
+        barcode (str): The code scanned on the product packaging, unique for the owner.
+        version (int): The revision of the product, sent as its ETag.
     """
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -22,6 +24,8 @@ class Product(models.Model):
     label = models.CharField(max_length=50)
     unit = models.CharField(max_length=10)
     icon = models.TextField(null=True)
+    barcode = models.CharField(max_length=48, null=True)
+    version = models.PositiveIntegerField(default=1)
     
     def __str__(self):
         """Return the value when the model is called directly."""
@@ -33,9 +37,13 @@ class Product(models.Model):
 
         Attributes:
             ordering (list(str)): The list to sort a list of models.
+            constraints (list(Constraint)): The unique barcode of an owner, whose index serves the scans.
         """
 
         ordering = ['label']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'barcode'], name='product_owner_barcode'),
+        ]
 
 
 """This module defines the models of the products app."""
@@ -57,6 +65,7 @@ class Batch(models.Model):
         price (float): The Batch unit price.
         purchase (Date): The date of purchase.
         limit (Date): The DLUO.
+        version (int): The revision of the batch, sent as its ETag.
     """
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -67,6 +76,7 @@ class Batch(models.Model):
     price = models.FloatField(default=0.0)
     purchase = models.DateField()
     limit = models.DateField()
+    version = models.PositiveIntegerField(default=1)
     
     def __str__(self):
         """Return the value when the model is called directly."""
@@ -78,6 +88,92 @@ class Batch(models.Model):
 
         Attributes:
             ordering (list(str)): The list to sort a list of models.
+            indexes (list(Index)): The indexes backing the batch filters and orderings.
         """
 
         ordering = ['limit', 'current']
+        indexes = [
+            models.Index(fields=['owner', 'limit', 'id'], name='batch_owner_limit_idx'),
+            models.Index(fields=['owner', 'purchase', 'id'], name='batch_owner_purchase_idx'),
+            models.Index(fields=['owner', 'limit', 'id'], condition=models.Q(current__gt=0), name='batch_stock_limit_idx'),
+            models.Index(fields=['limit', 'owner'], condition=models.Q(current__gt=0), name='batch_expiry_idx'),
+            models.Index(fields=['provider', 'purchase'], name='batch_provider_purchase_idx'),
+            models.Index(fields=['product', 'limit'], name='batch_product_limit_idx'),
+        ]
+
+
+class ArchivedBatch(models.Model):
+    """
+    This class defines a consumed batch moved out of the batches, see `products.archive`.
+
+    An archived batch keeps the identifier it had as a batch, which the batches never
+    take again, so the stock movements still reference it. The archive is read by the
+    analytics and the forecasts only, the product and batch lists reading the batches
+    in stock.
+
+    Attributes:
+        id (int): The identifier of the batch.
+        owner (User): The batch owner.
+        product (Product): the linked product.
+        provider (Provider): The linked provider.
+        initial (float):  The initial quantity.
+        current (float): The current quantity, consumed.
+        price (float): The Batch unit price.
+        purchase (Date): The date of purchase.
+        limit (Date): The DLUO.
+        version (int): The last revision of the batch.
+        archived (DateTime): The date the batch was archived.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    product = models.ForeignKey(Product, related_name='archived_batches', on_delete=models.CASCADE)
+    provider = models.ForeignKey(Provider, on_delete=models.CASCADE, related_name='+')
+    initial = models.FloatField()
+    current = models.FloatField()
+    price = models.FloatField()
+    purchase = models.DateField()
+    limit = models.DateField()
+    version = models.PositiveIntegerField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """Return the value when the model is called directly."""
+        return str(self.current)
+
+    class Meta:
+        """
+        This class defines metadata for the model.
+
+        Attributes:
+            indexes (list(Index)): The index of the history reads of an owner.
+        """
+
+        indexes = [
+            models.Index(fields=['owner', 'purchase'], name='archived_owner_purchase_idx'),
+        ]
+
+
+class ProductForecast(models.Model):
+    """
+    This class defines the consumption forecast of a product.
+
+    The forecasts of an owner are computed together and stay valid while the owner
+    version they were computed for is current. They are derived data, so the product
+    is not constrained and the rows of deleted products are dropped on the next run.
+
+    Attributes:
+        owner (User): The product owner.
+        product (Product): The forecasted product.
+        version (int): The owner version the forecast was computed for.
+        stock (float): The current quantity of the batches before their DLUO.
+        rate (float): The consumed quantity per day.
+        runs_out (Date): The estimated date of the end of the stock.
+    """
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.OneToOneField(Product, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False)
+    version = models.BigIntegerField()
+    stock = models.FloatField()
+    rate = models.FloatField()
+    runs_out = models.DateField(null=True)
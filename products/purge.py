@@ -0,0 +1,91 @@
+"""This module deletes the resources of an owner with their dependents in set-based statements.
+
+The Django collector loads every dependent row in memory before deleting it. The
+cascades of the foodstock models are known and shallow, so they are issued here as a
+few `DELETE ... WHERE ... IN (SELECT ...)` statements in one transaction, which keeps
+the visible semantics of `on_delete=CASCADE` at the cost of a handful of queries.
+The purges return the identifiers they deleted, so that a bulk delete reports the
+others, and are also jobs, queued by the bulk delete views when the client prefers an
+asynchronous response.
+"""
+from typing import Iterable, List
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models import QuerySet
+from categories.models import Category
+from jobs.queue import job
+from providers.models import Provider
+from products.models import ArchivedBatch, Product, Batch
+
+
+def _delete(queryset: QuerySet) -> int:
+    """Delete the rows of a queryset in a single statement, without collecting them."""
+    return queryset._raw_delete(queryset.db)  # pylint: disable=protected-access
+
+
+def _delete_listed(queryset: QuerySet) -> List[int]:
+    """Delete the rows of a queryset, in the transaction which selected them, and return their identifiers."""
+    ids = list(queryset.values_list('pk', flat=True))
+    if ids:
+        _delete(queryset.model.objects.filter(pk__in=ids))
+    return ids
+
+
+def _purge_products(products: QuerySet) -> List[int]:
+    """Delete the products of a queryset and their batches, archived or not."""
+    _delete(Batch.objects.filter(product__in=products.values('pk')))  # pylint: disable=no-member
+    _delete(ArchivedBatch.objects.filter(product__in=products.values('pk')))  # pylint: disable=no-member
+    return _delete_listed(products)
+
+
+@job
+def purge_products(owner: User, ids: Iterable[int]) -> List[int]:
+    """
+    Delete products of an owner with their batches.
+
+    Args:
+        owner (User): The owner of the products.
+        ids (Iterable(int)): The product identifiers.
+
+    Returns:
+        list(int): The identifiers of the products deleted.
+    """
+    with transaction.atomic(using=router.db_for_write(Product)):
+        return _purge_products(Product.objects.filter(owner=owner, pk__in=ids))  # pylint: disable=no-member
+
+
+@job
+def purge_categories(owner: User, ids: Iterable[int]) -> List[int]:
+    """
+    Delete categories of an owner with their products and batches.
+
+    Args:
+        owner (User): The owner of the categories.
+        ids (Iterable(int)): The category identifiers.
+
+    Returns:
+        list(int): The identifiers of the categories deleted.
+    """
+    categories = Category.objects.filter(owner=owner, pk__in=ids)  # pylint: disable=no-member
+    with transaction.atomic(using=router.db_for_write(Category)):
+        _purge_products(Product.objects.filter(category__in=categories.values('pk')))  # pylint: disable=no-member
+        return _delete_listed(categories)
+
+
+@job
+def purge_providers(owner: User, ids: Iterable[int]) -> List[int]:
+    """
+    Delete providers of an owner with their batches.
+
+    Args:
+        owner (User): The owner of the providers.
+        ids (Iterable(int)): The provider identifiers.
+
+    Returns:
+        list(int): The identifiers of the providers deleted.
+    """
+    providers = Provider.objects.filter(owner=owner, pk__in=ids)  # pylint: disable=no-member
+    with transaction.atomic(using=router.db_for_write(Provider)):
+        _delete(Batch.objects.filter(provider__in=providers.values('pk')))  # pylint: disable=no-member
+        _delete(ArchivedBatch.objects.filter(provider__in=providers.values('pk')))  # pylint: disable=no-member
+        return _delete_listed(providers)
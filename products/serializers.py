@@ -1,16 +1,15 @@
 """This module defines the serializers for the products app."""
 from rest_framework import serializers
+from api.serializers import LabelField
+from categories.models import Category
 from products.models import Product, Batch
+from providers.models import Provider
 
 
 class BatchSerializer(serializers.ModelSerializer):
     """This class defines the serializer for the batches view."""
 
-    def to_representation(self, obj):
-        """Format the representation to send result."""
-        representation = super(BatchSerializer, self).to_representation(obj)
-        representation['provider'] = obj.provider.label
-        return representation
+    provider = LabelField(Provider)
 
     class Meta:
         """
@@ -19,21 +18,75 @@ class BatchSerializer(serializers.ModelSerializer):
         Attributes:
             model (Model): The model linked to the serializer.
             fields (list(str)): The field list expencted by the serializer.
+            read_only_fields (list(str)): The fields managed by the server.
         """
 
         model = Batch
-        fields = ['id', 'initial', 'current', 'price', 'purchase', 'limit', 'provider']
+        fields = ['id', 'initial', 'current', 'price', 'purchase', 'limit', 'provider', 'version']
+        read_only_fields = ['version']
 
 
-class ProductUpdateSerializer(serializers.ModelSerializer):
-    """This class defines the serializer for the products view."""
+class BatchListSerializer(BatchSerializer):
+    """This class defines the serializer for the batches list view across products."""
 
     def to_representation(self, obj):
         """Format the representation to send result."""
-        representation = super(ProductUpdateSerializer, self).to_representation(obj)
-        representation['category'] = obj.category.label
+        representation = super(BatchListSerializer, self).to_representation(obj)
+        representation['product'] = {'id': obj.product_id, 'label': obj.product.label}
         return representation
 
+    class Meta(BatchSerializer.Meta):
+        """
+         This class defines the validation metadata for the batches list view.
+
+        Attributes:
+            fields (list(str)): The field list expencted by the serializer.
+        """
+
+        fields = BatchSerializer.Meta.fields + ['product']
+
+
+class BatchFilterSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer validating the filters of the batches list view.
+
+    Attributes:
+        provider (int): The provider of the batches.
+        category (int): The category of the batch products.
+        purchase_from (Date): The first purchase date, included.
+        purchase_to (Date): The last purchase date, included.
+        limit_from (Date): The first DLUO, included.
+        limit_to (Date): The last DLUO, included.
+        in_stock (bool): Keep only the batches with a current quantity.
+        ordering (str): The sort of the list, by DLUO or purchase date, descending with a `-`.
+    """
+
+    provider = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    purchase_from = serializers.DateField(required=False)
+    purchase_to = serializers.DateField(required=False)
+    limit_from = serializers.DateField(required=False)
+    limit_to = serializers.DateField(required=False)
+    in_stock = serializers.BooleanField(required=False)
+    ordering = serializers.ChoiceField(choices=['limit', '-limit', 'purchase', '-purchase'], default='limit')
+
+
+class ForecastSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer validating the parameters of the forecast view.
+
+    Attributes:
+        horizon (int): The number of days the shopping list must cover.
+    """
+
+    horizon = serializers.IntegerField(min_value=1, max_value=90, default=14)
+
+
+class ProductUpdateSerializer(serializers.ModelSerializer):
+    """This class defines the serializer for the products view."""
+
+    category = LabelField(Category)
+
     class Meta:
         """
          This class defines the validation metadata for the products view.
@@ -41,22 +94,19 @@ class ProductUpdateSerializer(serializers.ModelSerializer):
         Attributes:
             model (Model): The model linked to the serializer.
             fields (list(str)): The field list expencted by the serializer.
+            read_only_fields (list(str)): The fields managed by the server.
         """
 
         model = Product
-        fields = ['id', 'label', 'unit', 'category', 'icon']
+        fields = ['id', 'label', 'unit', 'category', 'icon', 'barcode', 'version']
+        read_only_fields = ['version']
 
 
 class ProductSerializer(serializers.ModelSerializer):
     """This class defines the serializer for the products view."""
 
     batches = BatchSerializer(many=True, read_only=True)
-    
-    def to_representation(self, obj):
-        """Format the representation to send result."""
-        representation = super(ProductSerializer, self).to_representation(obj)
-        representation['category'] = obj.category.label
-        return representation
+    category = LabelField(Category)
 
     class Meta:
         """
@@ -65,10 +115,12 @@ class ProductSerializer(serializers.ModelSerializer):
         Attributes:
             model (Model): The model linked to the serializer.
             fields (list(str)): The field list expencted by the serializer.
+            read_only_fields (list(str)): The fields managed by the server.
         """
 
         model = Product
-        fields = ['id', 'label', 'unit', 'category', 'icon', 'batches']
+        fields = ['id', 'label', 'unit', 'category', 'icon', 'barcode', 'version', 'batches']
+        read_only_fields = ['version']
 
 class ProductListSerializer(ProductSerializer):
     """This class defines the serializer for the products view."""
@@ -77,5 +129,4 @@ class ProductListSerializer(ProductSerializer):
         """Format the representation to send result."""
         representation = super(ProductListSerializer, self).to_representation(obj)
         representation["batches"] = list(filter(lambda x: x["current"] > 0, representation["batches"]))
-        representation['category'] = obj.category.label
         return representation
@@ -1,2 +1,557 @@
 """This module manages the tests for the products app."""
+import datetime
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import connections, reset_queries
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from analytics import rollups
+from analytics.models import ProviderSpend
+from api.labels import labels_of
+from api.pagination import OrderedCursorPagination
+from api.testing import connect, database_of
+from authentication.models import OwnerVersion
+from categories.models import Category
+from products import forecast
+from products.archive import archive
+from products.models import ArchivedBatch, Batch, Product
+from providers.models import Provider
+
+
+class OwnerScopedRoutesTests(TestCase):
+    """This class tests that the product and batch routes only resolve the objects of their owner."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create a product with a batch, and a second user."""
+        self.client = connect('owner')
+        self.other = connect('intruder')
+        category = self.client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        provider = {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon', 'zipcode': '69000', 'phone': '0400000000'}
+        self.provider = self.client.post('/providers/', provider, format='json').json()['id']
+        self.product = self.client.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': category},
+                                        format='json').json()['id']
+        self.batch = self.client.post(f'/products/{self.product}/batches/', {
+            'provider': self.provider, 'initial': 4, 'current': 4, 'price': 1.5,
+            'purchase': '2026-01-01', 'limit': '2026-02-01'
+        }, format='json').json()['id']
+        self.second = self.client.post('/products/', {'label': 'Butter', 'unit': 'g', 'category': category},
+                                       format='json').json()['id']
+
+    def test_owner_resolves_its_routes(self):
+        """The owner reads its product and the batch nested under it."""
+        self.assertEqual(self.client.get(f'/products/{self.product}').json()['label'], 'Milk')
+        self.assertEqual(self.client.get(f'/products/{self.product}/batches/{self.batch}').json()['id'], self.batch)
+        self.assertEqual([batch['id'] for batch in self.client.get(f'/products/{self.product}/batches/').json()],
+                         [self.batch])
+
+    def test_other_owner_gets_404(self):
+        """Every route of a product of another owner is answered 404 and changes nothing."""
+        self.assertEqual(self.other.get(f'/products/{self.product}').status_code, 404)
+        self.assertEqual(self.other.get(f'/products/{self.product}/batches/').status_code, 404)
+        self.assertEqual(self.other.get(f'/products/{self.product}/batches/{self.batch}').status_code, 404)
+        self.assertEqual(self.other.delete(f'/products/{self.product}/batches/{self.batch}').status_code, 404)
+        self.assertEqual(self.other.delete(f'/products/{self.product}').status_code, 404)
+        self.assertEqual(self.client.get(f'/products/{self.product}/batches/{self.batch}').status_code, 200)
+
+    def test_batch_under_another_product_gets_404(self):
+        """A batch is only resolved under the product it belongs to."""
+        self.assertEqual(self.client.get(f'/products/{self.second}/batches/{self.batch}').status_code, 404)
+        self.assertEqual(self.client.get(f'/products/{self.product}/batches/{self.batch + 1000}').status_code, 404)
+        self.assertEqual(self.client.get(f'/products/{self.product + 1000}').status_code, 404)
+
+
+class PurgeTests(TestCase):
+    """This class tests the set-based deletes of the categories, providers and products."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create two categories and two providers, with a product and a batch for each pair."""
+        self.client = connect('purger')
+        self.categories = [self.client.post('/categories/', {'label': label}, format='json').json()['id']
+                           for label in ('Dairy', 'Fruits')]
+        self.providers = [self.client.post('/providers/', {'label': label, 'address': '1 rue', 'city': 'Lyon',
+                                                           'zipcode': '69000', 'phone': '0400000000'},
+                                           format='json').json()['id']
+                          for label in ('Shop', 'Market')]
+        self.products = []
+        for category, provider, label in zip(self.categories, self.providers, ('Milk', 'Apple')):
+            product = self.client.post('/products/', {'label': label, 'unit': 'u', 'category': category},
+                                       format='json').json()['id']
+            self.client.post(f'/products/{product}/batches/', {
+                'provider': provider, 'initial': 1, 'current': 1, 'purchase': '2026-01-01', 'limit': '2026-02-01'
+            }, format='json')
+            self.products.append(product)
+        self.database = database_of('purger')
+
+    def test_category_delete_removes_its_products_and_batches(self):
+        """Deleting a category deletes its products and their batches, and nothing else."""
+        self.assertEqual(self.client.delete(f'/categories/{self.categories[0]}').status_code, 204)
+        self.assertEqual(list(Product.objects.using(self.database).values_list('label', flat=True)), ['Apple'])  # pylint: disable=no-member
+        self.assertEqual(list(Batch.objects.using(self.database).values_list('product', flat=True)), [self.products[1]])  # pylint: disable=no-member
+        self.assertEqual(self.client.delete(f'/categories/{self.categories[0]}').status_code, 404)
+
+    def test_provider_delete_removes_its_batches_only(self):
+        """Deleting a provider deletes its batches and keeps the products."""
+        self.assertEqual(self.client.delete(f'/providers/{self.providers[1]}').status_code, 204)
+        self.assertEqual(Product.objects.using(self.database).count(), 2)  # pylint: disable=no-member
+        self.assertEqual(list(Batch.objects.using(self.database).values_list('provider', flat=True)), [self.providers[0]])  # pylint: disable=no-member
+
+    def test_bulk_delete_is_scoped_to_the_owner(self):
+        """A bulk delete only removes the resources of the connected user."""
+        other = connect('bystander')
+        foreign = other.post('/categories/', {'label': 'Other'}, format='json').json()['id']
+        response = self.client.post('/categories/delete/', {'ids': [self.categories[0], foreign]}, format='json')
+        self.assertEqual((response.status_code, response.json()), (200, {'missing': [foreign]}))
+        bystander = database_of('bystander')
+        self.assertTrue(Category.objects.using(bystander).filter(pk=foreign).exists())  # pylint: disable=no-member
+        response = self.client.post('/products/delete/', {'ids': self.products}, format='json')
+        self.assertEqual((response.status_code, response.json()), (200, {'missing': [self.products[0]]}))
+        self.assertFalse(Product.objects.using(self.database).exists())  # pylint: disable=no-member
+        self.assertFalse(Batch.objects.using(self.database).exists())  # pylint: disable=no-member
+        self.assertEqual(self.client.post('/providers/delete/', {'ids': self.providers}, format='json').status_code, 204)
+        self.assertFalse(Provider.objects.using(self.database).filter(pk__in=self.providers).exists())  # pylint: disable=no-member
+
+    def test_bulk_delete_of_missing_resources(self):
+        """A bulk delete of no existing resource is answered 404, with the identifiers not found."""
+        self.client.delete(f'/products/{self.products[0]}')
+        response = self.client.post('/products/delete/', {'ids': [self.products[0]]}, format='json')
+        self.assertEqual((response.status_code, response.json()), (404, {'missing': [self.products[0]]}))
+        self.assertEqual(Product.objects.using(self.database).count(), 1)  # pylint: disable=no-member
+
+    def test_bulk_delete_refuses_an_empty_list(self):
+        """A bulk delete without identifiers is answered 400."""
+        self.assertEqual(self.client.post('/products/delete/', {'ids': []}, format='json').status_code, 400)
+
+
+class BatchListTests(TestCase):
+    """This class tests the filters and the cursor pages of the batches listing."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create five batches over two products, two categories and two providers."""
+        self.client = connect('lister')
+        categories = [self.client.post('/categories/', {'label': label}, format='json').json()['id']
+                      for label in ('Dairy', 'Fruits')]
+        self.providers = [self.client.post('/providers/', {'label': label, 'address': '1 rue', 'city': 'Lyon',
+                                                           'zipcode': '69000', 'phone': '0400000000'},
+                                           format='json').json()['id']
+                          for label in ('Shop', 'Market')]
+        self.category = categories[1]
+        products = [self.client.post('/products/', {'label': label, 'unit': 'u', 'category': category},
+                                     format='json').json()['id']
+                    for label, category in (('Milk', categories[0]), ('Apple', categories[1]))]
+        for day in range(1, 6):
+            self.client.post(f'/products/{products[day % 2]}/batches/', {
+                'provider': self.providers[day % 2], 'initial': 2, 'current': day % 3,
+                'purchase': f'2026-01-0{6 - day}', 'limit': f'2026-02-0{day}'
+            }, format='json')
+
+    def limits(self, **params: dict) -> list:
+        """Return the DLUO of the batches listed with some parameters."""
+        return [batch['limit'][-1] for batch in self.client.get('/batches/', params).json()['results']]
+
+    def test_filters(self):
+        """Each filter keeps the matching batches, ordered by DLUO."""
+        self.assertEqual(self.limits(), ['1', '2', '3', '4', '5'])
+        self.assertEqual(self.limits(provider=self.providers[0]), ['2', '4'])
+        self.assertEqual(self.limits(category=self.category), ['1', '3', '5'])
+        self.assertEqual(self.limits(limit_from='2026-02-02', limit_to='2026-02-04'), ['2', '3', '4'])
+        self.assertEqual(self.limits(purchase_to='2026-01-02'), ['4', '5'])
+        self.assertEqual(self.limits(in_stock='true'), ['1', '2', '4', '5'])
+        self.assertEqual(self.limits(ordering='-limit', in_stock='true'), ['5', '4', '2', '1'])
+        self.assertEqual(self.limits(ordering='purchase'), ['5', '4', '3', '2', '1'])
+
+    def test_cursor_pages(self):
+        """The cursor pages cover the list once, in order, and carry the filters."""
+        response = self.client.get('/batches/', {'page_size': 2, 'ordering': '-limit'}).json()
+        seen = []
+        while True:
+            seen += [batch['limit'][-1] for batch in response['results']]
+            if not response['next']:
+                break
+            response = self.client.get(response['next']).json()
+        self.assertEqual(seen, ['5', '4', '3', '2', '1'])
+
+    def test_ties_follow_the_identifiers(self):
+        """The batches sharing a DLUO are paged once, by identifier in the direction of the ordering."""
+        product = self.client.post('/products/', {'label': 'Pear', 'unit': 'u', 'category': self.category},
+                                   format='json').json()['id']
+        tied = [self.client.post(f'/products/{product}/batches/', {
+            'provider': self.providers[0], 'initial': 2, 'current': 1, 'purchase': '2026-01-01', 'limit': '2026-02-03'
+        }, format='json').json()['id'] for _ in range(3)]
+        for ordering, expected in (('limit', sorted(tied)), ('-limit', sorted(tied, reverse=True))):
+            response = self.client.get('/batches/', {'page_size': 1, 'ordering': ordering,
+                                                     'limit_from': '2026-02-03', 'limit_to': '2026-02-03'}).json()
+            seen = []
+            while True:
+                seen += [batch['id'] for batch in response['results']]
+                if not response['next']:
+                    break
+                response = self.client.get(response['next']).json()
+            self.assertEqual([identifier for identifier in seen if identifier in tied], expected)
+            self.assertEqual(len(seen), 4)
+        orderings = [OrderedCursorPagination().get_ordering(None, None, mock.Mock(get_ordering=lambda value=value: value))
+                     for value in ('limit', '-purchase', '-id')]
+        self.assertEqual(orderings, [('limit', 'id'), ('-purchase', '-id'), ('-id',)])
+
+    def test_scoped_and_validated(self):
+        """Another owner lists nothing, and an unknown ordering is refused."""
+        self.assertEqual(connect('outsider').get('/batches/').json()['results'], [])
+        self.assertEqual(self.client.get('/batches/', {'ordering': 'price'}).status_code, 400)
+
+
+class ForecastTests(TestCase):
+    """This class tests the run-out forecasts of the products."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create an owner with a product half consumed in ten days."""
+        self.owner = User.objects.create(username='planner')
+        category = Category.objects.create(owner=self.owner, label='Dairy')  # pylint: disable=no-member
+        provider = Provider.objects.create(owner=self.owner, label='Shop', address='1 rue', city='Lyon',  # pylint: disable=no-member
+                                           zipcode='69000', phone='0400000000')
+        self.product = Product.objects.create(owner=self.owner, label='Milk', unit='L', category=category)  # pylint: disable=no-member
+        self.today = datetime.date(2026, 3, 10)
+        Batch.objects.create(owner=self.owner, product=self.product, provider=provider, initial=10, current=5,  # pylint: disable=no-member
+                             purchase=datetime.date(2026, 3, 1), limit=datetime.date(2026, 6, 1))
+        Batch.objects.create(owner=self.owner, product=self.product, provider=provider, initial=2, current=2,  # pylint: disable=no-member
+                             purchase=datetime.date(2025, 1, 1), limit=datetime.date(2026, 3, 9))
+
+    def test_rate_and_run_out(self):
+        """The rate is the consumption over the history, and the stock past its DLUO is not usable."""
+        [row] = forecast.compute([self.owner.pk], self.today)
+        self.assertEqual((row.product_id, row.stock, row.rate), (self.product.pk, 5.0, 0.5))
+        self.assertEqual(row.runs_out, datetime.date(2026, 3, 20))
+
+    def test_owner_without_consumption(self):
+        """A product without consumption has no run-out date."""
+        Batch.objects.filter(product=self.product).update(current=F('initial'))  # pylint: disable=no-member
+        [row] = forecast.compute([self.owner.pk], self.today)
+        self.assertEqual((row.rate, row.runs_out), (0.0, None))
+
+    def test_refresh_replaces_the_stored_forecasts(self):
+        """Refreshing the forecasts of an owner stores one row per product."""
+        self.assertEqual(forecast.refresh([self.owner.pk], self.today), 1)
+        self.assertEqual(forecast.refresh([self.owner.pk], self.today), 1)
+        self.assertEqual([row.product for row in forecast.current_forecasts(self.owner)], [self.product])
+
+    def test_view_lists_the_shopping_list(self):
+        """The view answers the forecasts and the quantities to buy for the horizon."""
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        body = client.get('/products/forecast/', {'horizon': 10}).json()
+        self.assertEqual([row['product']['label'] for row in body['forecasts']], ['Milk'])
+        self.assertEqual([row['product']['id'] for row in body['shopping_list']], [self.product.pk])
+        self.assertEqual(client.get('/products/forecast/', {'horizon': 0}).status_code, 400)
+
+
+class CurrentForecastsTests(TestCase):
+    """This class tests the caching of the forecasts by owner version."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create an owner without data."""
+        self.owner = User.objects.create(username='forecaster')
+
+    def test_empty_forecasts_are_cached(self):
+        """The forecasts of an owner without products are computed once, while its data is unchanged."""
+        with mock.patch('products.forecast.refresh', wraps=forecast.refresh) as refresh:
+            self.assertEqual(forecast.current_forecasts(self.owner), [])
+            self.assertEqual(forecast.current_forecasts(self.owner), [])
+        self.assertEqual(refresh.call_count, 1)
+
+    def test_forecasts_are_computed_again_after_a_write(self):
+        """A write to the data of the owner makes its forecasts computed again, then cached."""
+        forecast.current_forecasts(self.owner)
+        category = Category.objects.create(owner=self.owner, label='Dairy')  # pylint: disable=no-member
+        Product.objects.create(owner=self.owner, label='Milk', unit='L', category=category)  # pylint: disable=no-member
+        with mock.patch('products.forecast.refresh', wraps=forecast.refresh) as refresh:
+            self.assertEqual([row.product.label for row in forecast.current_forecasts(self.owner)], [])
+            forecast.current_forecasts(self.owner)
+        self.assertEqual(refresh.call_count, 1)
+
+
+class VersionedUpdateTests(TestCase):
+    """This class tests the conditional updates of the products and batches."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create a product with a batch."""
+        self.client = connect('owner')
+        self.category = self.client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        provider = {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon', 'zipcode': '69000', 'phone': '0400000000'}
+        self.provider = self.client.post('/providers/', provider, format='json').json()['id']
+        self.product = self.client.post('/products/', {
+            'label': 'Milk', 'unit': 'L', 'category': self.category, 'icon': 'milk', 'barcode': '3017620422003'
+        }, format='json').json()['id']
+        self.batch = self.client.post(f'/products/{self.product}/batches/', {
+            'provider': self.provider, 'initial': 4, 'current': 4, 'price': 1.5,
+            'purchase': '2026-01-01', 'limit': '2026-02-01'
+        }, format='json').json()['id']
+
+    def test_partial_product_put_keeps_omitted_fields(self):
+        """A product PUT without the optional fields keeps their stored values."""
+        response = self.client.put(f'/products/{self.product}', {'label': 'Whole milk', 'unit': 'L',
+                                                                   'category': self.category}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['icon'], response.json()['barcode']), ('milk', '3017620422003'))
+        product = self.client.get(f'/products/{self.product}').json()
+        self.assertEqual((product['label'], product['icon']), ('Whole milk', 'milk'))
+
+    def test_partial_batch_put_keeps_omitted_fields(self):
+        """A batch PUT without the quantities and the price keeps their stored values."""
+        response = self.client.put(f'/products/{self.product}/batches/{self.batch}', {
+            'provider': self.provider, 'purchase': '2026-01-02', 'limit': '2026-02-02'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        batch = self.client.get(f'/products/{self.product}/batches/{self.batch}').json()
+        self.assertEqual((batch['initial'], batch['current'], batch['price'], batch['limit']),
+                         (4.0, 4.0, 1.5, '2026-02-02'))
+
+    def test_matching_if_match_updates_and_returns_new_etag(self):
+        """A PUT with the current ETag updates the resource and returns the next one."""
+        etag = self.client.get(f'/products/{self.product}/batches/{self.batch}')['ETag']
+        response = self.client.put(f'/products/{self.product}/batches/{self.batch}', {
+            'provider': self.provider, 'initial': 4, 'current': 2, 'price': 1.5,
+            'purchase': '2026-01-01', 'limit': '2026-02-01'
+        }, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['current'], 2.0)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(f'/products/{self.product}/batches/{self.batch}')['ETag'], response['ETag'])
+
+    def test_stale_if_match_is_refused(self):
+        """A PUT with an outdated ETag is answered 412 and changes nothing."""
+        etag = self.client.get(f'/products/{self.product}')['ETag']
+        product = {'unit': 'L', 'category': self.category}
+        self.client.put(f'/products/{self.product}', dict(product, label='Skimmed milk'), format='json',
+                        HTTP_IF_MATCH=etag)
+        response = self.client.put(f'/products/{self.product}', dict(product, label='Raw milk'), format='json',
+                                   HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.client.get(f'/products/{self.product}').json()['label'], 'Skimmed milk')
+
+    def test_any_version_without_if_match(self):
+        """A PUT without If-Match, or with a wildcard, updates whatever the version."""
+        product = {'label': 'Milk', 'unit': 'L', 'category': self.category}
+        first = self.client.put(f'/products/{self.product}', product, format='json')
+        second = self.client.put(f'/products/{self.product}', product, format='json', HTTP_IF_MATCH='*')
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual((first['ETag'], second['ETag']), ('"2"', '"3"'))
+
+    def test_malformed_if_match_is_refused(self):
+        """A PUT whose If-Match is not a version matches none and is answered 412."""
+        for etag in ('"abc"', '"0"'):
+            response = self.client.put(f'/products/{self.product}', {'label': 'Raw milk', 'unit': 'L',
+                                                                       'category': self.category},
+                                       format='json', HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.client.get(f'/products/{self.product}').json()['label'], 'Milk')
+
+    def test_complete_conditional_put_is_not_read_back(self):
+        """A conditional PUT of every field answers from the values written, without reading the batch again."""
+        batch = {'provider': self.provider, 'initial': 4, 'current': 2, 'price': 1.5,
+                 'purchase': '2026-01-01', 'limit': '2026-02-01'}
+        request_started.disconnect(reset_queries)
+        self.addCleanup(request_started.connect, reset_queries)
+        with CaptureQueriesContext(connections[database_of('owner')]) as context:
+            response = self.client.put(f'/products/{self.product}/batches/{self.batch}', batch, format='json',
+                                       HTTP_IF_MATCH='"1"')
+        statements = [query['sql'] for query in context.captured_queries]
+        self.assertEqual((response.status_code, response['ETag']), (200, '"2"'))
+        self.assertEqual(response.json(), self.client.get(f'/products/{self.product}/batches/{self.batch}').json())
+        table = f'"{Batch._meta.db_table}"'  # pylint: disable=protected-access
+        update = next(index for index, sql in enumerate(statements) if sql.startswith(f'UPDATE {table}'))
+        self.assertFalse([sql for sql in statements[update:] if sql.startswith('SELECT') and f'FROM {table}' in sql])
+
+    def test_missing_resource_is_not_found(self):
+        """A conditional PUT of a product of another owner is answered 404, not 412."""
+        other = connect('other')
+        category = other.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        response = other.put(f'/products/{self.product}', {'label': 'Milk', 'unit': 'L', 'category': category},
+                             format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 404)
+
+
+class BarcodeLookupTests(TestCase):
+    """This class tests the lookup of the products by barcode."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create a product with a barcode."""
+        self.client = connect('scanner')
+        self.category = self.client.post('/categories/', {'label': 'Spread'}, format='json').json()['id']
+        self.product = self.client.post('/products/', {
+            'label': 'Hazelnut spread', 'unit': 'g', 'category': self.category, 'barcode': '3017620422003'
+        }, format='json').json()['id']
+
+    def test_scan_finds_the_product_of_the_owner(self):
+        """A barcode resolves the product of the owner only."""
+        response = self.client.get('/products/by-barcode/3017620422003/')
+        self.assertEqual((response.status_code, response.json()['id']), (200, self.product))
+        self.assertEqual(self.client.get('/products/by-barcode/0000000000000/').status_code, 404)
+        self.assertEqual(connect('other').get('/products/by-barcode/3017620422003/').status_code, 404)
+
+    def test_barcode_is_unique_per_owner(self):
+        """A second product of the owner cannot take the barcode, a product of another owner can."""
+        product = {'label': 'Spread', 'unit': 'g', 'category': self.category, 'barcode': '3017620422003'}
+        response = self.client.post('/products/', product, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('barcode', response.json())
+        other = self.client.post('/products/', dict(product, barcode='3017620425035'), format='json').json()['id']
+        response = self.client.put(f'/products/{other}', product, format='json')
+        self.assertEqual(response.status_code, 400)
+        stranger = connect('stranger')
+        category = stranger.post('/categories/', {'label': 'Spread'}, format='json').json()['id']
+        self.assertEqual(stranger.post('/products/', dict(product, category=category), format='json').status_code, 201)
+
+    def test_scan_adds_a_batch(self):
+        """A batch posted on a barcode is added to its product."""
+        provider = self.client.post('/providers/', {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon',
+                                                    'zipcode': '69000', 'phone': '0400000000'}, format='json').json()['id']
+        response = self.client.post('/products/by-barcode/3017620422003/batches/', {
+            'provider': provider, 'initial': 1, 'current': 1, 'purchase': '2026-01-01', 'limit': '2026-02-01'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        batches = self.client.get(f'/products/{self.product}/batches/').json()
+        self.assertEqual([batch['id'] for batch in batches], [response.json()['id']])
+
+    def test_update_without_barcode_keeps_lookup(self):
+        """A product updated without its barcode is still found by it."""
+        response = self.client.put(f'/products/{self.product}', {'label': 'Spread', 'unit': 'g',
+                                                                   'category': self.category}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/products/by-barcode/3017620422003/')
+        self.assertEqual((response.status_code, response.json()['id'], response.json()['label']),
+                         (200, self.product, 'Spread'))
+
+    def test_update_with_barcode_moves_lookup(self):
+        """A product updated with another barcode is found by the new one only."""
+        self.client.put(f'/products/{self.product}', {'label': 'Spread', 'unit': 'g', 'category': self.category,
+                                                      'barcode': '3017620425035'}, format='json')
+        self.assertEqual(self.client.get('/products/by-barcode/3017620425035/').json()['id'], self.product)
+        self.assertEqual(self.client.get('/products/by-barcode/3017620422003/').status_code, 404)
+
+
+class LabelCacheTests(TestCase):
+    """This class tests the cached labels of the categories and providers of the products and batches."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user with a product and a batch."""
+        self.client = connect('labeller')
+        self.category = self.client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        self.provider = self.client.post('/providers/', {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon',
+                                                         'zipcode': '69000', 'phone': '0400000000'},
+                                         format='json').json()['id']
+        self.product = self.client.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': self.category},
+                                        format='json').json()['id']
+        self.batch = {'provider': self.provider, 'initial': 4, 'current': 3, 'price': 1.5,
+                      'purchase': '2026-01-01', 'limit': '2026-02-01'}
+        self.client.post(f'/products/{self.product}/batches/', self.batch, format='json')
+        self.owner = User.objects.get(username='labeller').pk
+        self.database = database_of('labeller')
+
+    def test_labels_follow_the_writes(self):
+        """A renamed category or provider is rendered with its new label at once."""
+        self.assertEqual(self.client.get(f'/products/{self.product}').json()['category'], 'Dairy')
+        self.client.put(f'/categories/{self.category}', {'label': 'Milk products'}, format='json')
+        self.client.put(f'/providers/{self.provider}', {'label': 'Farm', 'address': '1 rue', 'city': 'Lyon',
+                                                         'zipcode': '69000', 'phone': '0400000000'}, format='json')
+        product = self.client.get('/products/').json()[0]
+        self.assertEqual((product['category'], product['batches'][0]['provider']), ('Milk products', 'Farm'))
+
+    def test_catalog_version(self):
+        """Only the writes to the categories and providers change the catalog version, which reloads the labels."""
+        catalog = OwnerVersion.catalog_of(self.owner, self.database)
+        self.client.post('/products/', {'label': 'Butter', 'unit': 'g', 'category': self.category}, format='json')
+        self.client.post(f'/products/{self.product}/batches/', self.batch, format='json')
+        self.assertEqual(OwnerVersion.catalog_of(self.owner, self.database), catalog)
+        labels_of(self.owner, self.database)
+        with self.assertNumQueries(1, using=self.database):
+            labels_of(self.owner, self.database)
+        self.client.post('/categories/', {'label': 'Fruits'}, format='json')
+        self.assertEqual(OwnerVersion.catalog_of(self.owner, self.database), catalog + 1)
+        with self.assertNumQueries(3, using=self.database):
+            self.assertIn('Fruits', labels_of(self.owner, self.database)[Category].values())
+
+    def test_references_of_another_owner(self):
+        """A product or a batch cannot reference a category or a provider of another owner."""
+        other = connect('stranger')
+        response = other.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': self.category}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid pk', response.json()['category'][0])
+        category = other.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        product = other.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': category}, format='json').json()['id']
+        response = other.post(f'/products/{product}/batches/', self.batch, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid pk', response.json()['provider'][0])
+
+
+class ArchiveTests(TestCase):
+    """This class tests the archival of the consumed batches."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user with consumed batches bought long ago and lately, and a batch in stock."""
+        self.client = connect('archivist')
+        category = self.client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        provider = self.client.post('/providers/', {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon',
+                                                    'zipcode': '69000', 'phone': '0400000000'}, format='json').json()['id']
+        self.product = self.client.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': category},
+                                        format='json').json()['id']
+        self.batches = {name: self.client.post(f'/products/{self.product}/batches/', {
+            'provider': provider, 'initial': 4, 'current': current, 'price': 1.5, 'purchase': purchase,
+            'limit': '2026-02-01'
+        }, format='json').json()['id'] for name, current, purchase in (
+            ('old', 0, '2020-01-01'), ('older', 0, '2019-06-01'), ('recent', 0, '2026-01-01'), ('stocked', 2, '2020-01-01'))}
+        self.database = database_of('archivist')
+
+    def spends(self) -> list:
+        """Return the provider spends of the shard of the user."""
+        return list(ProviderSpend.objects.using(self.database).order_by('month')  # pylint: disable=no-member
+                    .values_list('month', 'amount', 'batches'))
+
+    def test_archive(self):
+        """The consumed batches bought before the date are moved with their identifiers, by chunks."""
+        self.assertEqual(archive(datetime.date(2021, 1, 1), self.database, chunk=1), 2)
+        self.assertEqual(set(ArchivedBatch.objects.using(self.database).values_list('pk', flat=True)),  # pylint: disable=no-member
+                         {self.batches['old'], self.batches['older']})
+        self.assertEqual(set(Batch.objects.using(self.database).values_list('pk', flat=True)),  # pylint: disable=no-member
+                         {self.batches['recent'], self.batches['stocked']})
+        self.assertEqual(archive(datetime.date(2021, 1, 1), self.database), 0)
+
+    def test_history_is_kept(self):
+        """The provider spends stay whole, through the triggers and through a rebuild."""
+        spends = self.spends()
+        archive(datetime.date(2021, 1, 1), self.database)
+        self.assertEqual(self.spends(), spends)
+        rollups.rebuild(self.database)
+        self.assertEqual(self.spends(), spends)
+
+    def test_purge_deletes_the_archive(self):
+        """A deleted product takes its archived batches with it."""
+        archive(datetime.date(2021, 1, 1), self.database)
+        self.assertEqual(self.client.post('/products/delete/', {'ids': [self.product]}, format='json').status_code, 204)
+        self.assertFalse(ArchivedBatch.objects.using(self.database).exists())  # pylint: disable=no-member
+
+    def test_command(self):
+        """The command archives the consumed batches of every shard."""
+        out = StringIO()
+        call_command('archive_batches', '--before', '2021-01-01', stdout=out)
+        self.assertIn(f'{self.database}: 2 batches archived before 2021-01-01.', out.getvalue())
@@ -1,10 +1,15 @@
 """This module defines the routes for the products resources."""
 from django.urls import path
-from products.views import ProductView, ProductDetail, BatchView, BatchDetail
+from products.views import ProductView, ProductDetail, ProductBulkDelete, ProductForecastView, ProductBarcodeView, \
+    BarcodeBatchView, BatchView, BatchDetail
 
 urlpatterns = [
     path('', ProductView.as_view()),
     path('<int:pk>', ProductDetail.as_view()),
+    path('delete/', ProductBulkDelete.as_view()),
+    path('forecast/', ProductForecastView.as_view()),
+    path('by-barcode/<str:code>/', ProductBarcodeView.as_view()),
+    path('by-barcode/<str:code>/batches/', BarcodeBatchView.as_view()),
     path('<int:pk>/batches/', BatchView.as_view()),
     path('<int:pk>/batches/<int:ps>', BatchDetail.as_view())
 ]
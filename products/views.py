@@ -1,9 +1,51 @@
 """This module manages the views of the categories app."""
+from django.db import IntegrityError, router, transaction
+from django.db.models import Prefetch
+from django.http import Http404
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from api.db import chunks
+from api.mixins import OwnerScopedMixin, VersionedMixin
+from api.pagination import OrderedCursorPagination
+from api.views import BulkDeleteView
+from products.forecast import current_forecasts
 from products.models import Product, Batch
-from products.serializers import ProductSerializer, ProductUpdateSerializer, ProductListSerializer, BatchSerializer
+from products.purge import purge_products
+from products.serializers import ProductSerializer, ProductUpdateSerializer, ProductListSerializer, BatchSerializer, \
+    BatchListSerializer, BatchFilterSerializer, ForecastSerializer
+
+
+DUPLICATE_BARCODE = {'barcode': ['Another product already has this barcode.']}
+
+LIST_CHUNK = 500
+
+
+class ProductLookupMixin(OwnerScopedMixin, VersionedMixin):
+    """
+    This class resolves the product of the route and its batches.
+
+    The product is memoized on the view, which lives for a single request, so it is
+    fetched at most once whatever the number of handlers needing it. It is identified
+    by its `pk`, or by its `code` on the barcode routes, through the owner barcode index.
+    """
+
+    def get_product(self) -> Product:
+        """Return the product of the route, or raise a 404."""
+        if not hasattr(self, '_product'):
+            lookups = {'barcode': self.kwargs['code']} if 'code' in self.kwargs else {'pk': self.kwargs['pk']}
+            self._product = self.get_owned_object(Product.objects.all(), **lookups)  # pylint: disable=no-member
+        return self._product
+
+    def get_batch(self) -> Batch:
+        """Return the batch of the route with its product in one query, or raise a 404."""
+        batch = self.get_owned_object(Batch.objects.select_related('product'),  # pylint: disable=no-member
+                                      product__owner=self.request.user,
+                                      product=self.kwargs['pk'],
+                                      pk=self.kwargs['ps'])
+        self._product = batch.product
+        return batch
 
 
 class ProductView(APIView):
@@ -29,6 +71,11 @@ class ProductView(APIView):
         """
         Retrieve the product list with batches in stock.
 
+        The products are read by chunks, from a server-side cursor on PostgreSQL, with
+        their batches in stock, and the labels of their categories and providers are
+        cached, so the list costs a few queries and the rows of a single chunk are held
+        at once.
+
         Attributes:
             request (Request): The request sent to the api.
             format (NoneType): Always none, pass by Accept header.
@@ -40,9 +87,10 @@ class ProductView(APIView):
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
         """
-        products = Product.objects.filter(owner=request.user) # pylint: disable=no-member
-        serializer = ProductListSerializer(products, many=True)
-        return Response(serializer.data)
+        products = Product.objects.filter(owner=request.user)  # pylint: disable=no-member
+        batches = Prefetch('batches', queryset=Batch.objects.filter(current__gt=0))  # pylint: disable=no-member
+        return Response([product for chunk in chunks(products, LIST_CHUNK, batches)
+                         for product in ProductListSerializer(chunk, many=True).data])
 
     def post(self, request, format=None):
         """
@@ -59,14 +107,58 @@ class ProductView(APIView):
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
         """
-        serializer = ProductUpdateSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save(owner=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ProductUpdateSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic(using=router.db_for_write(Product)):
+                serializer.save(owner=request.user)
+        except IntegrityError:
+            return Response(DUPLICATE_BARCODE, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
+class ProductForecastView(APIView):
+    """
+    This class manages the view of the consumption forecast of the products.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, format=None):
+        """
+        Retrieve the run-out date of the products and the shopping list of the horizon.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
 
-class ProductDetail(APIView):
+        Returns:
+            200: The forecasts, soonest run-out first, and the quantities to buy.
+            400: An error is detected on the request parameters.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+        """
+        serializer = ForecastSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        horizon = serializer.validated_data['horizon']
+        forecasts, shopping_list = [], []
+        for forecast in current_forecasts(request.user):
+            product = {'id': forecast.product_id, 'label': forecast.product.label, 'unit': forecast.product.unit}
+            forecasts.append({'product': product, 'stock': forecast.stock, 'rate': forecast.rate,
+                              'runs_out': forecast.runs_out})
+            quantity = forecast.rate * horizon - forecast.stock
+            if quantity > 0:
+                shopping_list.append({'product': product, 'quantity': round(quantity, 2)})
+        return Response({'forecasts': forecasts, 'shopping_list': shopping_list})
+
+
+class ProductDetail(ProductLookupMixin, APIView):
     """
     This class manages the view to update and delete a product.
 
@@ -79,7 +171,9 @@ class ProductDetail(APIView):
             204: The product is deleted.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product does not exist.
             406: The response format is not acceptable by the server.
+            412: The product was modified since the version given by If-Match.
             500: An error was occured in the treatment of the request.
     """
 
@@ -98,19 +192,16 @@ class ProductDetail(APIView):
             200: The product is updated.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product does not exist.
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
         """
-        try:
-            product = Product.objects.get(owner=request.user, pk=pk) # pylint: disable=no-member
-        except Exception:
-            return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = ProductSerializer(product)
-        return Response(serializer.data)
+        product = self.get_product()
+        return self.tag(Response(ProductSerializer(product).data), product.version)
 
     def put(self, request, pk, format=None):
         """
-        Update a product.
+        Update a product, only if it still has the version given by If-Match.
 
         Attributes:
             request (Request): The request sent to the api.
@@ -121,15 +212,21 @@ class ProductDetail(APIView):
             200: The product is updated.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product does not exist.
             406: The response format is not acceptable by the server.
+            412: The product was modified since the version given by If-Match.
             500: An error was occured in the treatment of the request.
         """
-        product = Product.objects.get(owner=request.user, pk=pk) # pylint: disable=no-member
-        serializer = ProductUpdateSerializer(product, data=request.data)
-        if serializer.is_valid():
-            serializer.save(owner=request.user)
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        expected = self.get_expected_version()
+        serializer = ProductUpdateSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        products = Product.objects.filter(owner=request.user)  # pylint: disable=no-member
+        try:
+            product = self.update_version(products, pk, expected, serializer)
+        except IntegrityError:
+            return Response(DUPLICATE_BARCODE, status=status.HTTP_400_BAD_REQUEST)
+        return self.tag(Response(ProductUpdateSerializer(product).data), product.version)
 
     def delete(self, request, pk, format=None):
         """
@@ -145,15 +242,91 @@ class ProductDetail(APIView):
             204: The product is deleted.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product does not exist.
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
         """
-        product = Product.objects.get(owner=request.user, pk=pk) # pylint: disable=no-member
-        product.delete()
+        if not purge_products(request.user, [pk]):
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class BatchView(generics.ListCreateAPIView):
+class ProductBarcodeView(ProductLookupMixin, APIView):
+    """
+    This class manages the view to find a product from its barcode.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, code, format=None):
+        """
+        Retrieve the product of a barcode, in a single indexed query.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            code (str): The scanned barcode.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The product, without its batches.
+            401: The user must be connected to access this resource.
+            404: No product has this barcode.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+        """
+        product = self.get_product()
+        return self.tag(Response(ProductUpdateSerializer(product).data), product.version)
+
+
+class BarcodeBatchView(ProductLookupMixin, APIView):
+    """
+    This class manages the view to add a batch to the product of a barcode.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, code, format=None):
+        """
+        Create a batch of the product of a barcode.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            code (str): The scanned barcode.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            201: The batch is created.
+            400: An error is detected on the request data.
+            401: The user must be connected to access this resource.
+            404: No product has this barcode.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+        """
+        serializer = BatchSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(owner=request.user, product=self.get_product())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ProductBulkDelete(BulkDeleteView):
+    """
+    This class manages the view to delete several products with their batches.
+
+    Attributes:
+        purge (function): The function deleting the products of an owner.
+    """
+
+    purge = staticmethod(purge_products)
+
+
+class BatchView(ProductLookupMixin, generics.ListCreateAPIView):
     """
     This class manages the view to create and list the products.
 
@@ -166,6 +339,7 @@ class BatchView(generics.ListCreateAPIView):
             201: The product is created.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product does not exist.
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request. 
     """
@@ -175,21 +349,90 @@ class BatchView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         """Return the category list of the owner."""
-        product = Product.objects.get(owner=self.request.user, pk=self.kwargs['pk']) # pylint: disable=no-member
+        product = self.get_product()
         return Batch.objects.filter(owner=self.request.user, product=product)  # pylint: disable=no-member
 
     def perform_create(self, serializer):
         """Add the owner of the category before create it."""
-        product = Product.objects.get(owner=self.request.user, pk=self.kwargs['pk']) # pylint: disable=no-member
-        serializer.save(owner=self.request.user, product=product)
+        serializer.save(owner=self.request.user, product=self.get_product())
+
+
+class BatchListView(generics.ListAPIView):
+    """
+    This class manages the view to list the batches of all the products.
+
+    Every filter combination is a range scan on one of the `Batch` indexes: the owner
+    or the provider first, then the ordered date. The category is resolved as a
+    subquery on the products, which keeps the batch index usable.
 
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+        serializer_class (Serializer): The serializer to bind the request and the response object.
+        pagination_class (Pagination): The cursor pagination of the list.
 
-class BatchDetail(APIView):
+    Returns:
+            200: The page of batches.
+            400: An error is detected on the request parameters.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BatchListSerializer
+    pagination_class = OrderedCursorPagination
+
+    def get_criteria(self) -> dict:
+        """Return the validated filters and ordering of the request."""
+        if not hasattr(self, '_criteria'):
+            serializer = BatchFilterSerializer(data=self.request.query_params)
+            if not serializer.is_valid():
+                raise ValidationError(serializer.errors)
+            self._criteria = serializer.validated_data
+        return self._criteria
+
+    def get_ordering(self) -> str:
+        """Return the ordering of the list, used by the pagination."""
+        return self.get_criteria()['ordering']
+
+    def get_queryset(self):
+        """Return the batches of the owner matching the filters of the request."""
+        criteria = self.get_criteria()
+        batches = Batch.objects.filter(owner=self.request.user)  # pylint: disable=no-member
+        if 'provider' in criteria:
+            batches = batches.filter(provider=criteria['provider'])
+        if 'category' in criteria:
+            products = Product.objects.filter(owner=self.request.user, category=criteria['category'])  # pylint: disable=no-member
+            batches = batches.filter(product__in=products.values('pk'))
+        if 'purchase_from' in criteria:
+            batches = batches.filter(purchase__gte=criteria['purchase_from'])
+        if 'purchase_to' in criteria:
+            batches = batches.filter(purchase__lte=criteria['purchase_to'])
+        if 'limit_from' in criteria:
+            batches = batches.filter(limit__gte=criteria['limit_from'])
+        if 'limit_to' in criteria:
+            batches = batches.filter(limit__lte=criteria['limit_to'])
+        if criteria.get('in_stock'):
+            batches = batches.filter(current__gt=0)
+        return batches.select_related('product')
+
+
+class BatchDetail(ProductLookupMixin, APIView):
     """
     This class manages the view to update and delete a batch.
 
     Attributes:
         permission_classes (list(Permissions)): The options to access at this resource.
+
+    Returns:
+            200: The batch is updated.
+            204: The batch is deleted.
+            400: An error is detected on the request data.
+            401: The user must be connected to access this resource.
+            404: The product or the batch does not exist.
+            406: The response format is not acceptable by the server.
+            412: The batch was modified since the version given by If-Match.
+            500: An error was occured in the treatment of the request.
     """
 
     permission_classes = [permissions.IsAuthenticated]
@@ -208,20 +451,16 @@ class BatchDetail(APIView):
             200: The product is updated.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product or the batch does not exist.
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
         """
-        product = Product.objects.get(owner=request.user, pk=pk) # pylint: disable=no-member
-        try:
-            batch = Batch.objects.get(owner=request.user, product=product, pk=ps)  # pylint: disable=no-member
-        except Exception:
-            return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = BatchSerializer(batch)
-        return Response(serializer.data)
+        batch = self.get_batch()
+        return self.tag(Response(BatchSerializer(batch).data), batch.version)
 
     def put(self, request, pk, ps, format=None):
         """
-        Update a batch.
+        Update a batch, only if it still has the version given by If-Match.
 
         Attributes:
             request (Request): The request sent to the api.
@@ -233,17 +472,18 @@ class BatchDetail(APIView):
             200: The product is updated.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product or the batch does not exist.
             406: The response format is not acceptable by the server.
+            412: The batch was modified since the version given by If-Match.
             500: An error was occured in the treatment of the request.
         """
-        product = Product.objects.get(owner=request.user, pk=pk) # pylint: disable=no-member
-        batch = Batch.objects.get(owner=request.user, product=product, pk=ps)  # pylint: disable=no-member
-
-        serializer = BatchSerializer(batch, data=request.data)
-        if serializer.is_valid():
-            serializer.save(owner=request.user, product=product)
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        expected = self.get_expected_version()
+        serializer = BatchSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        batches = Batch.objects.filter(owner=request.user, product=pk)  # pylint: disable=no-member
+        batch = self.update_version(batches, ps, expected, serializer)
+        return self.tag(Response(BatchSerializer(batch).data), batch.version)
 
     def delete(self, request, pk, ps, format=None):
         """
@@ -259,10 +499,9 @@ class BatchDetail(APIView):
             204: The product is deleted.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The product or the batch does not exist.
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
         """
-        product = Product.objects.get(owner=request.user, pk=pk) # pylint: disable=no-member
-        batch = Batch.objects.get(owner=request.user, product=product, pk=ps)  # pylint: disable=no-member
-        batch.delete()
+        self.get_batch().delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
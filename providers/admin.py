@@ -1,5 +1,13 @@
 """This module manages the admin section for the providers app."""
 from django.contrib import admin
+from api.admin import OwnedModelAdmin
+from search.index import PROVIDER
 from .models import Provider
 
-admin.site.register(Provider)
+
+@admin.register(Provider)
+class ProviderAdmin(OwnedModelAdmin):
+    """This class defines the admin of the providers."""
+
+    list_display = ('id', 'label', 'city', 'owner')
+    indexed_search = ('pk', PROVIDER)
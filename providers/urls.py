@@ -1,8 +1,9 @@
 """This module defines the routes for the categories resources."""
 from django.urls import path
-from providers.views import ProviderView, ProviderDetail
+from providers.views import ProviderView, ProviderDetail, ProviderBulkDelete
 
 urlpatterns = [
     path('', ProviderView.as_view()),
-    path('<int:pk>', ProviderDetail.as_view())
+    path('<int:pk>', ProviderDetail.as_view()),
+    path('delete/', ProviderBulkDelete.as_view())
 ]
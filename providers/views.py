@@ -1,7 +1,10 @@
 """This module manages the views of the categories app."""
+from django.http import Http404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from api.views import BulkDeleteView
+from products.purge import purge_providers
 from providers.models import Provider
 from providers.serializers import ProviderListSerializer, ProviderSerializer
 
@@ -69,6 +72,7 @@ class ProviderDetail(generics.RetrieveUpdateDestroyAPIView):
             204: The provider is deleted.
             400: An error is detected on the request data.
             401: The user must be connected to access this resource.
+            404: The provider does not exist.
             406: The response format is not acceptable by the server.
             500: An error was occured in the treatment of the request.
     """
@@ -83,3 +87,20 @@ class ProviderDetail(generics.RetrieveUpdateDestroyAPIView):
     def perform_update(self, serializer):
         """Update the owner of the category before update it."""
         serializer.save(owner=self.request.user)
+
+    def destroy(self, request, *args, **kwargs):
+        """Delete the provider with its batches in set-based statements."""
+        if not purge_providers(request.user, [self.kwargs['pk']]):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProviderBulkDelete(BulkDeleteView):
+    """
+    This class manages the view to delete several providers with their batches.
+
+    Attributes:
+        purge (function): The function deleting the providers of an owner.
+    """
+
+    purge = staticmethod(purge_providers)
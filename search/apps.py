@@ -0,0 +1,19 @@
+"""This module defines the configuration for the search app."""
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    """
+    This class defines the configuration for the search app.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'search'
+
+    def ready(self):
+        """Drop the triggers maintaining the search index during the migrations, and install them after."""
+        from api.db import connect_installs  # pylint: disable=import-outside-toplevel
+        from search.index import install, uninstall  # pylint: disable=import-outside-toplevel
+        connect_installs(self, install, uninstall)
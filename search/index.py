@@ -0,0 +1,194 @@
+"""This module maintains and queries the full-text index of the products, categories and providers.
+
+The index is an SQLite FTS5 table holding one document per object. Its rowid encodes
+the object kind and identifier (`id * 4 + kind`), so triggers update a document
+through the rowid index, and results are mapped back without a lookup table. The
+owner is indexed as a token and every query is restricted to it.
+
+PostgreSQL has no such table: the labels are searched in their own tables, the words
+of the text being matched as prefixes of their words by regular expressions, served by
+the trigram indexes of the labels, and ranked by their trigram similarity.
+"""
+import re
+from typing import List, Optional, Tuple
+from django.db import connections, transaction
+from django.db.models.expressions import RawSQL
+from api.db import Trigger, install_triggers, uninstall_triggers
+
+PRODUCT, CATEGORY, PROVIDER = 1, 2, 3
+
+KINDS = {PRODUCT: 'product', CATEGORY: 'category', PROVIDER: 'provider'}
+
+MAX_TERMS = 8
+
+SOURCES = [
+    # (kind, table, city column)
+    (1, 'products_product', "''"),
+    (2, 'categories_category', "''"),
+    (3, 'providers_provider', 'city'),
+]
+
+
+def _document(kind: int, table: str, city: str) -> str:
+    """Return the select statement of the documents of a table."""
+    return f"SELECT id * 4 + {kind}, 'o' || owner_id, label, {city} FROM {table}"
+
+
+def _triggers(kind: int, table: str, city: str) -> List[Trigger]:
+    """Return the triggers keeping the documents of a table in sync."""
+    new_city = f'NEW.{city}' if city == 'city' else city
+    columns = 'owner_id, label, city' if city == 'city' else 'owner_id, label'
+    name = f'search_{table}'
+    return [
+        Trigger(f'{name}_insert', table,
+                f"CREATE TRIGGER {name}_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO search_index(rowid, owner, label, city) "
+                f"VALUES (NEW.id * 4 + {kind}, 'o' || NEW.owner_id, NEW.label, {new_city}); END"),
+        Trigger(f'{name}_update', table,
+                f"CREATE TRIGGER {name}_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+                f"UPDATE search_index SET owner = 'o' || NEW.owner_id, label = NEW.label, city = {new_city} "
+                f"WHERE rowid = OLD.id * 4 + {kind}; END"),
+        Trigger(f'{name}_delete', table,
+                f"CREATE TRIGGER {name}_delete AFTER DELETE ON {table} BEGIN "
+                f"DELETE FROM search_index WHERE rowid = OLD.id * 4 + {kind}; END"),
+    ]
+
+
+TRIGGERS = {
+    'sqlite': [trigger for source in SOURCES for trigger in _triggers(*source)],
+}
+
+FILL_INDEX = [f'INSERT INTO search_index(rowid, owner, label, city) {_document(*source)}' for source in SOURCES]
+
+
+def install(sender, using: str = 'default', **kwargs: dict):
+    """Install the triggers of the search index on a database, after a migration."""
+    install_triggers(TRIGGERS, using, requires=['search_index'])
+
+
+def uninstall(sender, using: str = 'default', **kwargs: dict):
+    """Drop the triggers of the search index from a database, before a migration."""
+    uninstall_triggers(TRIGGERS, using)
+
+
+def rebuild(using: str = 'default'):
+    """Rebuild the search index of a database from the indexed tables, PostgreSQL having none."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute('DELETE FROM search_index')
+        for statement in FILL_INDEX:
+            cursor.execute(statement)
+        cursor.execute("INSERT INTO search_index(search_index) VALUES ('optimize')")
+
+
+def _terms(text: str) -> List[str]:
+    """Return the words of a text searched, up to the maximum number of terms."""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def _matching(table: str, city: str, terms: List[str]) -> Tuple[str, List[str]]:
+    """Return the PostgreSQL condition on the rows of a table whose words start with each term, and its parameters."""
+    document = f"(label || ' ' || {city})" if city == 'city' else 'label'
+    return ' AND '.join([f'{document} ~* %s'] * len(terms)), [rf'\m{term}' for term in terms]
+
+
+def match_expression(owner_id: Optional[int], text: str) -> str:
+    """
+    Build the FTS5 expression matching the words of a text as prefixes.
+
+    Args:
+        owner_id (int): The owner of the documents, None for every owner.
+        text (str): The text typed by the user.
+
+    Returns:
+        str: The expression, or an empty string if the text contains no word.
+    """
+    terms = _terms(text)
+    if not terms:
+        return ''
+    owner = [f'owner : "o{owner_id}"'] if owner_id is not None else []
+    return ' AND '.join(owner + [f'{{label city}} : "{term}"*' for term in terms])
+
+
+def matching_ids(kind: int, text: str, using: str = 'default') -> Optional[RawSQL]:
+    """
+    Return the subquery of the identifiers of the objects of a kind matching a text, for every owner.
+
+    Args:
+        kind (int): The kind of the objects, a key of `KINDS`.
+        text (str): The text to search.
+        using (str): The database alias of the filtered queryset.
+
+    Returns:
+        RawSQL: The subquery, to filter with `__in`, or None if the text contains no word.
+    """
+    if connections[using].vendor == 'postgresql':
+        terms = _terms(text)
+        if not terms:
+            return None
+        _, table, city = SOURCES[kind - 1]
+        condition, params = _matching(table, city, terms)
+        return RawSQL(f'SELECT id FROM {table} WHERE {condition}', params)
+    expression = match_expression(None, text)
+    if not expression:
+        return None
+    return RawSQL('SELECT rowid >> 2 FROM search_index WHERE search_index MATCH %s AND (rowid & 3) = %s',
+                  [expression, kind])
+
+
+def search(owner_id: int, text: str, limit: int, offset: int = 0, using: str = 'default') -> List[dict]:
+    """
+    Search the products, categories and providers of an owner.
+
+    Args:
+        owner_id (int): The owner of the objects.
+        text (str): The text typed by the user.
+        limit (int): The maximum number of results.
+        offset (int): The number of results to skip.
+        using (str): The database alias.
+
+    Returns:
+        list(dict): The results, best ranked first.
+    """
+    if connections[using].vendor == 'postgresql':
+        return _results(_search_postgresql(owner_id, text, limit, offset, using))
+    expression = match_expression(owner_id, text)
+    if not expression:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT rowid, label, city FROM search_index WHERE search_index MATCH %s '
+                       'ORDER BY bm25(search_index, 0.0, 10.0, 5.0), rowid LIMIT %s OFFSET %s',
+                       [expression, limit, offset])
+        rows = cursor.fetchall()
+    return _results(rows)
+
+
+def _search_postgresql(owner_id: int, text: str, limit: int, offset: int, using: str) -> List[tuple]:
+    """Return the rows of the objects of an owner matching a text in the PostgreSQL tables, best ranked first."""
+    terms = _terms(text)
+    if not terms:
+        return []
+    selects, params = [], []
+    for kind, table, city in SOURCES:
+        condition, patterns = _matching(table, city, terms)
+        selects.append(f'SELECT id * 4 + {kind} AS rowid, label, {city} AS city FROM {table} '
+                       f'WHERE owner_id = %s AND {condition}')
+        params += [owner_id] + patterns
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT rowid, label, city FROM ({" UNION ALL ".join(selects)}) AS results '
+                       f'ORDER BY word_similarity(%s, label) DESC, rowid LIMIT %s OFFSET %s',
+                       params + [' '.join(terms), limit, offset])
+        return cursor.fetchall()
+
+
+def _results(rows: List[tuple]) -> List[dict]:
+    """Return the results of the rows of the matching objects."""
+    results = []
+    for rowid, label, city in rows:
+        result = {'type': KINDS[rowid % 4], 'id': rowid // 4, 'label': label}
+        if city:
+            result['city'] = city
+        results.append(result)
+    return results
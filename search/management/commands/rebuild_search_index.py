@@ -0,0 +1,21 @@
+"""This module defines the command rebuilding the search index."""
+from django.core.management.base import BaseCommand
+from api.sharding import shards
+from search.index import rebuild
+
+
+class Command(BaseCommand):
+    """This class defines the command rebuilding the search index from the indexed tables."""
+
+    help = 'Rebuild the full-text index of the products, categories and providers.'
+
+    def add_arguments(self, parser):
+        """Add the database option."""
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='A shard to rebuild, repeated for several ones, every shard by default.')
+
+    def handle(self, *args, **options):
+        """Rebuild the index of each shard."""
+        for database in options['databases'] or shards():
+            rebuild(database)
+            self.stdout.write(self.style.SUCCESS(f'{database}: search index rebuilt.'))
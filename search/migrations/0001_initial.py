@@ -0,0 +1,30 @@
+from django.db import migrations
+import api.db
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('providers', '0001_initial'),
+        ('products', '0002_auto_20200808_2111'),
+    ]
+
+    operations = [
+        api.db.RunVendorSQL(
+            'sqlite',
+            sql=[
+                "CREATE VIRTUAL TABLE search_index USING fts5("
+                "owner, label, city, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+                "INSERT INTO search_index(rowid, owner, label, city) "
+                "SELECT id * 4 + 1, 'o' || owner_id, label, '' FROM products_product",
+                "INSERT INTO search_index(rowid, owner, label, city) "
+                "SELECT id * 4 + 2, 'o' || owner_id, label, '' FROM categories_category",
+                "INSERT INTO search_index(rowid, owner, label, city) "
+                "SELECT id * 4 + 3, 'o' || owner_id, label, city FROM providers_provider",
+            ],
+            reverse_sql=['DROP TABLE search_index'],
+        ),
+    ]
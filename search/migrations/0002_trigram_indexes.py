@@ -0,0 +1,29 @@
+from django.db import migrations
+import api.db
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        api.db.RunVendorSQL(
+            'postgresql',
+            sql=[
+                'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+                'CREATE INDEX IF NOT EXISTS product_label_trgm_idx ON products_product '
+                'USING gin (label gin_trgm_ops)',
+                'CREATE INDEX IF NOT EXISTS category_label_trgm_idx ON categories_category '
+                'USING gin (label gin_trgm_ops)',
+                "CREATE INDEX IF NOT EXISTS provider_label_trgm_idx ON providers_provider "
+                "USING gin ((label || ' ' || city) gin_trgm_ops)",
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS product_label_trgm_idx',
+                'DROP INDEX IF EXISTS category_label_trgm_idx',
+                'DROP INDEX IF EXISTS provider_label_trgm_idx',
+            ],
+        ),
+    ]
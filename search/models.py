@@ -0,0 +1,6 @@
+"""This module defines the models of the search app.
+
+The search index is an FTS5 virtual table created by the migrations and maintained by
+triggers, see `search.index`; on PostgreSQL, the migrations create trigram indexes on
+the labels instead. The module must exist for the app to receive `post_migrate`.
+"""
@@ -0,0 +1,17 @@
+"""This module defines the serializers for the search app."""
+from rest_framework import serializers
+
+
+class SearchSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    This class defines the serializer validating the search parameters.
+
+    Attributes:
+        q (str): The searched text.
+        limit (int): The maximum number of results.
+        offset (int): The number of results to skip.
+    """
+
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    offset = serializers.IntegerField(min_value=0, default=0)
@@ -0,0 +1,59 @@
+"""This module manages the tests for the search app."""
+from django.test import TestCase
+from api.testing import connect
+
+
+class SearchTests(TestCase):
+    """This class tests the full-text search over the resources of an owner."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create a category, a provider and two products."""
+        self.client = connect('searcher')
+        self.category = self.client.post('/categories/', {'label': 'Dairy products'}, format='json').json()['id']
+        self.provider = self.client.post('/providers/', {'label': 'Farm shop', 'address': '1 rue', 'city': 'Dairyville',
+                                                         'zipcode': '69000', 'phone': '0400000000'},
+                                         format='json').json()['id']
+        self.milk = self.client.post('/products/', {'label': 'Whole milk', 'unit': 'L', 'category': self.category},
+                                     format='json').json()['id']
+        self.client.post('/products/', {'label': 'Milk chocolate', 'unit': 'g', 'category': self.category},
+                         format='json')
+
+    def search(self, text: str, **params: dict) -> dict:
+        """Return the response body of a search."""
+        return self.client.get('/search/', dict(params, q=text)).json()
+
+    def test_prefixes_match_every_kind(self):
+        """The words typed match the labels and the cities by prefix."""
+        results = self.search('dair')['results']
+        self.assertEqual({(result['type'], result['id']) for result in results},
+                         {('category', self.category), ('provider', self.provider)})
+        self.assertEqual([result['label'] for result in self.search('mil who')['results']], ['Whole milk'])
+
+    def test_index_follows_the_writes(self):
+        """Renamed and deleted objects are found under their new label only."""
+        self.client.put(f'/products/{self.milk}', {'label': 'Skimmed milk', 'unit': 'L', 'category': self.category},
+                        format='json')
+        self.assertEqual(self.search('whole')['results'], [])
+        self.assertEqual([result['id'] for result in self.search('skim')['results']], [self.milk])
+        self.client.delete(f'/products/{self.milk}')
+        self.assertEqual(self.search('skim')['results'], [])
+
+    def test_results_are_scoped_to_the_owner(self):
+        """Another user does not find the objects of the owner."""
+        self.assertEqual(connect('stranger').get('/search/', {'q': 'milk'}).json()['results'], [])
+
+    def test_pages(self):
+        """The results are paged with next and previous links."""
+        page = self.search('milk', limit=1)
+        self.assertEqual(len(page['results']), 1)
+        self.assertIn('offset=1', page['next'])
+        self.assertIsNone(page['previous'])
+        second = self.client.get(page['next']).json()
+        self.assertIsNone(second['next'])
+        self.assertNotEqual(second['results'], page['results'])
+
+    def test_missing_text_is_refused(self):
+        """A search without text is answered 400."""
+        self.assertEqual(self.client.get('/search/').status_code, 400)
@@ -0,0 +1,7 @@
+"""This module defines the routes for the search resources."""
+from django.urls import path
+from search.views import SearchView
+
+urlpatterns = [
+    path('', SearchView.as_view())
+]
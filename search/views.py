@@ -0,0 +1,52 @@
+"""This module manages the views of the search app."""
+from django.db import router
+from rest_framework import permissions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+from products.models import Product
+from search.index import search
+from search.serializers import SearchSerializer
+
+
+class SearchView(APIView):
+    """
+    This class manages the view to search the products, categories and providers.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request: Request, format=None) -> Response:
+        """
+        Search the resources of the owner by prefix of their words.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The page of results, best ranked first.
+            400: An error is detected on the request parameters.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+        """
+        serializer = SearchSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        limit, offset = serializer.validated_data['limit'], serializer.validated_data['offset']
+        results = search(request.user.pk, serializer.validated_data['q'], limit + 1, offset, router.db_for_read(Product))
+        url = request.build_absolute_uri()
+        previous = None
+        if offset:
+            previous = replace_query_param(url, 'offset', offset - limit) if offset > limit \
+                else remove_query_param(url, 'offset')
+        return Response({
+            'next': replace_query_param(url, 'offset', offset + limit) if len(results) > limit else None,
+            'previous': previous,
+            'results': results[:limit],
+        })
@@ -0,0 +1,20 @@
+"""This module defines the configuration for the snapshots app."""
+from django.apps import AppConfig
+from django.db.models.signals import post_delete
+
+
+class SnapshotsConfig(AppConfig):
+    """
+    This class defines the configuration for the snapshots app.
+
+    Attributes:
+        name (str): The app name.
+    """
+
+    name = 'snapshots'
+
+    def ready(self):
+        """Delete the snapshots of the users with them."""
+        from django.contrib.auth.models import User  # pylint: disable=import-outside-toplevel
+        from snapshots.snapshot import forget  # pylint: disable=import-outside-toplevel
+        post_delete.connect(forget, sender=User, dispatch_uid='snapshots.snapshot.forget')
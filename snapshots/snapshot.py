@@ -0,0 +1,165 @@
+"""This module builds the SQLite snapshots of the owner data for the offline clients.
+
+A snapshot is a SQLite file holding the categories, the providers, the products and
+the batches in stock of an owner, with their api identifiers and the indexes of the
+client queries, so a client opens it as its local store instead of parsing the JSON
+lists. The `snapshot` table gives the owner version of the data and the last change
+of the owner, from which the client resumes the change stream.
+
+A snapshot is built once per owner version: the data is streamed from the shard and
+bulk inserted into a temporary file, without journal, the indexes being created after
+the rows, then the file is renamed in place. The older snapshots of the owner are
+deleted then, an open one being still readable until closed.
+
+The data is not read in one transaction, which would be held for the whole build. The
+owner version and the last change are read first instead, so a write during the build
+is either in the snapshot or replayed by the change stream, and the snapshot is tagged
+with a version older than its data: it is built again at the next download.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.db.models import Max
+from django.utils import timezone
+from authentication.models import OwnerVersion
+from categories.models import Category
+from changes.models import Change
+from products.models import Batch, Product
+from providers.models import Provider
+
+FORMAT = 1
+
+TABLES = [
+    'CREATE TABLE snapshot (owner INTEGER NOT NULL, version INTEGER NOT NULL, last_change INTEGER NOT NULL, '
+    'created TEXT NOT NULL)',
+    'CREATE TABLE category (id INTEGER PRIMARY KEY, label TEXT NOT NULL)',
+    'CREATE TABLE provider (id INTEGER PRIMARY KEY, label TEXT NOT NULL, address TEXT NOT NULL, city TEXT NOT NULL, '
+    'zipcode TEXT NOT NULL, phone TEXT NOT NULL)',
+    'CREATE TABLE product (id INTEGER PRIMARY KEY, category_id INTEGER NOT NULL REFERENCES category, '
+    'label TEXT NOT NULL, unit TEXT NOT NULL, icon TEXT, barcode TEXT, version INTEGER NOT NULL)',
+    'CREATE TABLE batch (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL REFERENCES product, '
+    'provider_id INTEGER NOT NULL REFERENCES provider, initial REAL NOT NULL, current REAL NOT NULL, '
+    'price REAL NOT NULL, purchase TEXT NOT NULL, "limit" TEXT NOT NULL, version INTEGER NOT NULL)',
+]
+
+INDEXES = [
+    'CREATE INDEX product_category_idx ON product (category_id)',
+    'CREATE INDEX product_label_idx ON product (label)',
+    'CREATE INDEX product_barcode_idx ON product (barcode) WHERE barcode IS NOT NULL',
+    'CREATE INDEX batch_product_idx ON batch (product_id, "limit")',
+    'CREATE INDEX batch_limit_idx ON batch ("limit")',
+]
+
+COLUMNS = {'category': 2, 'provider': 6, 'product': 7, 'batch': 9}
+
+CHUNK = 2000
+
+
+def directory(owner_id: int) -> Path:
+    """Return the directory of the snapshots of an owner."""
+    return Path(settings.SNAPSHOT_DIR) / str(owner_id)
+
+
+def _open(path) -> BinaryIO:
+    """Open a snapshot by its descriptor, its name being replaced or deleted while it is sent."""
+    return os.fdopen(os.open(path, os.O_RDONLY), 'rb')
+
+
+def _rows(owner_id: int, using: str) -> dict:
+    """Return the rows of the tables of a snapshot, as iterators streaming the data of an owner."""
+    categories = Category.objects.using(using).filter(owner=owner_id).order_by('pk')  # pylint: disable=no-member
+    providers = Provider.objects.using(using).filter(owner=owner_id).order_by('pk')  # pylint: disable=no-member
+    products = Product.objects.using(using).filter(owner=owner_id).order_by('pk')  # pylint: disable=no-member
+    batches = Batch.objects.using(using).filter(owner=owner_id, current__gt=0).order_by('pk')  # pylint: disable=no-member
+    return {
+        'category': categories.values_list('pk', 'label').iterator(CHUNK),
+        'provider': providers.values_list('pk', 'label', 'address', 'city', 'zipcode', 'phone').iterator(CHUNK),
+        'product': products.values_list('pk', 'category', 'label', 'unit', 'icon', 'barcode', 'version').iterator(CHUNK),
+        'batch': ((pk, product, provider, initial, current, price, purchase.isoformat(), limit.isoformat(), version)
+                  for pk, product, provider, initial, current, price, purchase, limit, version in batches.values_list(
+                      'pk', 'product', 'provider', 'initial', 'current', 'price', 'purchase', 'limit', 'version'
+                  ).iterator(CHUNK)),
+    }
+
+
+def build(owner_id: int, version: int, path: Path, using: str) -> BinaryIO:
+    """
+    Write the snapshot of the data of an owner to a file.
+
+    Args:
+        owner_id (int): The owner of the data.
+        version (int): The owner version of the data, read before it.
+        path (Path): The file of the snapshot, replaced once written.
+        using (str): The database alias of the shard of the owner.
+
+    Returns:
+        file: The snapshot, opened for reading before it is renamed.
+    """
+    last_change = Change.objects.using(using).filter(owner=owner_id).aggregate(last=Max('id'))['last'] or 0  # pylint: disable=no-member
+    descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=path.parent)
+    os.close(descriptor)
+    try:
+        snapshot = sqlite3.connect(temporary)
+        try:
+            snapshot.executescript(f'PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF; PRAGMA user_version = {FORMAT};')
+            with snapshot:
+                for table in TABLES:
+                    snapshot.execute(table)
+                snapshot.execute('INSERT INTO snapshot VALUES (?, ?, ?, ?)',
+                                 (owner_id, version, last_change, timezone.now().isoformat()))
+                for table, rows in _rows(owner_id, using).items():
+                    snapshot.executemany(f'INSERT INTO {table} VALUES ({", ".join("?" * COLUMNS[table])})', rows)
+                for index in INDEXES:
+                    snapshot.execute(index)
+        finally:
+            snapshot.close()
+        written = _open(temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return written
+
+
+def open_snapshot(owner: User, known: Optional[str] = None) -> Tuple[Optional[BinaryIO], str]:
+    """
+    Open the snapshot of the current data of an owner, built first if the data changed since the last one.
+
+    Args:
+        owner (User): The owner of the data.
+        known (str): The tag of the snapshot held by the client, if any.
+
+    Returns:
+        tuple(file, str): The snapshot, opened for reading, None when it is the known one, and its tag.
+    """
+    using = router.db_for_read(Product)
+    version = OwnerVersion.of(owner.pk, using)
+    tag = f'{using}-{version}'
+    if tag == known:
+        return None, tag
+    path = directory(owner.pk) / f'{tag}.sqlite3'
+    try:
+        return _open(path), tag
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        snapshot = build(owner.pk, version, path, using)
+    for older in path.parent.glob('*.sqlite3'):
+        if older != path:
+            older.unlink(missing_ok=True)
+    return snapshot, tag
+
+
+def discard(owner_id: int):
+    """Delete the snapshots of an owner, whose data was moved or deleted."""
+    shutil.rmtree(directory(owner_id), ignore_errors=True)
+
+
+def forget(sender, instance: User, **kwargs: dict):
+    """Delete the snapshots of a user being deleted."""
+    discard(instance.pk)
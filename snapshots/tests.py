@@ -0,0 +1,96 @@
+"""This module manages the tests for the snapshots app."""
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TestCase
+from api.testing import connect, database_of
+from snapshots import snapshot
+from snapshots.snapshot import FORMAT, directory
+
+
+class SnapshotTests(TestCase):
+    """This class tests the download of the data of a user as a SQLite file."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Connect a user with a product, a batch in stock and an empty one."""
+        self.client = connect('offline')
+        category = self.client.post('/categories/', {'label': 'Dairy'}, format='json').json()['id']
+        provider = self.client.post('/providers/', {'label': 'Shop', 'address': '1 rue', 'city': 'Lyon',
+                                                    'zipcode': '69000', 'phone': '0400000000'}, format='json').json()['id']
+        self.product = self.client.post('/products/', {'label': 'Milk', 'unit': 'L', 'category': category},
+                                        format='json').json()['id']
+        self.batches = [self.client.post(f'/products/{self.product}/batches/', {
+            'provider': provider, 'initial': 4, 'current': current, 'price': 1.5,
+            'purchase': '2026-01-01', 'limit': '2026-02-01'
+        }, format='json').json()['id'] for current in (3, 0)]
+        self.owner = User.objects.get(username='offline').pk
+
+    def download(self, **headers: str):
+        """Request the snapshot of the user."""
+        response = self.client.get('/snapshot', HTTP_ACCEPT='application/vnd.sqlite3', **headers)
+        self.addCleanup(response.close)
+        return response
+
+    @staticmethod
+    def rows(content: bytes, *queries: str) -> list:
+        """Save a downloaded snapshot and return the rows of each query on it."""
+        with tempfile.TemporaryDirectory() as folder:
+            path = Path(folder) / 'foodstock.sqlite3'
+            path.write_bytes(content)
+            snapshot = sqlite3.connect(path)
+            try:
+                return [snapshot.execute(query).fetchall() for query in queries]
+            finally:
+                snapshot.close()
+
+    def test_download(self):
+        """The snapshot holds the data of the user with its identifiers, the empty batches excepted."""
+        response = self.download()
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'application/vnd.sqlite3'))
+        content = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertEqual(self.rows(content, 'SELECT id, label FROM product', 'SELECT id, current, "limit" FROM batch',
+                                   'SELECT owner FROM snapshot', 'PRAGMA user_version'),
+                         [[(self.product, 'Milk')], [(self.batches[0], 3.0, '2026-02-01')], [(self.owner,)], [(FORMAT,)]])
+
+    def test_not_modified(self):
+        """A client holding the current snapshot gets a 304, and a new snapshot once the data changed."""
+        tag = self.download()['ETag']
+        response = self.download(HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual((response.status_code, response['ETag']), (304, tag))
+        self.client.post('/categories/', {'label': 'Fruits'}, format='json')
+        response = self.download(HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], tag)
+        self.assertEqual(self.rows(b''.join(response.streaming_content), 'SELECT label FROM category ORDER BY id'), [[('Dairy',), ('Fruits',)]])
+        self.assertEqual(len(list(directory(self.owner).glob('*.sqlite3'))), 1)
+
+    def test_write_during_the_build(self):
+        """The build holds no transaction, and a write during it is in the snapshot, tagged with the version read before."""
+        rows = snapshot._rows
+        database = database_of('offline')
+        depth = len(connections[database].savepoint_ids)
+
+        def write_then_read(owner_id: int, using: str) -> dict:
+            """Write a category once the version is read, then read the rows."""
+            self.assertEqual(len(connections[using].savepoint_ids), depth)
+            self.client.post('/categories/', {'label': 'Fruits'}, format='json')
+            return rows(owner_id, using)
+        with mock.patch('snapshots.snapshot._rows', side_effect=write_then_read):
+            response = self.download()
+        tag = response['ETag']
+        self.assertEqual(self.rows(b''.join(response.streaming_content), 'SELECT label FROM category ORDER BY id'),
+                         [[('Dairy',), ('Fruits',)]])
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=tag).status_code, 200)
+
+    def test_snapshots_deleted_with_the_user(self):
+        """The snapshots of a user are deleted with it."""
+        self.download()
+        self.assertTrue(directory(self.owner).exists())
+        User.objects.get(pk=self.owner).delete()
+        self.assertFalse(directory(self.owner).exists())
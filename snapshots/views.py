@@ -0,0 +1,84 @@
+"""This module manages the views of the snapshots app."""
+import os
+from django.http import FileResponse
+from rest_framework import permissions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from snapshots.snapshot import open_snapshot
+
+
+class SQLiteRenderer(JSONRenderer):
+    """
+    This class accepts the requests of a SQLite file, their errors being rendered in JSON.
+
+    Attributes:
+        media_type (str): The media type of the SQLite files.
+        format (str): The format suffix.
+    """
+
+    media_type = 'application/vnd.sqlite3'
+    format = 'sqlite3'
+
+
+class SnapshotResponse(FileResponse):
+    """
+    This class defines the response of a snapshot.
+
+    The WSGI server sends the file with `sendfile`, and the ASGI one by messages of
+    the size of the blocks read.
+
+    Attributes:
+        block_size (int): The size of the blocks read from the file, the one of the ASGI messages.
+    """
+
+    block_size = 1 << 16
+
+
+class SnapshotView(APIView):
+    """
+    This class manages the view to download the data of the user as a SQLite file.
+
+    The snapshot is built once by version of the user data, see `snapshots.snapshot`,
+    and its tag is sent as its ETag: a client sending it back in `If-None-Match` gets a
+    304 while its data did not change. The file is given to the server as it is, which
+    sends it without copying it through the application when it is able to.
+
+    Attributes:
+        permission_classes (list(Permissions)): The options to access at this resource.
+        renderer_classes (list(Renderer)): The formats accepted by the clients.
+
+    Returns:
+            200: The snapshot of the user data.
+            304: The snapshot of the client is still current.
+            401: The user must be connected to access this resource.
+            406: The response format is not acceptable by the server.
+            500: An error was occured in the treatment of the request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, SQLiteRenderer]
+
+    def get(self, request: Request, format=None) -> Response:
+        """
+        Send the snapshot of the user data.
+
+        Attributes:
+            request (Request): The request sent to the api.
+            format (NoneType): Always none, pass by Accept header.
+
+        Returns:
+            200: The snapshot of the user data.
+            304: The snapshot of the client is still current.
+        """
+        known = request.headers.get('If-None-Match', '').strip().replace('W/', '', 1).strip('"')
+        snapshot, tag = open_snapshot(request.user, known or None)
+        if snapshot is None:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': f'"{tag}"'})
+        response = SnapshotResponse(snapshot, as_attachment=True, filename='foodstock.sqlite3',
+                                    content_type=SQLiteRenderer.media_type)
+        response['Content-Length'] = os.fstat(snapshot.fileno()).st_size
+        response['ETag'] = f'"{tag}"'
+        response['Cache-Control'] = 'private, no-cache'
+        return response